@@ -1 +1,47 @@
-from PythonMETAR.metar import *
\ No newline at end of file
+from PythonMETAR.metar import *
+
+_LAZY = {
+    'decodeBytes': 'PythonMETAR.bytesmetar',
+    'Taf': 'PythonMETAR.taf',
+    'decodeTafs': 'PythonMETAR.taf',
+    'BatchDiagnostics': 'PythonMETAR.diagnostics',
+    'decodeTolerant': 'PythonMETAR.diagnostics',
+    'StationRegistry': 'PythonMETAR.stations',
+    'defaultRegistry': 'PythonMETAR.stations',
+    'nearestMetars': 'PythonMETAR.stations',
+    'FlightCategories': 'PythonMETAR.categories',
+    'CategoryTracker': 'PythonMETAR.categories',
+    'categoryChanges': 'PythonMETAR.categories',
+    'MetarFetcher': 'PythonMETAR.fetcher',
+    'DecodePipeline': 'PythonMETAR.pipeline',
+}
+# Name => module, imported at first access: `import PythonMETAR.metar` (which
+# runs this file) only loads what decoding needs (no threading, no network)
+
+_PUBLIC = [
+    'Metar', 'NOAA_URL', 'OBSERVATION_TOLERANCE',
+    'parseWind', 'parseVisibility', 'parseWeather', 'parseCloud', 'cloudCeiling',
+    'reportJSON', 'splitRemarks', 'decodeRemarks',
+    'fetchReport', 'fetchMetars',
+    'daysInMonth', 'parseReference', 'resolveObservationTimes',
+    'NOAAServError', 'ReadingMETARError', 'ReadFileError',
+]
+# Public names of `metar` (not its imports: `re`, `datetime`...)
+
+__all__ = _PUBLIC + list(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+    from importlib import import_module
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
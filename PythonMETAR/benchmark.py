@@ -0,0 +1,173 @@
+"""
+Benchmarks of METAR Library
+Author: Matthieu BOUCHET
+
+Run with `python -m PythonMETAR.benchmark`
+"""
+
+import json
+import pickle
+import time
+import tracemalloc
+
+from PythonMETAR.metar import Metar, splitRemarks
+from PythonMETAR.bytesmetar import decodeBytes
+from PythonMETAR.taf import decodeTafs
+from PythonMETAR.serialize import decodeRecord, encodeRecord
+
+SAMPLES = (
+    'METAR LFQN 201630Z 18005KT 4000 -SHRA SCT030 BKN050CB 18/12 Q1014 NOSIG=',
+    'METAR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG',
+    'METAR LFLY 192100Z AUTO 17012KT RASN 06/M02 Q1017 BECMG 19020G35KT',
+    'METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D -SN BLSN BKN008 OVC040 M05/M08 A2992 REFZRA WS RWY36 RMK SF5NS3 SLP134',
+    'METAR LFLY 231830Z AUTO 19012KT BKN008 06/02 Q0997',
+    'METAR LFPG 292200Z AUTO 22010G25KT 040V210 9000 SCT050CB 06/M00 Q1000 NOSIG',
+    'METAR EDDF 121250Z 05004MPS 9999 FEW040 12/03 Q1021 TEMPO 06010MPS',
+    'METAR KJFK 121251Z 31012G20KT 10SM FEW250 M01/M12 A3012 RMK AO2 SLP200 T10061122',
+)
+
+TAF_SAMPLES = (
+    'TAF LFPG 291700Z 2918/3024 22010KT 9999 SCT030 TEMPO 2920/2924 4000 SHRA BECMG 3002/3004 30015G25KT FM301200 27010KT CAVOK PROB30 TEMPO 3014/3018 TSRA BKN015CB=',
+    'TAF LFLY 291100Z 2912/3018 VRB03KT CAVOK BECMG 2920/2922 BKN008 PROB40 2923/3006 0800 FG=',
+    'TAF KJFK 291130Z 2912/3018 31012G20KT P6SM FEW250 FM291800 28015KT P6SM SCT050 FM300200 27008KT P6SM BKN040=',
+    'TAF CYWG 291138Z 2912/3012 30015G25KT 3/4SM -SN BLSN BKN008 TEMPO 2912/2918 1/2SM SN OVC004 BECMG 2918/2920 28010KT P6SM NSW SCT020=',
+)
+
+
+def measure(function, reports, repeat=1000):
+    """Mean decoding time of one report
+
+    Args:
+        function (callable): Decoder called with each report
+        reports (sequence): Reports
+        repeat (integer, optional): Number of passes over reports. Defaults to 1000.
+
+    Returns:
+        (float): Seconds per report
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for report in reports:
+            function(report)
+
+    return (time.perf_counter() - start) / (repeat * len(reports))
+
+
+def allocation(function, reports):
+    """Mean memory allocated while decoding one report (`tracemalloc` peak,
+    result included)
+
+    Args:
+        function (callable): Decoder called with each report
+        reports (sequence): Reports
+
+    Returns:
+        (float): Bytes per report
+    """
+    function(reports[0])  # Warm caches (regex, ...)
+    total = 0
+
+    tracemalloc.start()
+    for report in reports:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(report)
+        total += tracemalloc.get_traced_memory()[1] - before
+        del result
+    tracemalloc.stop()
+
+    return total / len(reports)
+
+
+def regexFixedGroups(data):
+    """Reference decoder of fixed-shape groups with `Metar` regex analyzers
+    (text decoded from bytes, other analyzers not called)
+    """
+    metar = Metar.__new__(Metar)
+    metar.metar = data.decode()
+    metar.metarWithoutRemarks, metar.metarRemarks = splitRemarks(metar.metar)
+    metar.metarWithoutChangements = metar.metarWithoutRemarks
+    metar.analyzeChangements()
+
+    return {
+        'dateTime': metar.analyzeDateTime(),
+        'wind': metar.analyzeWind(),
+        'temperatures': metar.analyzeTemperatures(),
+        'qnh': metar.analyzeQNH()
+    }
+
+
+def benchmarkBytesDecoding(reports=SAMPLES, repeat=1000):
+    """Compare `decodeBytes()` with `Metar` regex analyzers on fixed-shape groups
+
+    Returns:
+        (dict): {decoder name: (seconds per report, bytes allocated per report)}
+    """
+    reports = [report.encode() for report in reports]
+    decoders = (('regex', regexFixedGroups), ('bytes', decodeBytes))
+
+    return {
+        name: (measure(function, reports, repeat), allocation(function, reports))
+        for name, function in decoders
+    }
+
+
+def benchmarkTafDecoding(repeat=200):
+    """Compare batch decoding throughput of TAF (`decodeTafs()`) and METAR (`Metar`)
+
+    Returns:
+        (dict): {decoder name: (seconds per report, bytes allocated per report)}
+    """
+    reference = '2021/03/29 17:05'
+    metars = [(report.split()[1], report) for report in SAMPLES]
+    tafs = [(report.split()[1], report) for report in TAF_SAMPLES]
+
+    def decodeMetar(report):
+        return Metar(report[0], report[1], reference)
+
+    def decodeTaf(report):
+        return decodeTafs((report,), reference)
+
+    return {
+        'METAR': (measure(decodeMetar, metars, repeat), allocation(decodeMetar, metars)),
+        'TAF': (measure(decodeTaf, tafs, repeat), allocation(decodeTaf, tafs))
+    }
+
+
+def benchmarkSerialization(repeat=500):
+    """Compare binary records (`serialize` module) with JSON (`getAll()`)
+    and pickle (`properties`) for a decoded METAR
+
+    Returns:
+        (dict): {format name: (seconds per report to encode & decode, bytes per report)}
+    """
+    metars = [Metar(report.split()[1], report, '2021/03/29 23:00') for report in SAMPLES]
+    formats = (
+        ('JSON', lambda metar: json.dumps(metar.getAll(), default=str), json.loads),
+        ('pickle', lambda metar: pickle.dumps(metar.properties, pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ('binary', encodeRecord, decodeRecord)
+    )
+
+    results = {}
+    for name, encode, decode in formats:
+        size = sum(len(encode(metar)) for metar in metars) / len(metars)
+        seconds = measure(lambda metar: decode(encode(metar)), metars, repeat)
+        results[name] = (seconds, size)
+
+    return results
+
+
+def display(title, results, unit='bytes allocated/report'):
+    """Print results of a benchmark
+    """
+    print(title)
+    for name, (seconds, allocated) in results.items():
+        print('  {0:<10} {1:8.2f} us/report {2:10.0f} {3}'.format(
+            name, seconds * 10**6, allocated, unit))
+
+
+if __name__ == '__main__':
+    display('Fixed-shape groups (wind, QNH, temperatures, date time)',
+            benchmarkBytesDecoding())
+    display('Batch decoding (METAR / TAF)', benchmarkTafDecoding())
+    display('Serialization (encode & decode)', benchmarkSerialization(), 'bytes/report')
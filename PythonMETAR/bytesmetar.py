@@ -0,0 +1,359 @@
+"""
+Bytes-level METAR decoding
+Author: Matthieu BOUCHET
+
+Decode fixed-shape groups of a METAR directly from `bytes` (or `memoryview`)
+with offset arithmetic: no `str` decoding, no regex, no slicing and no
+`int()` on substrings. Small integers are cached by Python and two digits
+strings come from a precomputed table, so a report decodes without
+intermediate objects.
+
+Results match `Metar` attributes for groups decoded:
+- `dateTime` => `Metar.analyzeDateTime()`
+- `wind` => `Metar.analyzeWind()`
+- `temperatures` => `Metar.analyzeTemperatures()`
+- `qnh` => `Metar.analyzeQNH()`
+"""
+
+_SPACE = 0x20
+_NEWLINE = 0x0a
+_ZERO = 0x30
+_NINE = 0x39
+_G = ord('G')
+_M = ord('M')
+_V = ord('V')
+_WHITESPACES = b' \t\n\r\x0b\x0c'
+
+_TWO_DIGITS = tuple('{:02d}'.format(value) for value in range(100))
+
+_NOSIG = b'NOSIG'
+_REMARKS = b' RMK'
+_CHANGEMENTS = (b'TEMPO', b'BECMG', b'GRADU', b'RAPID', b'INTER', b'TEND')
+
+
+def _asBytes(data):
+    """Return `bytes` object scanned by decoder.
+    A memoryview covering its whole `bytes` object is not copied.
+    """
+    if isinstance(data, memoryview):
+        if isinstance(data.obj, bytes) and data.nbytes == len(data.obj):
+            return data.obj
+
+        return data.tobytes()
+
+    return data
+
+
+def _isDigits(data, start, end):
+    """True if data[start:end] are ASCII digits (inside data)
+    """
+    if start < 0 or end > len(data):
+        return False
+
+    for i in range(start, end):
+        if not _ZERO <= data[i] <= _NINE:
+            return False
+
+    return True
+
+
+def _number(data, start, end):
+    """Integer value of ASCII digits data[start:end]
+    """
+    value = 0
+    for i in range(start, end):
+        value = value * 10 + data[i] - _ZERO
+
+    return value
+
+
+def remarksStart(data):
+    """Offset where remarks (RMK section) begin, as split by
+    `splitRemarks()` (separator before RMK kept). Length of data if none.
+
+    Args:
+        data (bytes): METAR
+
+    Returns:
+        (integer): Offset
+    """
+    position = data.find(_REMARKS)
+    while position != -1:
+        following = position + len(_REMARKS)
+        # ' RMK(?= |=|$)': '$' also matches before a final end of line
+        if (following == len(data) or data[following] in b' ='
+                or (following == len(data) - 1 and data[following] == _NEWLINE)):
+            return position + 1
+
+        position = data.find(_REMARKS, position + 1)
+
+    return len(data)
+
+
+def changementsEnd(data, body=None):
+    """Offset where changements (TEMPO, BECMG, ...) begin, as erased by
+    `Metar.analyzeChangements()` in a single-line report. End of first
+    line (before remarks) if none. See `withoutChangements()` for reports
+    on several lines.
+
+    Args:
+        data (bytes): METAR
+        body (integer, optional): Offset of remarks (see `remarksStart()`)
+
+    Returns:
+        (integer): Offset
+    """
+    if body is None:
+        body = remarksStart(data)
+
+    end = data.find(b'\n', 0, body)
+    if end == -1:
+        end = body
+
+    if data.find(_NOSIG, 0, body) != -1:
+        return end
+
+    return _lineChangements(data, 0, end)
+
+
+def _lineChangements(data, start, end):
+    """Offset of first changement marker of line data[start:end] followed
+    by a character ('marker.+' of `Metar.analyzeChangements()`), end if none
+    """
+    limit = end
+    for marker in _CHANGEMENTS:
+        position = data.find(marker, start, end)
+        if -1 < position < limit and position + len(marker) < end:
+            limit = position
+
+    return limit
+
+
+def withoutChangements(data, body=None):
+    """Main part of METAR scanned by decoders, as
+    `Metar.metarWithoutChangements`: text before remarks, without
+    changements. In `Metar`, a changement marker erases its line only
+    ('.' doesn't match end of line) and NOSIG keeps every line, so lines
+    of a wrapped report are joined without their changements.
+
+    Args:
+        data (bytes): METAR
+        body (integer, optional): Offset of remarks (see `remarksStart()`)
+
+    Returns:
+        (tuple): (data, offset of end). Data is not copied for a
+        single-line report.
+    """
+    if body is None:
+        body = remarksStart(data)
+
+    if data.find(b'\n', 0, body) == -1:
+        return data, changementsEnd(data, body)
+
+    if data.find(_NOSIG, 0, body) != -1:
+        return data, body
+
+    parts = []
+    start = 0
+    while start <= body:
+        end = data.find(b'\n', start, body)
+        if end == -1:
+            parts.append(data[start:_lineChangements(data, start, body)])
+            break
+
+        parts.append(data[start:_lineChangements(data, start, end)])
+        parts.append(b'\n')
+        start = end + 1
+
+    main = b''.join(parts)
+    return main, len(main)
+
+
+def decodeDateTime(data, end=None):
+    """Day, hour & minute group (DDHHMMZ)
+
+    Returns:
+        (tuple): Tuple of strings (Day,Hour,Minute), as `Metar.analyzeDateTime()`
+        (NoneType): None if no or several date time groups
+    """
+    if end is None:
+        end = remarksStart(data)
+
+    found = -1
+    position = data.find(b'Z', 6, end)
+    while position != -1:
+        if _isDigits(data, position - 6, position):
+            if found != -1:
+                return None
+            found = position - 6
+
+        position = data.find(b'Z', position + 1, end)
+
+    if found == -1:
+        return None
+
+    return (_TWO_DIGITS[_number(data, found, found + 2)],
+            _TWO_DIGITS[_number(data, found + 2, found + 4)],
+            _TWO_DIGITS[_number(data, found + 4, found + 6)])
+
+
+def _searchWind(data, unit, end):
+    """Offset of wind group with unit (b'KT' or b'MPS'), with priority
+    of `Metar.analyzeWind()`: dddff, dddffGgg, VRBff. -1 if not found.
+    Second value is True if gust.
+    """
+    for shape in (0, 1, 2):
+        position = data.find(unit, 0, end)
+        while position != -1 and position + len(unit) <= end:
+            if shape == 0 and _isDigits(data, position - 5, position):
+                return position - 5, False
+
+            if (shape == 1 and _isDigits(data, position - 8, position - 3)
+                    and data[position - 3] == _G
+                    and _isDigits(data, position - 2, position)):
+                return position - 8, True
+
+            if (shape == 2 and _isDigits(data, position - 2, position)
+                    and data.startswith(b'VRB', position - 5)):
+                return position - 5, False
+
+            position = data.find(unit, position + 1, end)
+
+    return -1, False
+
+
+def decodeWind(data, end=None):
+    """Wind group (dddffKT, dddffGggKT, VRBffKT or MPS) & variation (whole
+    dddVddd group, not inside a RVR group as R09/0600V1000)
+
+    Returns:
+        (dict): Dictionnary as `Metar.analyzeWind()`
+        (NoneType): None if no wind group
+    """
+    if end is None:
+        data, end = withoutChangements(data)
+
+    start, gust = _searchWind(data, b'KT', end)
+    if start == -1:
+        start, gust = _searchWind(data, b'MPS', end)
+        if start == -1:
+            return None
+
+    if data[start] == _V:  # VRB
+        direction = 'VRB'
+    else:
+        direction = _number(data, start, start + 3)
+
+    speed = _number(data, start + 3, start + 5)
+    gust_speed = _number(data, start + 6, start + 8) if gust else None
+
+    variation = None
+    position = data.find(b'V', 3, end)
+    while position != -1:
+        if (_isDigits(data, position - 3, position)
+                and position + 4 <= end
+                and _isDigits(data, position + 1, position + 4)
+                and (position == 3 or data[position - 4] in _WHITESPACES)
+                and (position + 4 == len(data) or data[position + 4] in _WHITESPACES)):
+            variation = (_number(data, position - 3, position),
+                         _number(data, position + 1, position + 4))
+            break
+
+        position = data.find(b'V', position + 1, end)
+
+    return {
+        'direction': direction,
+        'speed': speed,
+        'gust': gust_speed,
+        'variation': variation
+    }
+
+
+def decodeTemperatures(data, end=None):
+    """Temperature & dewpoint group (TT/DD, M for negative values)
+
+    Returns:
+        (dict): Dictionnary as `Metar.analyzeTemperatures()`
+        (NoneType): None if no temperature group
+    """
+    if end is None:
+        data, end = withoutChangements(data)
+
+    position = data.find(b'/', 0, end)
+    while position != -1:
+        # Left: ' ' M* dd
+        left = position - 3
+        while left >= 0 and data[left] == _M:
+            left -= 1
+
+        # Right: M* dd ' '
+        right = position + 1
+        while right < end and data[right] == _M:
+            right += 1
+
+        if (left >= 0 and data[left] == _SPACE
+                and _isDigits(data, position - 2, position)
+                and right + 2 < end and data[right + 2] == _SPACE
+                and _isDigits(data, right, right + 2)):
+
+            temperature = _number(data, position - 2, position)
+            if left < position - 3:
+                temperature = -temperature
+
+            dewpoint = _number(data, right, right + 2)
+            if right > position + 1:
+                dewpoint = -dewpoint
+
+            return {
+                'temperature': temperature,
+                'dewpoint': dewpoint
+            }
+
+        position = data.find(b'/', position + 1, end)
+
+    return None
+
+
+def decodeQNH(data, end=None):
+    """QNH group (Qnnnn in hPa, Annnn in inHg)
+
+    Returns:
+        (integer): If in hPA, as `Metar.analyzeQNH()`
+        (float): If in inHG
+        (NoneType): None if no QNH group
+    """
+    if end is None:
+        data, end = withoutChangements(data)
+
+    for marker in (b'Q', b'A'):
+        position = data.find(marker, 0, end)
+        while position != -1:
+            if position + 5 <= end and _isDigits(data, position + 1, position + 5):
+                value = _number(data, position + 1, position + 5)
+                return value if marker == b'Q' else value / 100
+
+            position = data.find(marker, position + 1, end)
+
+    return None
+
+
+def decodeBytes(data):
+    """Decode fixed-shape groups of a METAR in bytes.
+
+    Args:
+        data (bytes or memoryview): METAR, ASCII encoded
+
+    Returns:
+        (dict): Dictionnary with keys `dateTime`, `wind`, `temperatures`
+        and `qnh`, with values of same keys of `Metar.properties`
+    """
+    data = _asBytes(data)
+    body = remarksStart(data)
+    main, end = withoutChangements(data, body)
+
+    return {
+        'dateTime': decodeDateTime(data, body),
+        'wind': decodeWind(main, end),
+        'temperatures': decodeTemperatures(main, end),
+        'qnh': decodeQNH(main, end)
+    }
@@ -0,0 +1,184 @@
+"""
+Flight categories of METAR
+Author: Matthieu BOUCHET
+
+FAA flight categories (VFR, MVFR, IFR, LIFR) from ceiling (lowest BKN,
+OVC or VV layer) and visibility, with configurable rule tables.
+Batches are classified report by report or column by column (NumPy if
+installed), and categories of two cycles compared with `categoryChanges()`.
+"""
+
+from array import array
+
+FAA_RULES = (
+    ('LIFR', 500, 1609),   # Ceiling < 500 ft or visibility < 1 SM
+    ('IFR', 1000, 4828),   # Ceiling < 1000 ft or visibility < 3 SM
+    ('MVFR', 3001, 8048),  # Ceiling <= 3000 ft or visibility <= 5 SM
+)
+# (category, ceiling below (ft), visibility below (m)), most restrictive first.
+# Bounds are exclusive; statute miles are rounded to the metre as `normalize()`
+# (1SM => 1609 m is IFR, 5SM => 8047 m is MVFR).
+
+
+class FlightCategories:
+    """Classification engine of flight categories.
+
+    A report is in the first category of rules whose ceiling or visibility
+    bound is not reached, else in default category. A missing ceiling means
+    no ceiling. A missing visibility doesn't limit category, but category
+    is None if visibility and ceiling are both missing.
+
+    Args:
+        rules (tuple, optional): Tuples (category, ceiling below (ft),
+        visibility below (m)), most restrictive first. A bound None is not
+        checked. Defaults to `FAA_RULES`.
+        default (string, optional): Category if no rule applies. Defaults to 'VFR'.
+    """
+
+    def __init__(self, rules=FAA_RULES, default='VFR'):
+        self.rules = tuple(rules)
+        self.default = default
+        self.categories = tuple(rule[0] for rule in self.rules) + (default,)
+        # Categories by code (index), used by column classification
+
+    def classify(self, ceiling, visibility):
+        """Category of a ceiling and a visibility
+
+        Args:
+            ceiling (integer): Ceiling (ft), None if no ceiling
+            visibility (integer): Visibility (m), None if unknown
+
+        Returns:
+            (string): Category, None if both values missing
+        """
+        if visibility is None and ceiling is None:
+            return None
+
+        for category, ceilingBelow, visibilityBelow in self.rules:
+            if ceiling is not None and ceilingBelow is not None and ceiling < ceilingBelow:
+                return category
+            if visibility is not None and visibilityBelow is not None and visibility < visibilityBelow:
+                return category
+
+        return self.default
+
+    def classifyMetar(self, metar):
+        """Category of a decoded METAR (visibility in statute miles converted)
+
+        Args:
+            metar (Metar): Decoded METAR
+
+        Returns:
+            (string): Category, None if unknown
+        """
+        normalized = metar.normalized()
+        return self.classify(normalized['ceiling'], normalized['visibility'])
+
+    def classifyBatch(self, metars):
+        """Categories of a batch of decoded METAR
+
+        Args:
+            metars (iterable): Decoded METAR
+
+        Returns:
+            (dict): OACI code => category
+        """
+        return {metar.airport: self.classifyMetar(metar) for metar in metars}
+
+    def classifyColumns(self, ceilings, visibilities, useNumpy=None):
+        """Category codes of columns (e.g. `ceiling` & `visibility` of
+        `normalizeColumns()`), NaN for missing values. Vectorized with NumPy
+        if installed.
+
+        Args:
+            ceilings (sequence): Ceilings (ft)
+            visibilities (sequence): Visibilities (m)
+            useNumpy (boolean, optional): Use NumPy. Defaults to NumPy if installed.
+
+        Returns:
+            (sequence): Codes, index of category in `categories` attribute,
+            -1 if unknown (`numpy.ndarray` if NumPy used, else `array('b')`)
+        """
+        from PythonMETAR.units import _numpy
+
+        numpy = _numpy() if useNumpy in (None, True) else None
+        if useNumpy and numpy is None:
+            raise ImportError('NumPy is required for useNumpy=True')
+
+        if numpy is None:
+            categories = self.categories
+            codes = array('b')
+            for ceiling, visibility in zip(ceilings, visibilities):
+                category = self.classify(None if ceiling != ceiling else ceiling,
+                                         None if visibility != visibility else visibility)
+                codes.append(-1 if category is None else categories.index(category))
+
+            return codes
+
+        ceilings = numpy.asarray(ceilings, dtype=numpy.float64)
+        visibilities = numpy.asarray(visibilities, dtype=numpy.float64)
+
+        codes = numpy.full(len(ceilings), len(self.rules), dtype=numpy.int8)
+        for code in range(len(self.rules) - 1, -1, -1):  # Most restrictive applied last
+            _, ceilingBelow, visibilityBelow = self.rules[code]
+            mask = numpy.zeros(len(ceilings), dtype=bool)
+            if ceilingBelow is not None:
+                mask |= ceilings < ceilingBelow
+            if visibilityBelow is not None:
+                mask |= visibilities < visibilityBelow
+            codes[mask] = code
+
+        codes[numpy.isnan(ceilings) & numpy.isnan(visibilities)] = -1
+        return codes
+
+    def names(self, codes):
+        """Categories of codes (see `classifyColumns()`)
+
+        Returns:
+            (list): Categories, None if unknown
+        """
+        categories = self.categories
+        return [None if code < 0 else categories[code] for code in codes]
+
+
+def categoryChanges(previous, current):
+    """Stations whose category changed between two cycles
+
+    Args:
+        previous (dict): OACI code => category of previous cycle
+        current (dict): OACI code => category of current cycle
+
+    Returns:
+        (dict): OACI code => (previous category, current category) of stations
+        changed or new (previous category None). Stations missing in current
+        cycle are ignored.
+    """
+    return {code: (previous.get(code), category) for code, category in current.items()
+            if previous.get(code) != category}
+
+
+class CategoryTracker:
+    """Categories of last cycle, to get changes at each cycle.
+
+    Args:
+        engine (FlightCategories, optional): Classification engine. Defaults to FAA rules.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = FlightCategories() if engine is None else engine
+        self.categories = {}  # OACI code => category of last cycle
+
+    def update(self, metars):
+        """Classify a new cycle of decoded METAR
+
+        Args:
+            metars (iterable): Decoded METAR
+
+        Returns:
+            (dict): Changes, see `categoryChanges()`
+        """
+        current = self.engine.classifyBatch(metars)
+        changes = categoryChanges(self.categories, current)
+        self.categories.update(current)
+
+        return changes
@@ -0,0 +1,334 @@
+"""
+Command-line bulk decoder
+Author: Matthieu BOUCHET
+
+Decode raw METAR (one report by line) from files or standard input,
+in streaming, with worker processes, and write JSON lines, CSV or Parquet.
+Throughput and error statistics are printed on standard error.
+
+Run with:
+`pythonmetar archive.txt.gz --format csv --output decoded.csv --workers 4`
+`cat reports.txt | python -m PythonMETAR.cli --reference "2021/03/29 23:00"`
+"""
+
+import csv
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+from PythonMETAR.metar import Metar, reportJSON
+from PythonMETAR.diagnostics import BatchDiagnostics
+
+FORMATS = ('jsonl', 'csv', 'parquet')
+
+COLUMNS = (
+    'airport', 'observationTime', 'auto', 'windDirection', 'windSpeed', 'windGust',
+    'visibility', 'qnh', 'temperature', 'dewpoint', 'ceiling', 'flightCategory', 'metar'
+)
+# Columns of CSV & Parquet outputs (values in standard units, see `Metar.normalized()`)
+
+_PARQUET_TYPES = {
+    'auto': 'bool', 'windDirection': 'int16', 'windSpeed': 'float64', 'windGust': 'float64',
+    'visibility': 'float64', 'qnh': 'float64', 'temperature': 'int16', 'dewpoint': 'int16',
+    'ceiling': 'int32'
+}
+# Parquet types of columns (others are strings)
+
+
+def airportCode(text):
+    """OACI code of a raw report (first 4 characters group after METAR,
+    SPECI, COR)
+
+    Returns:
+        (string): Code, None if not found
+    """
+    for group in text.split(None, 4)[:4]:
+        if group in ('METAR', 'SPECI', 'COR'):
+            continue
+        if len(group) == 4 and group.isalnum() and group[0].isalpha():
+            return group
+        return None
+
+    return None
+
+
+def flatRow(metar):
+    """Row of `COLUMNS` of a decoded METAR
+
+    Returns:
+        (dict): Column => value (None if missing). Variable wind direction is None.
+    """
+    normalized = metar.normalized()
+    direction = normalized['windDirection']
+
+    return {
+        'airport': metar.airport,
+        'observationTime': None if metar.observation_time is None else metar.observation_time.isoformat(),
+        'auto': metar.auto,
+        'windDirection': direction if isinstance(direction, int) else None,
+        'windSpeed': normalized['windSpeed'],
+        'windGust': normalized['windGust'],
+        'visibility': normalized['visibility'],
+        'qnh': normalized['qnh'],
+        'temperature': normalized['temperature'],
+        'dewpoint': normalized['dewpoint'],
+        'ceiling': normalized['ceiling'],
+        'flightCategory': metar.flightCategory(),
+        'metar': metar.metar
+    }
+
+
+def readLines(paths):
+    """Lines of files (gzip files decompressed), '-' for standard input
+
+    Yields:
+        (string): Line without end of line
+    """
+    for path in paths:
+        if path == '-':
+            file = sys.stdin
+        elif path.endswith('.gz'):
+            file = gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+        else:
+            file = open(path, encoding='utf-8', errors='replace')
+
+        try:
+            for line in file:
+                yield line.rstrip('\r\n')
+        finally:
+            if path != '-':
+                file.close()
+
+
+def _decodeChunk(task):
+    """Decode a chunk of lines (in worker process)
+
+    Returns:
+        (tuple): (list of outputs (JSON line or row), number of lines
+        skipped, BatchDiagnostics)
+    """
+    lines, reference, strict, format = task
+    diagnostics = BatchDiagnostics()
+    outputs = []
+    skipped = 0
+
+    for line in lines:
+        text = line.strip()
+        code = airportCode(text) if text else None
+        if code is None:
+            skipped += 1
+            continue
+
+        try:
+            metar = Metar(code, text, reference, tolerant=not strict)
+            output = json.dumps(reportJSON(metar)) if format == 'jsonl' else flatRow(metar)
+        except Exception as err:
+            diagnostics.reports += 1
+            diagnostics.reportsWithErrors += 1
+            diagnostics.errors[type(err).__name__] += 1
+            continue
+
+        if strict:
+            diagnostics.reports += 1
+        else:
+            diagnostics.add(metar)
+        outputs.append(output)
+
+    return outputs, skipped, diagnostics
+
+
+def decodeLines(lines, reference=None, strict=False, format='jsonl', workers=1, chunk=1000):
+    """Decode lines in chunks, in order, with worker processes
+
+    Args:
+        lines (iterable): Raw reports, one by line
+        reference (string, optional): Reference time of observations. Defaults to current UTC time.
+        strict (boolean, optional): Non-tolerant decoding (report skipped if an analyzer raises)
+        format (string, optional): 'jsonl' (outputs are JSON strings), else rows. Defaults to 'jsonl'.
+        workers (integer, optional): Worker processes (1: in current process). Defaults to 1.
+        chunk (integer, optional): Lines per task. Defaults to 1000.
+
+    Yields:
+        (tuple): (outputs, lines skipped, BatchDiagnostics) by chunk
+    """
+    if reference is None:
+        reference = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M')
+
+    lines = iter(lines)
+    tasks = iter(lambda: list(islice(lines, chunk)), [])
+    tasks = ((task, reference, strict, format) for task in tasks)
+
+    if workers == 1:
+        yield from map(_decodeChunk, tasks)
+        return
+
+    with Pool(workers) as pool:
+        yield from boundedMap(pool, _decodeChunk, tasks, 2 * workers)
+
+
+def boundedMap(pool, function, tasks, window):
+    """Results of a function over tasks with a worker pool, in order of tasks.
+    Unlike `Pool.imap()`, which reads every task ahead in a background
+    thread, at most `window` tasks are read and in flight at once: input
+    is read while workers decode, and memory stays bounded.
+
+    Args:
+        pool (Pool): Worker pool
+        function (function): Function of one task (picklable)
+        tasks (iterable): Tasks, read lazily
+        window (integer): Maximum of tasks in flight
+
+    Yields:
+        Results, in order of tasks
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
+
+
+class _ParquetWriter:
+    """Write rows in Parquet file by row groups (pyarrow required)
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet output requires pyarrow (pip install pyarrow)')
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, _PARQUET_TYPES.get(name, 'string'))())
+                                      for name in COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if rows:
+            columns = {name: [row[name] for row in rows] for name in COLUMNS}
+            self.writer.write_table(self.pyarrow.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def main(arguments=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='pythonmetar', description='Decode raw METAR (one report by line)')
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help='Input files (.gz decompressed), - for standard input (default)')
+    parser.add_argument('--output', '-o', default='-', help='Output file, - for standard output (default)')
+    parser.add_argument('--format', '-f', choices=FORMATS, default='jsonl')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Worker processes')
+    parser.add_argument('--chunk', type=int, default=1000, help='Reports per task')
+    parser.add_argument('--reference', help='Reference time of observations (YYYY/MM/DD HH:MM), default now. '
+                        'With --checkpoint, for files without date in name or .reference sidecar file')
+    parser.add_argument('--strict', action='store_true',
+                        help='Skip reports with a decoding error (default: tolerant decoding)')
+    parser.add_argument('--checkpoint', help='Checkpoint file: job resumes from it if it exists (jsonl, csv)')
+    parser.add_argument('--quiet', '-q', action='store_true', help='No statistics')
+    args = parser.parse_args(arguments)
+
+    if args.format == 'parquet' and args.output == '-':
+        parser.error('Parquet output requires --output')
+
+    if args.checkpoint:
+        return _resume(parser, args)
+
+    start = time.perf_counter()
+    diagnostics = BatchDiagnostics()
+    written = skipped = 0
+
+    if args.format == 'parquet':
+        try:
+            output = _ParquetWriter(args.output)
+        except ImportError as err:
+            parser.error(str(err))
+    elif args.output == '-':
+        output = sys.stdout
+    else:
+        output = open(args.output, 'w', encoding='utf-8', newline='')
+
+    writer = None
+    if args.format == 'csv':
+        writer = csv.DictWriter(output, COLUMNS)
+        writer.writeheader()
+
+    try:
+        for outputs, chunkSkipped, chunkDiagnostics in decodeLines(
+                readLines(args.inputs), args.reference, args.strict, args.format,
+                args.workers, args.chunk):
+            if args.format == 'jsonl':
+                output.writelines(line + '\n' for line in outputs)
+            elif args.format == 'csv':
+                writer.writerows(outputs)
+            else:
+                output.write(outputs)
+
+            written += len(outputs)
+            skipped += chunkSkipped
+            diagnostics.merge(chunkDiagnostics)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        summary = diagnostics.summary(5)
+        print('{0} reports written, {1} lines skipped, {2:.2f} s ({3:.0f} reports/s)'.format(
+            written, skipped, elapsed, written / elapsed if elapsed else 0), file=sys.stderr)
+        print('Errors: {0} reports {1}, unparsed groups: {2} reports {3}'.format(
+            summary['reportsWithErrors'], summary['errors'],
+            summary['reportsWithUnparsed'], summary['unparsed']), file=sys.stderr)
+
+    return 0
+
+
+def _resume(parser, args):
+    """Resumable job (`--checkpoint`), see `PythonMETAR.reprocess`
+    """
+    from PythonMETAR.reprocess import Reprocessor
+
+    try:
+        job = Reprocessor(args.inputs, args.output, args.checkpoint, args.format, args.reference,
+                          args.strict, args.workers, args.chunk)
+    except ValueError as err:
+        parser.error(str(err))
+
+    last = [0]
+
+    def progress(status):
+        if not args.quiet and status['elapsed'] - last[0] >= 10:
+            last[0] = status['elapsed']
+            print('{0}: {1} lines, {2} reports written, {3:.0f} lines/s'.format(
+                status['file'], status['lines'], status['written'], status['rate']), file=sys.stderr)
+
+    start = time.perf_counter()
+    state = job.run(progress)
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        summary = state['diagnostics']
+        print('{0} reports written, {1} lines skipped, {2:.2f} s (job total: {3} lines)'.format(
+            state['written'], state['skipped'], elapsed, state['lines']), file=sys.stderr)
+        print('Errors: {0} reports {1}, unparsed groups: {2} reports {3}'.format(
+            summary['reportsWithErrors'], summary['errors'], summary['reportsWithUnparsed'],
+            dict(list(summary['unparsed'].items())[:5])), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
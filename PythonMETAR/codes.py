@@ -0,0 +1,140 @@
+"""
+Categorical values of METAR
+Author: Matthieu BOUCHET
+
+Categorical values returned by `Metar` analyzers (cloud cover, weather,
+runway designators, RVR qualifiers & tendencies) are `Category`
+instances: strings created once at import and shared by every report,
+each with a small integer `code`.
+They are equal to plain strings (`'Rain'`, `'SCT'`), so existing code,
+JSON and serialization are unchanged, while analytics can group and
+compare `code` integers. Two categories are equal if they have the same
+kind and code; a string appears in one table only, so equality stays
+consistent with plain strings.
+"""
+
+
+class Category(str):
+    """Interned categorical string with integer code.
+
+    Attributes
+    -----------
+    - code (integer): Index of value in table of its kind (stable)
+    - kind (string): Kind of value (key of `TABLES`)
+
+    Equal to a category of same kind and code, or to a plain string of
+    same value. Hash is hash of string.
+    """
+
+    def __new__(cls, value, code, kind):
+        self = super().__new__(cls, value)
+        self.code = code
+        self.kind = kind
+
+        return self
+
+    def __eq__(self, other):
+        if type(other) is Category:
+            return self is other or (self.code == other.code and self.kind == other.kind)
+
+        return str.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = str.__hash__
+
+    def __repr__(self):
+        return str.__repr__(self)
+
+    def __reduce__(self):
+        # Unpickled as the shared instance
+        return category, (self.kind, str(self))
+
+
+def _table(kind, values):
+    return tuple(Category(value, code, kind) for code, value in enumerate(values))
+
+
+CLOUD_COVERS = _table('cloudCover', ('SKC', 'FEW', 'SCT', 'BKN', 'OVC', 'VV'))
+CLOUD_MEANINGS = _table('cloudMeaning', ('Sky Clear', 'Few', 'Scattered', 'Broken',
+                                         'Overcast', 'Invisible Sky'))
+
+WEATHER_PREFIX_CODES = _table('weatherPrefixCode', ('VC', 'MI', 'PR', 'DR', 'BL', 'FZ',
+                                                    'RE', 'BC', 'SH', 'XX'))
+WEATHER_PREFIXES = _table('weatherPrefix', ('in Vicinity', 'Thin', 'Partial', 'Low Drifting',
+                                            'Blowing', 'Freezing', 'Recent', 'Bank', 'Shower',
+                                            'Violent'))
+
+WEATHER_CODES = _table('weatherCode', ('RA', 'SN', 'GR', 'DZ', 'PL', 'GS', 'SG', 'IC', 'UP', 'BR',
+                                       'FG', 'HZ', 'FU', 'SA', 'DU', 'VA', 'PO', 'SS', 'DS', 'SQ',
+                                       'FC', 'TS'))
+WEATHERS = _table('weather', ('Rain', 'Snow', 'Hail', 'Drizzle', 'Ice Pellets', 'Gresil',
+                              'Snow Grains', 'Ice Crystals', 'Unknown', 'Brume', 'Fog', 'Haze',
+                              'Smoke', 'Sand', 'Dust', 'Volcanic Ash', 'Dust whirlpool',
+                              'Sand Storm', 'Dust Storm', 'Squalls', 'Funnel Cloud',
+                              'Thunderstorm'))
+
+RUNWAYS = _table('runway', ('{0:02d}{1}'.format(number, side)
+                            for number in range(100) for side in ('', 'L', 'C', 'R')))
+# Runway designators 00-99 with side: code = 4 * number + side (0: none, 1: L, 2: C, 3: R)
+
+RVR_QUALIFIER_CODES = _table('rvrQualifier', ('M', 'P'))  # Less than, more than
+RVR_TENDENCY_CODES = _table('rvrTendency', ('U', 'D', 'N'))  # Up, down, no change
+RVR_UNITS = _table('rvrUnit', ('m', 'ft'))
+
+TABLES = {
+    table[0].kind: table
+    for table in (CLOUD_COVERS, CLOUD_MEANINGS, WEATHER_PREFIX_CODES, WEATHER_PREFIXES,
+                  WEATHER_CODES, WEATHERS, RUNWAYS, RVR_QUALIFIER_CODES, RVR_TENDENCY_CODES,
+                  RVR_UNITS)
+}
+# Kind => values, index = code (human-readable mapping of codes)
+
+_INDEX = {(kind, str(value)): value for kind, table in TABLES.items() for value in table}
+
+if len({key[1] for key in _INDEX}) != len(_INDEX):
+    raise ValueError('A categorical value is in several tables')
+# Equal strings must be equal categories (`Category.__eq__()`)
+
+CLOUD_CLASSIFICATIONS = tuple(
+    {'code': CLOUD_COVERS[index], 'meaning': CLOUD_MEANINGS[index], 'oktaMin': oktaMin, 'oktaMax': oktaMax}
+    for index, (oktaMin, oktaMax) in enumerate(((0, 0), (1, 2), (3, 4), (5, 7), (8, 8)))
+)
+# Cloud covers with layer altitude (SKC to OVC), used by `Metar.analyzeCloud()`
+
+PREFIX_CLASSIFICATIONS = tuple({'code': code, 'meaning': meaning}
+                               for code, meaning in zip(WEATHER_PREFIX_CODES, WEATHER_PREFIXES))
+WEATHER_CLASSIFICATIONS = tuple({'code': code, 'meaning': meaning}
+                                for code, meaning in zip(WEATHER_CODES, WEATHERS))
+# Weather prefixes & phenomena, used by `Metar.analyzeWeather()`
+
+RVR_QUALIFIERS = {str(value): value for value in RVR_QUALIFIER_CODES}
+RVR_TENDENCIES = {str(value): value for value in RVR_TENDENCY_CODES}
+# Letter of RVR group => Category, used by `Metar.analyzeRVR()`
+
+
+def category(kind, value):
+    """Shared instance of a categorical value
+
+    Args:
+        kind (string): Kind (key of `TABLES`)
+        value (string): Value
+
+    Returns:
+        (Category): Category
+
+    Exception raised:
+        - KeyError: If value is not in table of kind
+    """
+    return _INDEX[(kind, value)]
+
+
+def runway(designator):
+    """Shared instance of a runway designator (e.g. '27L')
+
+    Returns:
+        (Category): Category, or designator itself if not standard (e.g. '27LL')
+    """
+    return _INDEX.get(('runway', designator), designator)
@@ -0,0 +1,112 @@
+"""
+Tolerant batch decoding of METAR
+Author: Matthieu BOUCHET
+
+Decode large batches (global feed, archives) without stopping on a
+malformed report, and aggregate diagnostics of the batch.
+"""
+
+from collections import Counter
+
+from PythonMETAR.metar import Metar
+
+
+class BatchDiagnostics:
+    """Aggregated diagnostics of a batch of tolerant decodings.
+
+    Attributes
+    -----------
+    - reports (integer): Number of reports decoded
+    - reportsWithErrors (integer): Reports with at least one field in error
+    - reportsWithUnparsed (integer): Reports with at least one group not recognized
+    - reportsWithConflicts (integer): Reports with at least one conflict
+    - errors (Counter): Number of errors by field
+    - unparsed (Counter): Number of occurrences by group not recognized
+    - conflicts (Counter): Number of conflicts by field
+    """
+
+    def __init__(self):
+        self.reports = 0
+        self.reportsWithErrors = 0
+        self.reportsWithUnparsed = 0
+        self.reportsWithConflicts = 0
+        self.errors = Counter()
+        self.unparsed = Counter()
+        self.conflicts = Counter()
+
+    def add(self, metar):
+        """Add diagnostics of a METAR decoded with `tolerant=True`
+
+        Args:
+            metar (Metar): Decoded METAR
+        """
+        diagnostics = metar.diagnostics
+        self.reports += 1
+
+        if diagnostics['errors']:
+            self.reportsWithErrors += 1
+            self.errors.update(diagnostics['errors'].keys())
+
+        if diagnostics['unparsed']:
+            self.reportsWithUnparsed += 1
+            self.unparsed.update(diagnostics['unparsed'])
+
+        if diagnostics['conflicts']:
+            self.reportsWithConflicts += 1
+            self.conflicts.update(conflict['field'] for conflict in diagnostics['conflicts'])
+
+    def merge(self, other):
+        """Add diagnostics of another batch (e.g. from another process)
+
+        Args:
+            other (BatchDiagnostics): Diagnostics of another batch
+        """
+        self.reports += other.reports
+        self.reportsWithErrors += other.reportsWithErrors
+        self.reportsWithUnparsed += other.reportsWithUnparsed
+        self.reportsWithConflicts += other.reportsWithConflicts
+        self.errors.update(other.errors)
+        self.unparsed.update(other.unparsed)
+        self.conflicts.update(other.conflicts)
+
+    def summary(self, top=10):
+        """Summary of batch
+
+        Args:
+            top (integer, optional): Number of most common unparsed groups. Defaults to 10.
+
+        Returns:
+            (dict): Dictionnary of counts
+        """
+        return {
+            'reports': self.reports,
+            'reportsWithErrors': self.reportsWithErrors,
+            'reportsWithUnparsed': self.reportsWithUnparsed,
+            'reportsWithConflicts': self.reportsWithConflicts,
+            'errors': dict(self.errors),
+            'conflicts': dict(self.conflicts),
+            'unparsed': dict(self.unparsed.most_common(top))
+        }
+
+
+def decodeTolerant(reports, reference=None, diagnostics=None):
+    """Decode a batch of reports in tolerant mode. Never raises on text.
+
+    Args:
+        reports (iterable): Tuples (code, text)
+        reference (datetime or string, optional): Reference time of observations
+        diagnostics (BatchDiagnostics, optional): Diagnostics to update. Defaults to new one.
+
+    Returns:
+        (tuple): (list of `Metar`, `BatchDiagnostics`)
+    """
+    if diagnostics is None:
+        diagnostics = BatchDiagnostics()
+
+    metars = []
+    for code, text in reports:
+        metar = Metar(code, '' if text is None else text, reference, tolerant=True)
+        diagnostics.add(metar)
+        metars.append(metar)
+
+    return metars, diagnostics
@@ -0,0 +1,300 @@
+"""
+Thread-safe fetcher of METAR
+Author: Matthieu BOUCHET
+
+`MetarFetcher` is shared by threads of a server: METAR are fetched
+through a pool of persistent connections, decoded once and cached.
+Concurrent requests for a station share one upstream fetch.
+
+Thread safety
+-------------
+- Module `metar` has no mutable global state: regular expressions are
+  compiled at import (or cached by `re`, which is thread-safe), and
+  `fetchReport()` doesn't patch `ssl` nor write temp files.
+- A `Metar` is not modified after decoding (except `normalized()` cache,
+  computed again by a concurrent first call). Cached `Metar` are shared
+  between threads and must be read only.
+- Shared state of `MetarFetcher` (cache, requests in flight, statistics)
+  is protected by one lock, held only to read or update dictionnaries:
+  no lock is held during network requests or decoding. Connections are
+  taken from pool by one thread at a time.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+from PythonMETAR.metar import Metar, NOAA_URL, NOAAServError, ReadFileError
+
+
+class _Pending:
+    """Fetch in flight of a station, shared by concurrent requests
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.metar = None
+        self.error = None
+
+
+class ConnectionPool:
+    """Pool of persistent HTTP(S) connections to one server.
+
+    Args:
+        scheme (string): 'http' or 'https'
+        host (string): Host (and port)
+        timeout (float, optional): Timeout of connections (seconds)
+        size (integer, optional): Maximum number of connections. Defaults to 8.
+    """
+
+    def __init__(self, scheme, host, timeout=None, size=8):
+        self.scheme = scheme
+        self.host = host
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._context = None
+
+    def _connect(self):
+        import http.client
+
+        if self.scheme == 'https':
+            if self._context is None:
+                import ssl
+                # Same behaviour as `fetchReport()`, for connections of this pool only
+                self._context = ssl._create_unverified_context()
+            return http.client.HTTPSConnection(self.host, timeout=self.timeout, context=self._context)
+
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def get(self, path):
+        """GET request. An idle connection is reused (request made again on
+        a new connection if closed by server).
+
+        Returns:
+            (tuple): (HTTP status, body)
+
+        Exception raised:
+            - OSError, http.client.HTTPException: Network error
+        """
+        import http.client
+
+        with self._slots:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+
+            for attempt in (0, 1):
+                reused = connection is not None
+                if connection is None:
+                    connection = self._connect()
+
+                try:
+                    connection.request('GET', path)
+                    response = connection.getresponse()
+                    body = response.read()
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = None
+                    if reused and attempt == 0:  # Connection closed by server while idle
+                        continue
+                    raise
+
+                if response.will_close:
+                    connection.close()
+                else:
+                    with self._lock:
+                        self._idle.append(connection)
+
+                return response.status, body
+
+    def close(self):
+        """Close idle connections
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection in idle:
+            connection.close()
+
+
+class MetarFetcher:
+    """Thread-safe fetcher of decoded METAR, with cache and request
+    coalescing.
+
+    Args:
+        source (string, optional): URL template of text file. Defaults to `NOAA_URL`.
+        maxAge (float, optional): Seconds a decoded METAR is kept in cache. Defaults to 300.
+        timeout (float, optional): Timeout of connections (seconds). Defaults to 30.
+        connections (integer, optional): Maximum connections by server. Defaults to 8.
+
+    Attributes
+    -----------
+    - statistics (dict): Counts of `hits` (from cache), `fetches` (upstream
+      requests), `coalesced` (requests waiting for a fetch in flight), `errors`
+    """
+
+    def __init__(self, source=NOAA_URL, maxAge=300, timeout=30, connections=8):
+        self.source = source
+        self.maxAge = maxAge
+        self.timeout = timeout
+        self.connections = connections
+
+        self._lock = threading.Lock()
+        self._cache = {}  # code => (time of fetch, Metar)
+        self._pending = {}  # code => _Pending
+        self._pools = {}  # (scheme, host) => ConnectionPool
+        self.statistics = {'hits': 0, 'fetches': 0, 'coalesced': 0, 'errors': 0}
+
+    def _pool(self, scheme, host):
+        with self._lock:
+            pool = self._pools.get((scheme, host))
+            if pool is None:
+                pool = self._pools[(scheme, host)] = ConnectionPool(
+                    scheme, host, self.timeout, self.connections)
+
+        return pool
+
+    def fetchText(self, code):
+        """Fetch text file of a station through connection pool (no cache,
+        no decoding)
+
+        Returns:
+            (tuple): (Datetime, METAR)
+
+        Exception raised:
+            - NOAAServError
+            - ReadFileError
+        """
+        url = urlsplit(self.source.format(code))
+        path = url.path + ('?' + url.query if url.query else '')
+
+        try:
+            status, body = self._pool(url.scheme, url.netloc).get(path)
+        except Exception:
+            raise NOAAServError(code)
+
+        if status != 200:
+            raise NOAAServError(code, status)
+
+        try:
+            datas = body.decode().splitlines()  # [0] = Datetime ; [1] = METAR
+        except UnicodeDecodeError:
+            raise ReadFileError
+
+        if len(datas) < 2:
+            raise ReadFileError
+
+        return datas[0], datas[1]
+
+    def fetch(self, code):
+        """Fetch and decode METAR of a station (no cache, no coalescing)
+
+        Returns:
+            (Metar): Decoded METAR, with `data_date`
+
+        Exception raised:
+            - NOAAServError
+            - ReadFileError
+        """
+        data_date, text = self.fetchText(code)
+        metar = Metar(code, text, data_date)
+        metar.data_date = data_date
+
+        return metar
+
+    def get(self, code):
+        """Decoded METAR of a station: from cache if fetched less than
+        `maxAge` seconds ago, else fetched. If a fetch of station is in
+        flight, waits for its result.
+
+        Returns:
+            (Metar): Decoded METAR (shared, read only)
+
+        Exception raised:
+            - NOAAServError
+            - ReadFileError
+        """
+        code = code.strip().upper()
+
+        with self._lock:
+            cached = self._cache.get(code)
+            if cached is not None and time.monotonic() - cached[0] < self.maxAge:
+                self.statistics['hits'] += 1
+                return cached[1]
+
+            pending = self._pending.get(code)
+            leader = pending is None
+            if leader:
+                pending = self._pending[code] = _Pending()
+                self.statistics['fetches'] += 1
+            else:
+                self.statistics['coalesced'] += 1
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            if pending.metar is None:  # Leader interrupted (e.g. KeyboardInterrupt): fetch again
+                return self.get(code)
+            return pending.metar
+
+        try:
+            pending.metar = self.fetch(code)
+        except Exception as err:
+            pending.error = err
+        finally:
+            # Also on BaseException, else waiters would wait forever
+            with self._lock:
+                del self._pending[code]
+                if pending.error is not None:
+                    self.statistics['errors'] += 1
+                elif pending.metar is not None:
+                    self._cache[code] = (time.monotonic(), pending.metar)
+            pending.done.set()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.metar
+
+    def getMany(self, codes, workers=8):
+        """Decoded METAR of several stations, requested in parallel threads
+
+        Returns:
+            (tuple): (dictionnary code => `Metar`, dictionnary code => exception)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        codes = list(dict.fromkeys(code.strip().upper() for code in codes))
+        metars, errors = {}, {}
+        if not codes:
+            return metars, errors
+
+        with ThreadPoolExecutor(min(workers, len(codes))) as executor:
+            futures = {code: executor.submit(self.get, code) for code in codes}
+
+        for code, future in futures.items():
+            try:
+                metars[code] = future.result()
+            except Exception as err:
+                errors[code] = err
+
+        return metars, errors
+
+    def invalidate(self, code=None):
+        """Remove a station (all stations if None) from cache
+        """
+        with self._lock:
+            if code is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(code.strip().upper(), None)
+
+    def close(self):
+        """Close idle connections
+        """
+        with self._lock:
+            pools = list(self._pools.values())
+
+        for pool in pools:
+            pool.close()
@@ -0,0 +1,310 @@
+"""
+Fuzzing & differential testing of METAR decoders
+Author: Matthieu BOUCHET
+
+Generate valid and malformed METAR (reproducible with a seed), run an
+old and a new decoder on same inputs and report field-level differences.
+A decoder is a function (text => dictionnary of fields), e.g.
+`metarFields` (properties of `Metar`).
+
+Run with:
+`python -m PythonMETAR.fuzz --old PythonMETAR.fuzz:metarFields --new mymodule:decode --count 1000000`
+"""
+
+import random
+from collections import Counter
+from multiprocessing import Pool
+
+from PythonMETAR.metar import Metar
+
+REFERENCE = '2021/03/29 23:00'
+
+STATIONS = ('LFLY', 'LFPG', 'LFQN', 'EGLL', 'EDDF', 'KJFK', 'CYWG', 'RJTT')
+DESCRIPTORS = ('', '', '', 'VC', 'RE', 'MI', 'PR', 'DR', 'BL', 'FZ', 'BC', 'SH', 'TS')
+PHENOMENA = ('RA', 'SN', 'GR', 'DZ', 'PL', 'GS', 'SG', 'IC', 'UP', 'BR', 'FG', 'HZ',
+             'FU', 'SA', 'DU', 'VA', 'PO', 'SS', 'DS', 'SQ', 'FC')
+CHANGEMENTS = ('NOSIG', 'TEMPO', 'BECMG')
+REMARKS = ('AO2', 'SLP134', 'P0012', 'T10061122', '60025', '52015', 'SF5NS3')
+NOISE = '0123456789/ABCDEFGKMNOPQRSTVXZ+-= '
+
+
+def generateMetar(generator):
+    """Generate a valid METAR
+
+    Args:
+        generator (random.Random): Random generator
+
+    Returns:
+        (string): METAR
+    """
+    r = generator
+    groups = ['METAR'] if r.random() < 0.8 else []
+    groups.append(r.choice(STATIONS))
+    groups.append('{0:02d}{1:02d}{2:02d}Z'.format(r.randint(1, 31), r.randrange(24), r.choice((0, 20, 30, 50))))
+
+    if r.random() < 0.3:
+        groups.append('AUTO')
+
+    # Wind
+    unit = 'KT' if r.random() < 0.85 else 'MPS'
+    speed = r.randrange(0, 40)
+    direction = 'VRB' if r.random() < 0.1 else '{0:03d}'.format(r.randrange(0, 361, 10))
+    gust = 'G{0:02d}'.format(speed + r.randrange(10, 30)) if r.random() < 0.2 else ''
+    groups.append('{0}{1:02d}{2}{3}'.format(direction, speed, gust, unit))
+
+    if direction != 'VRB' and r.random() < 0.15:
+        start = r.randrange(0, 360, 10)
+        groups.append('{0:03d}V{1:03d}'.format(start, (start + r.randrange(60, 180, 10)) % 360))
+
+    cavok = r.random() < 0.25
+    if cavok:
+        groups.append('CAVOK')
+    else:
+        if unit == 'KT' and r.random() < 0.1:
+            groups.append(r.choice(('10SM', '3SM', '3/4SM', 'P6SM')))
+        else:
+            groups.append('{0:04d}'.format(r.choice((9999, 8000, 5000, 3000, 1500, 800, 200))))
+
+        for _ in range(r.choice((0, 0, 1, 2))):
+            groups.append('R{0:02d}{1}/{2}{3:04d}{4}'.format(
+                r.randrange(1, 37), r.choice(('', 'L', 'R', 'C')), r.choice(('', '', 'M', 'P')),
+                r.randrange(50, 2000, 50), r.choice(('', 'U', 'D', 'N'))))
+
+        for _ in range(r.choice((0, 0, 1, 2))):
+            groups.append(r.choice(('', '', '-', '+')) + r.choice(DESCRIPTORS)
+                          + ''.join(r.sample(PHENOMENA, r.choice((1, 1, 2)))))
+
+        layers = r.choice((0, 1, 2, 3))
+        altitudes = sorted(r.sample(range(2, 250), layers))
+        for altitude in altitudes:
+            groups.append('{0}{1:03d}{2}'.format(
+                r.choice(('FEW', 'SCT', 'BKN', 'OVC')), altitude, r.choice(('', '', '', 'CB', 'TCU'))))
+
+        if layers == 0:
+            groups.append(r.choice(('NSC', 'NCD', 'VV///', 'VV{0:03d}'.format(r.randrange(1, 10)))))
+
+    temperature = r.randrange(-30, 40)
+    dewpoint = temperature - r.randrange(0, 15)
+    groups.append('{0}{1:02d}/{2}{3:02d}'.format(
+        'M' if temperature < 0 else '', abs(temperature), 'M' if dewpoint < 0 else '', abs(dewpoint)))
+
+    if r.random() < 0.7:
+        groups.append('Q{0:04d}'.format(r.randrange(960, 1045)))
+    else:
+        groups.append('A{0:04d}'.format(r.randrange(2850, 3100)))
+
+    changement = r.choice(CHANGEMENTS + ('',) * 3)
+    if changement == 'NOSIG':
+        groups.append(changement)
+    elif changement:
+        groups.append('{0} {1:03d}{2:02d}KT'.format(changement, r.randrange(0, 361, 10), r.randrange(40)))
+
+    if r.random() < 0.2:
+        groups.append('RMK')
+        groups.extend(r.sample(REMARKS, r.randrange(1, 4)))
+
+    return ' '.join(groups) + ('=' if r.random() < 0.2 else '')
+
+
+def mutateMetar(text, generator):
+    """Make a METAR malformed: tokens deleted, duplicated, swapped,
+    truncated, or noise inserted.
+
+    Args:
+        text (string): METAR
+        generator (random.Random): Random generator
+
+    Returns:
+        (string): Malformed METAR
+    """
+    r = generator
+    tokens = text.split()
+
+    for _ in range(r.randrange(1, 4)):
+        operation = r.randrange(6)
+        index = r.randrange(len(tokens)) if tokens else 0
+
+        if not tokens or operation == 0:  # Noise token
+            tokens.insert(index, ''.join(r.choice(NOISE) for _ in range(r.randrange(1, 9))))
+        elif operation == 1:  # Deleted token
+            del tokens[index]
+        elif operation == 2:  # Duplicated token
+            tokens.insert(index, tokens[index])
+        elif operation == 3:  # Swapped tokens
+            other = r.randrange(len(tokens))
+            tokens[index], tokens[other] = tokens[other], tokens[index]
+        elif operation == 4:  # Truncated token
+            tokens[index] = tokens[index][:r.randrange(len(tokens[index]) + 1)]
+        else:  # Character replaced
+            token = tokens[index]
+            position = r.randrange(len(token)) if token else 0
+            tokens[index] = token[:position] + r.choice(NOISE) + token[position + 1:]
+
+    return ' '.join(tokens)
+
+
+def generateReports(count, seed=0, malformed=0.3):
+    """Generate reports, reproducible with seed
+
+    Args:
+        count (integer): Number of reports
+        seed (integer, optional): Seed of random generator. Defaults to 0.
+        malformed (float, optional): Ratio of malformed reports. Defaults to 0.3.
+
+    Yields:
+        (string): METAR
+    """
+    generator = random.Random(seed)
+    for _ in range(count):
+        text = generateMetar(generator)
+        if generator.random() < malformed:
+            text = mutateMetar(text, generator)
+        yield text
+
+
+def metarFields(text):
+    """Reference decoder: properties of `Metar` (tolerant), with
+    observation time, ceiling and VMC
+    """
+    metar = Metar('XXXX', text, REFERENCE, tolerant=True)
+    fields = dict(metar.getAll())
+    fields['observationTime'] = metar.observation_time
+    fields['ceiling'] = metar.ceiling
+    fields['vmc'] = metar.vmc
+
+    return fields
+
+
+def _run(decoder, text):
+    """Result of decoder, or ('raised', exception type) if it raises
+    """
+    try:
+        return decoder(text)
+    except Exception as err:
+        return ('raised', type(err).__name__)
+
+
+def compareDecoders(old, new, reports, fields=None):
+    """Run two decoders on same reports and yield differences
+
+    Args:
+        old (callable): Reference decoder (text => dictionnary of fields)
+        new (callable): Decoder tested
+        reports (iterable): METAR
+        fields (iterable, optional): Fields compared. Defaults to fields of both decoders.
+
+    Yields:
+        (dict): Difference {`report`, `field`, `old`, `new`}. Field is None
+        if a decoder raised an exception.
+    """
+    for text in reports:
+        expected = _run(old, text)
+        result = _run(new, text)
+
+        if isinstance(expected, tuple) or isinstance(result, tuple):
+            if expected != result:
+                yield {'report': text, 'field': None, 'old': expected, 'new': result}
+            continue
+
+        keys = fields if fields is not None else sorted(set(expected) | set(result))
+        for key in keys:
+            if expected.get(key) != result.get(key):
+                yield {'report': text, 'field': key, 'old': expected.get(key), 'new': result.get(key)}
+
+
+def _resolve(decoder):
+    """Decoder from 'module:function' string
+    """
+    if callable(decoder):
+        return decoder
+
+    import importlib
+
+    module, _, function = decoder.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def _differentialChunk(task):
+    old, new, count, seed, malformed, fields, examples = task
+    old, new = _resolve(old), _resolve(new)
+
+    counts = Counter()
+    samples = []
+    for difference in compareDecoders(old, new, generateReports(count, seed, malformed), fields):
+        counts[difference['field']] += 1
+        if len(samples) < examples:
+            samples.append(difference)
+
+    return counts, samples
+
+
+def differential(old, new, count=10000, seed=0, malformed=0.3, fields=None,
+                 processes=1, chunk=10000, examples=10):
+    """Differential testing of two decoders on generated reports
+
+    Args:
+        old (callable or string): Reference decoder, or 'module:function'
+        new (callable or string): Decoder tested, or 'module:function'
+        count (integer, optional): Number of reports. Defaults to 10000.
+        seed (integer, optional): Seed (chunk k uses seed + k). Defaults to 0.
+        malformed (float, optional): Ratio of malformed reports. Defaults to 0.3.
+        fields (iterable, optional): Fields compared. Defaults to all.
+        processes (integer, optional): Worker processes (decoders given as
+        'module:function' strings if more than 1). Defaults to 1.
+        chunk (integer, optional): Reports per chunk. Defaults to 10000.
+        examples (integer, optional): Differences kept as examples. Defaults to 10.
+
+    Returns:
+        (dict): {`reports`, `differences` (Counter by field), `examples` (list)}
+    """
+    fields = None if fields is None else tuple(fields)
+    tasks = [(old, new, min(chunk, count - start), seed + index, malformed, fields, examples)
+             for index, start in enumerate(range(0, count, chunk))]
+
+    if processes == 1:
+        results = map(_differentialChunk, tasks)
+    else:
+        pool = Pool(processes)
+        results = pool.imap(_differentialChunk, tasks)
+
+    differences = Counter()
+    samples = []
+    try:
+        for counts, chunkSamples in results:
+            differences.update(counts)
+            samples.extend(chunkSamples[:examples - len(samples)])
+    finally:
+        if processes != 1:
+            pool.close()
+            pool.join()
+
+    return {'reports': count, 'differences': differences, 'examples': samples}
+
+
+def main(arguments=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Differential testing of METAR decoders')
+    parser.add_argument('--old', default='PythonMETAR.fuzz:metarFields', help='Reference decoder (module:function)')
+    parser.add_argument('--new', required=True, help='Decoder tested (module:function)')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--malformed', type=float, default=0.3)
+    parser.add_argument('--field', action='append', dest='fields', help='Field compared (repeatable)')
+    parser.add_argument('--processes', type=int, default=1)
+    args = parser.parse_args(arguments)
+
+    result = differential(args.old, args.new, args.count, args.seed, args.malformed,
+                          args.fields, args.processes)
+
+    print('{0} reports, {1} differences'.format(result['reports'], sum(result['differences'].values())))
+    for field, number in result['differences'].most_common():
+        print('  {0}: {1}'.format(field, number))
+    for difference in result['examples']:
+        print(difference)
+
+    return 1 if result['differences'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,500 @@
+"""
+Golden corpus of decoded METAR
+Author: Matthieu BOUCHET
+
+`golden.jsonl.gz` stores a versioned corpus of reports (edge cases, and
+valid & malformed reports generated by `fuzz`) with their decoded output
+(`getAll()` of tolerant decoding) when corpus was built. The runner
+checks that decoding of every report is unchanged, and measures decoding
+time by class of report, to compare with a baseline of same machine.
+
+Stored outputs are a snapshot, not a specification: outputs of edge
+cases are also checked against values reviewed by hand (`REVIEWED`).
+Fields known to be decoded wrong are listed in `KNOWN_BUGS`: their
+change is reported apart, as a possible fix, not as a regression.
+
+An optimisation is accepted if `check` finds no output change and
+`timings --baseline` no slowdown.
+
+Corpus is shipped in source distribution (and repository) only.
+
+Run with:
+`python -m PythonMETAR.golden check`
+`python -m PythonMETAR.golden timings --save before.json` then `--baseline before.json`
+`python -m PythonMETAR.golden update` (intended output change, review diff of outputs)
+"""
+
+import gzip
+import json
+import os
+import time
+from collections import Counter
+
+from PythonMETAR.metar import Metar
+from PythonMETAR.cli import airportCode
+from PythonMETAR.benchmark import SAMPLES
+from PythonMETAR.fuzz import REFERENCE, generateMetar, mutateMetar
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden.jsonl.gz')
+
+CORPUS_VERSION = 2  # Version 2: `getAll()` outputs, known bugs of records
+
+EDGE_CASES = SAMPLES + (
+    # Samples of `metar` module
+    'METAR LFPG 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG',
+    'METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D -SN BLSN BKN008 OVC040 M05/M08 A2992 REFZRA WS RWY36 RMK SF5NS3 SLP134',
+    'LFLY 231830Z AUTO 19012KT BKN008 06/02 Q0997',
+    # Headers
+    'SPECI LFPG 292215Z 24015KT 0800 R27L/0600 FG VV002 05/05 Q1001',
+    'METAR COR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000',
+    'METAR LFLY 292200Z NIL=',
+    # Wind
+    'METAR LFLY 292200Z 00000KT 9999 NSC 06/M00 Q1000',
+    'METAR UUEE 292200Z 27008MPS 5000 -SN BKN015 M02/M04 Q1008 R24L/590230',
+    'METAR KDEN 292153Z 27045G65KT 1SM BLDU OVC020 M01/M07 A2985',
+    'METAR LFLY 292200Z /////KT 9999 NCD 06/M00 Q1000',
+    # Visibility
+    'METAR KBOS 292154Z 04012KT 1 1/2SM -RA BR OVC006 08/07 A2990',
+    'METAR KBOS 292154Z 04012KT M1/4SM FG VV001 08/08 A2990',
+    'METAR KBOS 292154Z 04012KT 0/0SM FG VV000 08/08 A2990',
+    'METAR EGLL 292150Z 24012KT 0350 1200NE R27L/0500N R27R/0450D FG BKN001 06/06 Q1008',
+    'METAR LFLY 292200Z AUTO 17005KT //// // ////// 06/M00 Q1000',
+    # RVR
+    'METAR LFPG 292200Z 24005KT 0400 R27L/M0050 R26R/P2000 R09/0600V1000U R08C/0450V/1200 R01///// FG VV001 06/06 Q1000',
+    'METAR KJFK 292151Z 31005KT 1/4SM R04R/1800V4000FT R22L/P6000FT/U FG VV002 06/06 A2990',
+    # Weather & clouds
+    'METAR LFMN 292200Z 18020KT 3000 +TSRAGR VCSH FEW015 SCT025CB BKN040TCU 22/19 Q1005 RETS',
+    'METAR EFHK 292150Z 33015KT 0900 +SHSNPL FZFG BKN004 OVC010 M03/M04 Q0990 RESN',
+    'METAR LFLY 292200Z AUTO 17012KT 9999 FEW///TCU SCT030/// ////// 06/M00 Q1000',
+    # Temperatures & pressure
+    'METAR BIRK 292200Z 03025KT 9999 FEW030 M12/M18 Q0960',
+    'METAR OEJN 291200Z 33010KT 6000 HZ NSC 45/08 Q1002',
+    'METAR LFLY 292200Z AUTO 17005KT CAVOK ///// Q////',
+    # Trends & remarks
+    'METAR EDDF 292150Z 05004MPS 9999 FEW040 12/03 Q1021 BECMG FM2230 TL2330 3000 BR',
+    'METAR KJFK 292251Z 31012G20KT 10SM FEW250 M01/M12 A3012 RMK AO2 PK WND 32035/2220 SLP200 P0002 60012 T10061122 52015 $',
+    # Malformed
+    '',
+    'METAR',
+    'LFLY 29220Z AUTO',
+    'METAR LFLY 292200Z 17012KT 9999 9999 CAVOK CAVOK 06/M00 06/M00 Q1000 Q1017',
+    'METAR ???? 999999Z ABCDEFG 1234 =',
+)
+# Hand-written reports (edge cases of each analyzer)
+
+_LAYERS = {'FEW': ('Few', 1, 2), 'SCT': ('Scattered', 3, 4), 'BKN': ('Broken', 5, 7),
+           'OVC': ('Overcast', 8, 8), 'VV': ('Invisible Sky', None, None)}
+
+
+def _layer(code, altitude, cb=False, tcu=False):
+    meaning, oktaMin, oktaMax = _LAYERS[code]
+    return {'code': code, 'meaning': meaning, 'oktaMin': oktaMin, 'oktaMax': oktaMax,
+            'altitude': altitude, 'presenceCB': cb, 'presenceTCU': tcu}
+
+
+def _rvr(runway, visibility, qualifier=None, maxVisibility=None, unit='m', tendency=None):
+    return {'runway': runway, 'visibility': visibility, 'qualifier': qualifier,
+            'maxVisibility': maxVisibility, 'maxQualifier': None, 'unit': unit, 'tendency': tendency}
+
+
+def _wind(direction, speed, gust=None, variation=None):
+    return {'direction': direction, 'speed': speed, 'gust': gust, 'variation': variation}
+
+
+def _weather(intensity, prefix, weather):
+    return {'intensity': intensity, 'prefix': prefix, 'weather': weather}
+
+
+NO_CHANGEMENTS = {'TEMPO': None, 'BECMG': None, 'GRADU': None, 'RAPID': None, 'INTER': None, 'TEND': None}
+
+REVIEWED = {
+    'METAR LFPG 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG': {
+        'auto': True, 'wind': _wind('VRB', 3), 'visibility': 9999, 'weather': None, 'cloud': None,
+        'changements': None},
+    'METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D -SN BLSN BKN008 OVC040 M05/M08 A2992 REFZRA WS RWY36 RMK SF5NS3 SLP134': {
+        'wind': _wind(300, 15, 25), 'rvr': [_rvr('36', 4000, unit='ft', tendency='D')],
+        'weather': _weather(False, ['Blowing', 'Freezing', 'Recent'], ['Rain', 'Snow']),
+        'cloud': [_layer('BKN', 800), _layer('OVC', 4000)],
+        'temperatures': {'temperature': -5, 'dewpoint': -8}, 'qnh': 29.92},
+    'LFLY 231830Z AUTO 19012KT BKN008 06/02 Q0997': {
+        'dateTime': ['23', '18', '30'], 'auto': True, 'visibility': None, 'cloud': [_layer('BKN', 800)]},
+    'SPECI LFPG 292215Z 24015KT 0800 R27L/0600 FG VV002 05/05 Q1001': {
+        'dateTime': ['29', '22', '15'], 'visibility': 800, 'rvr': [_rvr('27L', 600)],
+        'weather': _weather(None, None, ['Fog']), 'cloud': [_layer('VV', 200)]},
+    'METAR COR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000': {
+        'dateTime': ['29', '22', '00'], 'auto': True, 'visibility': 9999, 'changements': NO_CHANGEMENTS},
+    'METAR LFLY 292200Z NIL=': {
+        'dateTime': ['29', '22', '00'], 'wind': None, 'visibility': None, 'temperatures': None, 'qnh': None},
+    'METAR LFLY 292200Z 00000KT 9999 NSC 06/M00 Q1000': {
+        'wind': _wind(0, 0), 'visibility': 9999, 'cloud': None},
+    'METAR UUEE 292200Z 27008MPS 5000 -SN BKN015 M02/M04 Q1008 R24L/590230': {
+        'wind': _wind(270, 8), 'visibility': 5000, 'weather': _weather(False, None, ['Snow']),
+        'rvr': None},
+    'METAR KDEN 292153Z 27045G65KT 1SM BLDU OVC020 M01/M07 A2985': {
+        'wind': _wind(270, 45, 65), 'weather': _weather(None, ['Blowing'], ['Dust']),
+        'cloud': [_layer('OVC', 2000)], 'qnh': 29.85},
+    'METAR LFLY 292200Z /////KT 9999 NCD 06/M00 Q1000': {
+        'wind': None, 'visibility': 9999, 'cloud': None},
+    # Statute miles are not `visibility` (see `units.statuteMiles()`)
+    'METAR KBOS 292154Z 04012KT 1 1/2SM -RA BR OVC006 08/07 A2990': {
+        'visibility': None, 'weather': _weather(False, None, ['Rain', 'Brume']),
+        'cloud': [_layer('OVC', 600)], 'qnh': 29.9},
+    'METAR KBOS 292154Z 04012KT M1/4SM FG VV001 08/08 A2990': {
+        'visibility': None, 'weather': _weather(None, None, ['Fog']), 'cloud': [_layer('VV', 100)]},
+    'METAR KBOS 292154Z 04012KT 0/0SM FG VV000 08/08 A2990': {
+        'visibility': None, 'cloud': [_layer('VV', 0)]},
+    'METAR EGLL 292150Z 24012KT 0350 1200NE R27L/0500N R27R/0450D FG BKN001 06/06 Q1008': {
+        'visibility': 350, 'rvr': [_rvr('27L', 500, tendency='N'), _rvr('27R', 450, tendency='D')],
+        'cloud': [_layer('BKN', 100)]},
+    'METAR LFLY 292200Z AUTO 17005KT //// // ////// 06/M00 Q1000': {
+        'wind': _wind(170, 5), 'visibility': None, 'weather': None, 'cloud': None,
+        'temperatures': {'temperature': 6, 'dewpoint': 0}},
+    # R08C/0450V/1200 is malformed (not decoded), R01///// not measured
+    'METAR LFPG 292200Z 24005KT 0400 R27L/M0050 R26R/P2000 R09/0600V1000U R08C/0450V/1200 R01///// FG VV001 06/06 Q1000': {
+        'wind': _wind(240, 5), 'visibility': 400,
+        'rvr': [_rvr('27L', 50, 'M'), _rvr('26R', 2000, 'P'), _rvr('09', 600, maxVisibility=1000, tendency='U')],
+        'cloud': [_layer('VV', 100)]},
+    'METAR KJFK 292151Z 31005KT 1/4SM R04R/1800V4000FT R22L/P6000FT/U FG VV002 06/06 A2990': {
+        'wind': _wind(310, 5),
+        'rvr': [_rvr('04R', 1800, maxVisibility=4000, unit='ft'), _rvr('22L', 6000, 'P', unit='ft', tendency='U')]},
+    # Recent weather (RETS, RESN) is merged in weather, with prefix 'Recent'
+    'METAR LFMN 292200Z 18020KT 3000 +TSRAGR VCSH FEW015 SCT025CB BKN040TCU 22/19 Q1005 RETS': {
+        'visibility': 3000,
+        'weather': _weather(True, ['in Vicinity', 'Recent', 'Shower'], ['Rain', 'Hail', 'Thunderstorm']),
+        'cloud': [_layer('FEW', 1500), _layer('SCT', 2500, cb=True), _layer('BKN', 4000, tcu=True)]},
+    'METAR EFHK 292150Z 33015KT 0900 +SHSNPL FZFG BKN004 OVC010 M03/M04 Q0990 RESN': {
+        'visibility': 900,
+        'weather': _weather(True, ['Freezing', 'Recent', 'Shower'], ['Snow', 'Ice Pellets', 'Fog']),
+        'cloud': [_layer('BKN', 400), _layer('OVC', 1000)], 'temperatures': {'temperature': -3, 'dewpoint': -4}},
+    'METAR LFLY 292200Z AUTO 17012KT 9999 FEW///TCU SCT030/// ////// 06/M00 Q1000': {
+        'visibility': 9999, 'cloud': [_layer('FEW', None, tcu=True), _layer('SCT', 3000)]},
+    'METAR BIRK 292200Z 03025KT 9999 FEW030 M12/M18 Q0960': {
+        'temperatures': {'temperature': -12, 'dewpoint': -18}, 'qnh': 960},
+    'METAR OEJN 291200Z 33010KT 6000 HZ NSC 45/08 Q1002': {
+        'weather': _weather(None, None, ['Haze']), 'cloud': None, 'temperatures': {'temperature': 45, 'dewpoint': 8}},
+    'METAR LFLY 292200Z AUTO 17005KT CAVOK ///// Q////': {
+        'visibility': 9999, 'temperatures': None, 'qnh': None},
+    'METAR EDDF 292150Z 05004MPS 9999 FEW040 12/03 Q1021 BECMG FM2230 TL2330 3000 BR': {
+        'visibility': 9999, 'weather': None, 'changements': dict(NO_CHANGEMENTS, BECMG='FM2230 TL2330 3000 BR')},
+    'METAR KJFK 292251Z 31012G20KT 10SM FEW250 M01/M12 A3012 RMK AO2 PK WND 32035/2220 SLP200 P0002 60012 T10061122 52015 $': {
+        'qnh': 30.12,
+        'remarks': {'text': 'AO2 PK WND 32035/2220 SLP200 P0002 60012 T10061122 52015 $', 'station': 'AO2',
+                    'seaLevelPressure': 1020.0, 'hourlyPrecipitation': 0.02, 'precipitation6h': 0.12,
+                    'precipitation24h': None, 'temperature': -0.6, 'dewpoint': -12.2,
+                    'maxTemperature6h': None, 'minTemperature6h': None, 'maxTemperature24h': None,
+                    'minTemperature24h': None, 'pressureTendency': {'code': 2, 'change': 1.5},
+                    'unparsed': ['PK', 'WND', '32035/2220', '$']}},
+    '': {'dateTime': None, 'wind': None, 'observationTime': None},
+    'METAR': {'dateTime': None, 'wind': None, 'observationTime': None},
+    'LFLY 29220Z AUTO': {'dateTime': None, 'auto': True, 'observationTime': None},
+    # Repeated groups: first one is decoded (conflicts in diagnostics)
+    'METAR LFLY 292200Z 17012KT 9999 9999 CAVOK CAVOK 06/M00 06/M00 Q1000 Q1017': {
+        'visibility': 9999, 'temperatures': {'temperature': 6, 'dewpoint': 0}, 'qnh': 1000},
+    'METAR ???? 999999Z ABCDEFG 1234 =': {
+        'dateTime': ['99', '99', '99'], 'observationTime': None, 'wind': None, 'visibility': None,
+        'weather': None, 'cloud': None},
+}
+# Edge case => fields of `getAll()` (JSON-compatible) checked by hand.
+# Samples of `benchmark` are checked by unit tests.
+
+KNOWN_BUGS = {
+    # TCU after layer altitude (BKN040TCU) not detected: `parseCloud()` reads 2
+    # characters after altitude (CB), as TAF periods give it (see `taf.decodeGroups()`)
+    'METAR LFMN 292200Z 18020KT 3000 +TSRAGR VCSH FEW015 SCT025CB BKN040TCU 22/19 Q1005 RETS': ('cloud',),
+    # Layer without altitude (FEW///TCU) dropped: layer altitudes are integers
+    # (`cloudCeiling()`, VMC), only VV/// has no altitude
+    'METAR LFLY 292200Z AUTO 17012KT 9999 FEW///TCU SCT030/// ////// 06/M00 Q1000': ('cloud',),
+}
+# Edge case => fields of `REVIEWED` decoded wrong by current decoder, limitations
+# of analyzers only: a decoding error which can be fixed is fixed, not listed
+
+CLASSES = ('edge', 'malformed', 'remarks', 'rvr', 'us', 'trend', 'cavok', 'plain')
+
+
+def reportClass(text):
+    """Class of a generated report (for timings), first class matching
+    in order remarks, rvr (RVR group), us (statute miles or inches of
+    mercury), trend (TEMPO/BECMG), cavok, plain
+    """
+    groups = text.split()
+    if 'RMK' in groups:
+        return 'remarks'
+    if any(group[:1] == 'R' and '/' in group and group[1:3].isdigit() for group in groups):
+        return 'rvr'
+    if any(group.endswith('SM') or (group[:1] == 'A' and group[1:].isdigit()) for group in groups):
+        return 'us'
+    if 'TEMPO' in groups or 'BECMG' in groups:
+        return 'trend'
+    if 'CAVOK' in groups:
+        return 'cavok'
+    return 'plain'
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def decode(code, text):
+    """Decoded output of a report, as stored in corpus
+
+    Returns:
+        (dict): JSON-compatible `getAll()` of tolerant decoding (observation
+        time in ISO 8601), {'raised': exception type} if decoding raises
+    """
+    try:
+        metar = Metar(code, text, REFERENCE, tolerant=True)
+    except Exception as err:
+        return {'raised': type(err).__name__}
+
+    return json.loads(json.dumps(metar.getAll(), default=_isoformat))
+
+
+def checkReviewed():
+    """Compare outputs of edge cases with `REVIEWED` values
+
+    Returns:
+        (tuple): (wrong, fixed), lists of dictionnaries `text`, `field`,
+        `reviewed`, `decoded`: fields decoded wrong (not in `KNOWN_BUGS`),
+        and fields of `KNOWN_BUGS` now decoded right (to remove from list)
+    """
+    wrong, fixed = [], []
+    for text, fields in REVIEWED.items():
+        decoded = decode(airportCode(text) or 'XXXX', text)
+        bugs = KNOWN_BUGS.get(text, ())
+        for field, reviewed in fields.items():
+            mismatch = {'text': text, 'field': field, 'reviewed': reviewed, 'decoded': decoded.get(field)}
+            if field in bugs:
+                if decoded.get(field) == reviewed:
+                    fixed.append(mismatch)
+            elif decoded.get(field) != reviewed:
+                wrong.append(mismatch)
+
+    return wrong, fixed
+
+
+def buildCorpus(count=3000, seed=0, malformed=0.3):
+    """Build a corpus: `EDGE_CASES` and reports of `fuzz` generator,
+    with their output by current decoder
+
+    Args:
+        count (integer, optional): Number of generated reports. Defaults to 3000.
+        seed (integer, optional): Seed of generator. Defaults to 0.
+        malformed (float, optional): Ratio of malformed generated reports. Defaults to 0.3.
+
+    Returns:
+        (list): Records (dict): `class`, `code`, `text`, `expected`
+    """
+    import random
+
+    reports = [('edge', text) for text in EDGE_CASES]
+    generator = random.Random(seed)
+    for _ in range(count):
+        text = generateMetar(generator)
+        if generator.random() < malformed:
+            reports.append(('malformed', mutateMetar(text, generator)))
+        else:
+            reports.append((reportClass(text), text))
+
+    return [{'class': kind, 'code': airportCode(text) or 'XXXX', 'text': text} for kind, text in reports]
+
+
+def updateCorpus(records):
+    """Set `expected` of records to output of current decoder, and
+    `knownBugs` (fields of `KNOWN_BUGS`) of edge cases
+
+    Returns:
+        (list): Records
+    """
+    for record in records:
+        record['expected'] = decode(record['code'], record['text'])
+        bugs = KNOWN_BUGS.get(record['text']) if record['class'] == 'edge' else None
+        if bugs:
+            record['knownBugs'] = list(bugs)
+        else:
+            record.pop('knownBugs', None)
+
+    return records
+
+
+def writeCorpus(records, path=CORPUS):
+    """Write corpus (gzip JSON lines, first line is header)
+    """
+    lines = [json.dumps({'version': CORPUS_VERSION, 'reference': REFERENCE, 'count': len(records)})]
+    lines.extend(json.dumps(record, sort_keys=True) for record in records)
+
+    with open(path, 'wb') as file:
+        with gzip.GzipFile(fileobj=file, mode='wb', mtime=0) as binary:  # Same bytes for same corpus
+            binary.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def readCorpus(path=CORPUS):
+    """Read corpus
+
+    Returns:
+        (list): Records
+
+    Exception raised:
+        - ValueError: If corpus version is not supported
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        header = json.loads(file.readline())
+        if header['version'] > CORPUS_VERSION:
+            raise ValueError('Corpus version {0} not supported'.format(header['version']))
+
+        return [json.loads(line) for line in file]
+
+
+def checkCorpus(records):
+    """Decode every report and compare with expected output
+
+    Returns:
+        (list): Mismatches (dict): `index`, `class`, `text`, `fields`
+        (field => (expected, decoded)) and `knownBugs` (changed fields of
+        record `knownBugs`, same format). No output changed if every
+        `fields` is empty.
+    """
+    mismatches = []
+    for index, record in enumerate(records):
+        decoded = decode(record['code'], record['text'])
+        expected = record['expected']
+        if decoded != expected:
+            bugs = record.get('knownBugs', ())
+            fields = {field: (expected.get(field), decoded.get(field))
+                      for field in sorted(set(expected) | set(decoded))
+                      if expected.get(field) != decoded.get(field)}
+            mismatches.append({'index': index, 'class': record['class'], 'text': record['text'],
+                               'fields': {field: values for field, values in fields.items() if field not in bugs},
+                               'knownBugs': {field: values for field, values in fields.items() if field in bugs}})
+
+    return mismatches
+
+
+def timeCorpus(records, repeat=10):
+    """Decoding time by class of report: best of `repeat` runs, classes
+    run in turn and garbage collector disabled, to limit noise of other
+    processes
+
+    Returns:
+        (dict): Class => microseconds per report
+    """
+    import gc
+
+    byClass = {}
+    for record in records:
+        byClass.setdefault(record['class'], []).append((record['code'], record['text']))
+
+    best = {}
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for kind, reports in byClass.items():
+                start = time.perf_counter()
+                for code, text in reports:
+                    Metar(code, text, REFERENCE, tolerant=True)
+                elapsed = time.perf_counter() - start
+                best[kind] = min(best.get(kind, elapsed), elapsed)
+    finally:
+        if enabled:
+            gc.enable()
+
+    return {kind: best[kind] / len(byClass[kind]) * 1e6 for kind in byClass}
+
+
+def compareTimings(baseline, timings, tolerance=0.1):
+    """Classes slower than baseline
+
+    Args:
+        baseline (dict): Class => microseconds per report (of same machine)
+        timings (dict): Class => microseconds per report
+        tolerance (float, optional): Relative slowdown accepted (noise). Defaults to 0.1.
+
+    Returns:
+        (dict): Class => (baseline, current) of classes slower than
+        baseline x (1 + tolerance)
+    """
+    return {kind: (baseline[kind], current) for kind, current in timings.items()
+            if kind in baseline and current > baseline[kind] * (1 + tolerance)}
+
+
+def main(arguments=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='PythonMETAR.golden', description='Golden corpus of decoded METAR')
+    parser.add_argument('command', nargs='?', choices=('check', 'timings', 'update', 'build'), default='check',
+                        help='check outputs (default), measure timings, update expected outputs, '
+                             'build a new corpus')
+    parser.add_argument('--corpus', default=CORPUS, help='Corpus file')
+    parser.add_argument('--count', type=int, default=3000, help='Generated reports (build)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of generator (build)')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs by class (timings)')
+    parser.add_argument('--save', help='Save timings (JSON)')
+    parser.add_argument('--baseline', help='Timings to compare with (JSON, same machine)')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative slowdown accepted')
+    args = parser.parse_args(arguments)
+
+    if args.command in ('build', 'update'):
+        wrong, _ = checkReviewed()
+        if wrong:  # Outputs not reviewed as right would be stored as expected
+            for item in wrong:
+                print('Reviewed value differs: {field} of {text!r}: reviewed {reviewed!r}, decoded {decoded!r}'.format(**item))
+            print('Fix decoder, REVIEWED or KNOWN_BUGS first')
+            return 1
+
+        records = buildCorpus(args.count, args.seed) if args.command == 'build' else readCorpus(args.corpus)
+        writeCorpus(updateCorpus(records), args.corpus)
+        print('{0} reports written in {1}: {2}'.format(
+            len(records), args.corpus, dict(Counter(record['class'] for record in records))))
+        return 0
+
+    records = readCorpus(args.corpus)
+
+    if args.command == 'check':
+        mismatches = checkCorpus(records)
+        changed = [mismatch for mismatch in mismatches if mismatch['fields']]
+        for mismatch in changed[:20]:
+            print('#{0} [{1}] {2}'.format(mismatch['index'], mismatch['class'], mismatch['text']))
+            for field, (expected, decoded) in mismatch['fields'].items():
+                print('    {0}: expected {1!r}, decoded {2!r}'.format(field, expected, decoded))
+
+        for mismatch in mismatches:
+            for field in mismatch['knownBugs']:
+                print('Known bug changed (fixed?): {0} of {1!r}'.format(field, mismatch['text']))
+
+        wrong, fixed = checkReviewed()
+        for item in wrong:
+            print('Reviewed value differs: {field} of {text!r}: reviewed {reviewed!r}, decoded {decoded!r}'.format(**item))
+        for item in fixed:
+            print('Known bug fixed, remove it from KNOWN_BUGS: {field} of {text!r}'.format(**item))
+
+        print('{0} reports checked, {1} outputs changed, {2} reviewed values differ'.format(
+            len(records), len(changed), len(wrong)))
+        return 1 if changed or wrong else 0
+
+    timings = timeCorpus(records, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    for kind in sorted(timings, key=CLASSES.index):
+        line = '{0:<10} {1:8.1f} us/report'.format(kind, timings[kind])
+        if baseline and kind in baseline:
+            line += '  (baseline {0:.1f}, {1:+.1%})'.format(baseline[kind], timings[kind] / baseline[kind] - 1)
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(timings, file, indent=1)
+
+    if baseline:
+        slower = compareTimings(baseline, timings, args.tolerance)
+        if slower:
+            print('Slower than baseline: {0}'.format(', '.join(sorted(slower))))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
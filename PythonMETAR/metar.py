@@ -8,13 +8,52 @@ For documentation, you can visit : https://www.link.url
 and read the ReadMe
 """
 
-from http.client import NOT_EXTENDED, PRECONDITION_FAILED
-import urllib.request as url
-import ssl
 import re
-import copy
+from datetime import datetime, timedelta, timezone
 
-ssl._create_default_https_context = ssl._create_unverified_context
+from PythonMETAR.codes import (CLOUD_CLASSIFICATIONS, CLOUD_COVERS, CLOUD_MEANINGS,
+                               PREFIX_CLASSIFICATIONS, WEATHER_CLASSIFICATIONS,
+                               RVR_QUALIFIERS, RVR_TENDENCIES, RVR_UNITS)
+from PythonMETAR.codes import runway as runwayCategory
+
+# Network modules (urllib.request, ssl) are imported lazily by
+# `text_recover()`: decoding a METAR text only loads what parsing needs.
+
+NOAA_URL = "https://tgftp.nws.noaa.gov/data/observations/metar/stations/{}.TXT"
+
+REGEX_REMARKS = re.compile(r' RMK(?= |=|$)')
+
+REGEX_RVR = re.compile(r'(?<!\S)R(\d{2}[LCR]?)/([MP]?)(\d{4})(?:V([MP]?)(\d{4}))?(FT)?/?([UDN]?)(?![^\s=])')
+# Whole RVR group: runway, qualifier, visibility, [V qualifier, maximum], [FT], [tendency]
+# (not runway state groups, e.g. R24L/590230)
+
+REGEX_VARIATION = r'(?<!\S)\d{3}V\d{3}(?!\S)'
+# Whole wind variation group (not inside RVR groups, e.g. R09/0600V1000U)
+
+_WEATHER_DESCRIPTORS = 'MI|PR|DR|BL|FZ|BC|SH|TS|XX'
+_WEATHER_PHENOMENA = 'RA|SN|GR|DZ|PL|GS|SG|IC|UP|BR|FG|HZ|FU|SA|DU|VA|PO|SS|DS|SQ|FC|TS'
+
+REGEX_GROUPS = re.compile(r'''^(?:
+    (?P<type>METAR|SPECI|AUTO|COR|NIL)
+    |(?P<dateTime>\d{6}Z)
+    |(?P<wind>(?:\d{3}|VRB|///)(?:\d{2,3}|//)(?:G\d{2,3})?(?:KT|MPS))
+    |(?P<variation>\d{3}V\d{3})
+    |(?P<cavok>CAVOK)
+    |(?P<visibility>\d{4}(?:[NSEW]{1,2}|NDV)?|////|[MP]?(?:\d{1,2}|\d/\d{1,2})SM)
+    |(?P<rvr>R\d{2}[LCR]?/(?:[MP]?\d{4}(?:V[MP]?\d{4})?(?:FT)?/?[UDN]?|////))
+    |(?P<weather>[-+]?(?:VC|RE)?(?:(?:'''+_WEATHER_DESCRIPTORS+r''')(?:'''+_WEATHER_PHENOMENA+r''')*|(?:'''+_WEATHER_PHENOMENA+r''')+)|NSW)
+    |(?P<cloud>(?:FEW|SCT|BKN|OVC)(?:\d{3}|///)(?:CB|TCU|///)?|VV(?:\d{3}|///)|NSC|NCD|SKC|CLR)
+    |(?P<temperatures>M?\d{2}/(?:M?\d{2})?|/////)
+    |(?P<qnh>Q(?:\d{4}|////))
+    |(?P<altimeter>A(?:\d{4}|////))
+    |(?P<windShear>WS|ALL|RWY|RWY\d{2}[LCR]?|R\d{2}[LCR]?)
+    |(?P<trend>NOSIG)
+    |=
+)=?$''', re.VERBOSE)
+# Groups of main part of METAR, by kind (see `Metar.analyzeDiagnostics()`)
+
+SINGLE_GROUPS = ('dateTime', 'wind', 'variation', 'temperatures', 'qnh', 'altimeter')
+# Kinds of groups present once at most in a METAR
 
 
 class Metar:
@@ -50,16 +89,49 @@ class Metar:
     - qnh (integer OR float): Information of QNH (integer if hPA, float if inHG)
     - properties(dictionary): Dictionnary of METAR's attribute
     - vmc(dictionnary)
+    - observation_time (datetime): Timezone-aware (UTC) observation time
+    - ceiling (integer): Altitude of lowest BKN or OVC layer (in feet)
+    - remarks (dictionnary): Decoded remarks (RMK section), None if no remarks
+    - diagnostics (dictionnary): Diagnostics of tolerant decoding (see
+      `analyzeDiagnostics()`), None if not tolerant
     """
 
-    def __init__(self, code, text=None):
+    ANALYZERS = (
+        ('changements', 'analyzeChangements'),
+        ('auto', 'analyzeAuto'),
+        ('date_time', 'analyzeDateTime'),
+        ('observation_time', 'analyzeObservationTime'),
+        ('wind', 'analyzeWind'),
+        ('rvr', 'analyzeRVR'),
+        ('weather', 'analyzeWeather'),
+        ('cloud', 'analyzeCloud'),
+        ('ceiling', 'analyzeCeiling'),
+        ('temperatures', 'analyzeTemperatures'),
+        ('qnh', 'analyzeQNH'),
+        ('visibility', 'analyzeVisibility'),
+        ('vmc', 'verifyVMC'),
+        ('remarks', 'analyzeRemarks'),
+    )
+    # (attribute, method) in order of analysis
+
+    def __init__(self, code, text=None, reference=None, tolerant=False):
         """Constructor of class
 
         Args
         -----
             code (string): OACI code of airport searched
+            text (string, optional): METAR. Recovered from NOAA if None
+            reference (datetime or string, optional): Reference time used to
+            infer month and year of observation. Defaults to `data_date`,
+            or current UTC time if text entered manually.
+            tolerant (boolean, optional): If True, decoding never raises on
+            text: a field which can't be decoded is None, and problems are
+            recorded in `diagnostics` attribute. Defaults to False.
         """
         self.airport = code
+        self.reference = reference
+        self.tolerant = tolerant
+        self.diagnostics = None
 
         if text is None:
             text = self.text_recover()
@@ -70,18 +142,34 @@ class Metar:
             self.data_date = None
             self.metar = text
 
-        self.metarWithoutChangements = self.metar
-        self.changements = self.analyzeChangements()  # delcare self.metarAnalysis
-        self.auto = self.analyzeAuto()
-        self.date_time = self.analyzeDateTime()
-        self.wind = self.analyzeWind()
-        self.rvr = self.analyzeRVR()
-        self.weather = self.analyzeWeather()
-        self.cloud = self.analyzeCloud()
-        self.temperatures = self.analyzeTemperatures()
-        self.qnh = self.analyzeQNH()
-        self.visibility = self.analyzeVisibility()
-        self.vmc = self.verifyVMC()
+        if tolerant:
+            self.diagnostics = {'errors': {}, 'unparsed': (), 'conflicts': ()}
+
+            if not isinstance(self.metar, str):
+                self.diagnostics['errors']['metar'] = 'Text of type {0} converted'.format(
+                    type(self.metar).__name__)
+                if isinstance(self.metar, (bytes, bytearray, memoryview)):
+                    self.metar = bytes(self.metar).decode('latin-1')
+                else:
+                    self.metar = '' if self.metar is None else str(self.metar)
+
+        self.metarWithoutRemarks, self.metarRemarks = splitRemarks(self.metar)
+        self.metarWithoutChangements = self.metarWithoutRemarks
+
+        for attribute, method in self.ANALYZERS:
+            if not tolerant:
+                setattr(self, attribute, getattr(self, method)())
+                continue
+
+            try:
+                setattr(self, attribute, getattr(self, method)())
+            except Exception as err:
+                setattr(self, attribute, None)
+                self.diagnostics['errors'][attribute] = '{0}: {1}'.format(
+                    type(err).__name__, err)
+
+        if tolerant:
+            self.diagnostics.update(self.analyzeDiagnostics())
 
         self.properties = {
             'dateTime': self.date_time,
@@ -95,7 +183,9 @@ class Metar:
             'qnh':self.qnh,
             'visibility':self.visibility,
 
-            'changements': self.changements
+            'changements': self.changements,
+            'remarks': self.remarks,
+            'observationTime': self.observation_time
 
         }
 
@@ -108,18 +198,14 @@ class Metar:
         """`text_recover()` method recover text file from NOAA
         weather FTP server (https://tgftp.nws.noaa.gov/data/observations/metar/stations/).
 
-        Recovers text file with `url.urlretrieve()` function.
-        Read the file with `readlines()` method. This method return a list
-        of lines ([0] = Datetime ; [1] = METAR).
-        A `for` loop browses list to remove line break character.
+        Recovers text file with `fetchReport()` function.
         Return a list with datetime index 0 and METAR index 1.
 
 
         Require
         --------
         - `NOAAServError(Exception)` from metar_error \n
-        - `ulrlib.request` from built-in Pyhon modules \n
-        - `re` from built-in Python modules \n
+        - `ulrlib.request` & `ssl` from built-in Pyhon modules \n
 
         Returns
         --------
@@ -130,36 +216,11 @@ class Metar:
             - NOAAServError
             - ReadFileError
         """
-
-        try:
-            request = url.urlretrieve(
-                "https://tgftp.nws.noaa.gov/data/observations/metar/stations/{}.TXT".format(self.airport))
-        except url.HTTPError as err:
-            if(err.code == 404):
-                raise NOAAServError(self.airport, 404)
-            else:
-                raise NOAAServError(self.airport)
-
-        except:
-            raise NOAAServError(self.airport)
-
-        try:
-            file_txt = open(request[0], 'r')
-
-        except:
-            raise ReadFileError
-
-        datas = file_txt.readlines()  # List : [0] = Datetime ; [1] = METAR
-
-        # Remove '\n' from string
-        for i in range(len(datas)):
-            datas[i] = re.sub("\n", '', datas[i])
-
-        file_txt.close()
-        return datas[0], datas[1]
+        return fetchReport(self.airport)
 
     def analyzeChangements(self):
         """Method analysis and erase changements portions (create metarWithoutChangements variable)
+        Remarks (RMK section) are not analyzed.
 
         Returns:
         --------
@@ -168,7 +229,7 @@ class Metar:
 
         def changementsRecuperation(marker):
             regex = marker+'.+'
-            search = re.search(regex, self.metar)
+            search = re.search(regex, self.metarWithoutRemarks)
             if search is not None:
                 search = search.group()
                 portion = re.sub(marker + ' ', '', search)
@@ -181,9 +242,9 @@ class Metar:
 
         ##NOSIG##
         regex_nosig = r'NOSIG'
-        search_nosig = re.search(regex_nosig, self.metar)
+        search_nosig = re.search(regex_nosig, self.metarWithoutRemarks)
         if search_nosig is not None:
-            self.metarWithoutChangements = re.sub(regex_nosig, '', self.metar)
+            self.metarWithoutChangements = re.sub(regex_nosig, '', self.metarWithoutRemarks)
             return None
 
         ##TEMPO##
@@ -226,7 +287,7 @@ class Metar:
 
             - None (NoneType): Return None if no date time found
         """
-        date_time = re.findall(r'\d{6}Z', self.metar)
+        date_time = re.findall(r'\d{6}Z', self.metarWithoutRemarks)
         if(len(date_time) == 0 or len(date_time) > 1):  # No match
             return None
 
@@ -236,6 +297,31 @@ class Metar:
 
         return date_time
 
+    def analyzeObservationTime(self):
+        """Method completes METAR date time (day, hour, minute) with month
+        and year inferred from a reference time.
+        Reference is `reference` argument of constructor, else `data_date`
+        recovered from NOAA, else current UTC time.
+        Observation is placed in the latest month where it is not after
+        reference (a small clock skew is accepted, see `OBSERVATION_TOLERANCE`).
+
+        Returns:
+        --------
+            - (datetime): Timezone-aware (UTC) observation time
+            - None (NoneType): Return None if no date time found
+        """
+        if self.date_time is None:
+            return None
+
+        reference = self.reference
+        if reference is None:
+            reference = self.data_date
+
+        if reference is None:
+            reference = datetime.now(timezone.utc)
+
+        return resolveObservationTimes((self.date_time,), reference)[0]
+
     def analyzeAuto(self):
         """Method verify if a METAR comes form an automatic station.
         If it is a METAR AUTO, return True.
@@ -245,7 +331,7 @@ class Metar:
             boolean: True if auto, False if not auto
         """
 
-        search = re.search(r'AUTO', self.metar)
+        search = re.search(r'AUTO', self.metarWithoutRemarks)
         if search is None:
             return False
 
@@ -253,7 +339,7 @@ class Metar:
 
     def analyzeWind(self):
         """Method parse and analyze wind datas from METAR message and
-        returns a dictionnary with wind informations.
+        returns a dictionnary with wind informations (see `parseWind()`).
         Support Knots (KT) and Meter Per Second (MPS) units.
         Units are not informations returned by method.
         If `analyzeWind()` can't decode wind information (in case of unavaibility
@@ -271,66 +357,7 @@ class Metar:
 
             - None (NoneType): None if method can't decode wind informations.
         """
-        search = None
-
-        regex_list_kt = [r'\d{5}KT', r'\d{5}G\d{2}KT', r'VRB\d{2}KT']
-        # [0] Normal (33005KT) [1] Gust (33010G25KT) [2] Variable direction (VRB03KT)
-        regex_list_mps = [r'\d{5}MPS', r'\d{5}G\d{2}MPS', r'VRB\d{2}MPS']
-        # Meters per second
-
-        i = 0
-        end = len(regex_list_kt)
-
-        while search is None and i < end:
-            search = re.search(regex_list_kt[i], self.metarWithoutChangements)
-            i += 1
-
-        if search is None:  # Knot verification failed, MPS verification
-            i = 0
-            end = len(regex_list_mps)
-
-            while search is None and i < end:
-                search = re.search(
-                    regex_list_mps[i], self.metarWithoutChangements)
-                i += 1
-
-            if search is None:
-                return None
-
-        wind_tot = search.group()
-        direction = wind_tot[:3]
-
-        if direction != 'VRB':
-            direction = int(direction)
-
-        speed = wind_tot[3:5]
-        speed = int(speed)
-
-        if 'G' in wind_tot:  # Gust
-            gust_speed = int(wind_tot[6:8])
-        else:
-            gust_speed = None
-
-        ##Variations##
-        regex = r'\d{3}V\d{3}'
-        search = re.search(regex, self.metarWithoutChangements)
-
-        if search is not None:
-            variation = search.group()
-            variation = variation.split('V')
-            variation = [int(value) for value in variation]
-            variation = tuple(variation)
-        else:
-            variation = None
-
-        wind_infos = {
-            'direction': direction,
-            'speed': speed,
-            'gust': gust_speed,
-            'variation': variation
-        }
-
-        return wind_infos
+        return parseWind(self.metarWithoutChangements)
 
     def analyzeVisibility(self):
         """Method analyzes the Visibility (distance, direction).
@@ -341,71 +368,46 @@ class Metar:
         Returns:
             (integer): A integer as (distance). E.g -> (9999),(5000)
         """
-        verify = self.verifyWindAttribute('variation')
-        if not verify:
-            regex = r'KT \d{4}|KT CAVOK|KT \d{4}[A-Z]+'
-        else:
-            regex = r'\d{3}V\d{3} \d{4}|\d{3}V\d{3} \d{4}|\d{3}V\d{3} \d{4}[A-Z]+'
-
-        search = re.search(regex, self.metarWithoutChangements)
-        if search is None:
-            return None
-
-        visibility = search.group()
-        # print(visibility)
-
-        if not verify:
-            visibility = re.sub(r'KT ', '', visibility)
-        else:
-            visibility = re.sub(r'\d{3}V\d{3} ', '', visibility)
-
-        if visibility == 'CAVOK':
-            return 9999
-
-        return (int(visibility[:4]))
+        return parseVisibility(self.metarWithoutChangements, self.verifyWindAttribute('variation'))
 
     def analyzeRVR(self):
-        """Method parses and recovers RVR
+        """Method parses and recovers RVR (Runway Visual Range), all
+        groups in one pass (e.g. R27L/M0600, R09/0600V1000U, R36/4000FT/D)
 
         Returns:
             (tuple): Tuple of dictionnries : {
-                'runway':runway (string)
-                'visibility':visibility (integer)
+                'runway':runway (Category, see `codes.runway()`)
+                'visibility':visibility (integer), minimum if variable
+                'qualifier':'M' (less than) or 'P' (more than), else None
+                'maxVisibility':maximum visibility (integer) if variable, else None
+                'maxQualifier':qualifier of maximum visibility, else None
+                'unit':'m' or 'ft'
+                'tendency':'U' (up), 'D' (down), 'N' (no change), else None
             }
 
             (NoneType): If no RVR mentionned
         """
-        ##PORTION METAR RECOVERING##
-        regex_runway = r'R\d{2}[LCR]*'
-        regex_rvr = r'[MP]*\d{4}'
-        regex = regex_runway + '/' + regex_rvr
-
-        search = re.findall(regex, self.metarWithoutChangements)
+        search = REGEX_RVR.findall(self.metarWithoutChangements)
         if search == []:
             return None
 
-        ##DATAS RECOVERING##
         rvr = []
-        for k in search:
-            search_runway = re.search(regex_runway, k)
-            runway = search_runway.group()
-            runway = runway[1:]
-
-            search_visibility = re.search(r'\d{4}', k)
-            visibility = int(search_visibility.group())
-
-            rvr.append(
-                {
-                    'runway': runway,
-                    'visibility': visibility
-                }
-            )
+        for runway, qualifier, visibility, maxQualifier, maxVisibility, feet, tendency in search:
+            rvr.append({
+                'runway': runwayCategory(runway),
+                'visibility': int(visibility),
+                'qualifier': RVR_QUALIFIERS.get(qualifier),
+                'maxVisibility': int(maxVisibility) if maxVisibility else None,
+                'maxQualifier': RVR_QUALIFIERS.get(maxQualifier),
+                'unit': RVR_UNITS[1] if feet else RVR_UNITS[0],
+                'tendency': RVR_TENDENCIES.get(tendency)
+            })
 
         return tuple(rvr)
 
     def analyzeWeather(self):
         """Method parses METAR and analyze significant weather.
-        Return a dictionnary of tuples and boolean.
+        Return a dictionnary of tuples and boolean (see `parseWeather()`).
 
         Keys :
         ------
@@ -413,213 +415,25 @@ class Metar:
         - `prefix` (tuple): Prefix (e.G = ('in Vicinity', 'Freezing'))
         - `weather` (tuple): Weather code (e.G = ('Rain','Snow'))
 
+        Prefixes and weathers are `Category` (shared strings with integer code,
+        see `codes` module)
+
         If element not found (prefix or intensity), value is None
 
         Returns:
         --------
             (tuple): Tuple of dictionnaries (see above)
         """
-        regex_intensity = r'[-+]+'
-
-        prefixes = ({
-            'code': 'VC',
-            'meaning': 'in Vicinity'
-        },
-            {
-            'code': 'MI',
-            'meaning': 'Thin'
-        },
-            {
-            'code': 'PR',
-            'meaning': 'Partial'
-        },
-            {
-            'code': 'DR',
-            'meaning': 'Low Drifting'
-        },
-            {
-            'code': 'BL',
-            'meaning': 'Blowing'
-        },
-            {
-            'code': 'FZ',
-            'meaning': 'Freezing'
-        },
-            {
-            'code': 'RE',
-            'meaning': 'Recent'
-        },
-            {
-            'code': 'BC',
-            'meaning': 'Bank'
-        },
-            {
-            'code': 'SH',
-            'meaning': 'Shower'
-        },
-            {
-            'code': 'XX',
-            'meaning': 'Violent'
-        })
-
-        weathers = ({
-            'code': 'RA',
-            'meaning': 'Rain'
-        },
-            {
-            'code': 'SN',
-            'meaning': 'Snow'
-        },
-            {
-            'code': 'GR',
-            'meaning': 'Hail'
-        },
-            {
-            'code': 'DZ',
-            'meaning': 'Drizzle'
-        },
-            {
-            'code': 'PL',
-            'meaning': 'Ice Pellets'
-        },
-            {
-            'code': 'GS',
-            'meaning': 'Gresil'
-        },
-            {
-            'code': 'SG',
-            'meaning': 'Snow Grains'
-        },
-            {
-            'code': 'IC',
-            'meaning': 'Ice Crystals'
-        },
-            {
-            'code': 'UP',
-            'meaning': 'Unknown'
-        },
-            {
-            'code': 'BR',
-            'meaning': 'Brume'
-        },
-            {
-            'code': 'FG',
-            'meaning': 'Fog'
-        },
-            {
-            'code': 'HZ',
-            'meaning': 'Haze'
-        },
-            {
-            'code': 'FU',
-            'meaning': 'Smoke'
-        },
-            {
-            'code': 'SA',
-            'meaning': 'Sand'
-        },
-            {
-            'code': 'DU',
-            'meaning': 'Dust'
-        },
-            {
-            'code': 'VA',
-            'meaning': 'Volcanic Ash'
-        },
-            {
-            'code': 'PO',
-            'meaning': 'Dust whirlpool'
-        },
-            {
-            'code': 'SS',
-            'meaning': 'Sand Storm'
-        },
-            {
-            'code': 'DS',
-            'meaning': 'Dust Storm'
-        },
-            {
-            'code': 'SQ',
-            'meaning': 'Squalls'
-        },
-            {
-            'code': 'FC',
-            'meaning': 'Funnel Cloud'
-        },
-            {
-            'code': 'TS',
-            'meaning': 'Thunderstorm'
-        })
-
-        #Intensity#
-        intensity = []
-        search_intensity = re.findall(
-            regex_intensity, self.metarWithoutChangements)
-
-        if search_intensity == []:
-            _intensity = None
-        else:
-            for _intensity in search_intensity:
-
-                if _intensity == '-':
-                    _intensity = False
-                elif _intensity == '+':
-                    _intensity = True
-                else:
-                    _intensity = None
-                
-                intensity.append(_intensity)
-
-        intensity = tuple(intensity)
-
-        #Prefixes#
-        prefix = []
-        for pre in prefixes:
-            regex = pre['code']+'+'
-
-            search_prefixes = re.search(regex, self.metarWithoutChangements)
-
-            if search_prefixes is not None:
-                prefix.append(pre['meaning'])
-
-        if prefix == []:
-            prefix = None
-        else:
-            prefix = tuple(prefix)
-
-        # Weather
-        weather = []
-        for wea in weathers:
-            regex = wea['code']+'+'
-            search_weather = re.search(regex, self.metarWithoutChangements)
-
-            if search_weather is not None:
-                weather.append(wea['meaning'])
-
-        if weather == []:
-            weather = None
-        else:
-            weather = tuple(weather)
-
-        if (intensity is None and prefix is None) and weather is None:
-            return None
-
-        return {
-            'intensity': intensity,
-            'prefix': prefix,
-            'weather': weather
-        }
-
-        return returns
+        return parseWeather(self.metarWithoutChangements)
 
     def analyzeCloud(self):
         """`analyzeCloud()` method is a method from `Metar` class.
-        Return a tuple of dictionnary
+        Return a tuple of dictionnary (see `parseCloud()`)
 
         Keys of dictionnary
         --------------------
-        - `code` (string): class of cloud (e.G => SCT, BKN, OVC)
-        - `meaning` (string): signification of `code` (e.G => Scatterd, Broken, Overcast)
+        - `code` (Category): class of cloud (e.G => SCT, BKN, OVC)
+        - `meaning` (Category): signification of `code` (e.G => Scatterd, Broken, Overcast)
         - `oktaMin` (integer): Okta of sky clouded (minimum)
         - `oktaMax`(integer): Okta of sky clouded (maximum)
         - `altitude` (integer): Altitude of clouds (in feet)
@@ -632,86 +446,7 @@ class Metar:
             - (None): None if no cloud parsed, if NCD in METAR, if NSC in METAR
 
         """
-        # Detect NCD
-        regexNCD = re.search(r'NCD', self.metarWithoutChangements)
-        regexNSC = re.search(r'NSC', self.metarWithoutChangements)
-        if regexNCD or regexNSC:
-            return None
-        
-        if re.search(r'VV///',self.metarWithoutChangements):
-            return ({
-                'code':'VV',
-                'meaning':'Invisible Sky',
-                'oktaMin':None,
-                'oktaMax':None
-            })
-
-        classificationClouds = (
-            {
-                'code': 'SKC',
-                'meaning': 'Sky Clear',
-                'oktaMin': 0,
-                'oktaMax': 0
-            },
-            {
-                'code': 'FEW',
-                'meaning': 'Few',
-                'oktaMin': 1,
-                'oktaMax': 2
-            },
-            {
-                'code': 'SCT',
-                'meaning': 'Scattered',
-                'oktaMin': 3,
-                'oktaMax': 4
-            },
-            {
-                'code': 'BKN',
-                'meaning': 'Broken',
-                'oktaMin': 5,
-                'oktaMax': 7
-            },
-            {
-                'code': 'OVC',
-                'meaning': 'Overcast',
-                'oktaMin': 8,
-                'oktaMax': 8
-            }
-        )
-
-        matches = []
-        for cloudClassification in classificationClouds:
-            regex = cloudClassification['code'] + r'\d{3}.{2}'
-
-            search = re.findall(regex, self.metarWithoutChangements)
-
-            if search != []:
-
-                for cloud in search:
-                    matches.append(cloud)
-
-        returnList = []
-        for match in matches:
-            search = None
-            i = -1
-            end = len(classificationClouds)
-            while search is None and i < len(classificationClouds):
-                i+=1
-                search = re.search(classificationClouds[i]['code'], match)
-
-            if search is not None:
-                searchAltitude = re.search(r'\d{3}', match)
-                searchCB = re.search(r'CB', match)
-                searchTCU = re.search(r'TCU', match)
-
-                returnDict = copy.deepcopy(classificationClouds[i])
-                returnDict['altitude'] = int(searchAltitude.group())*100
-                returnDict['presenceCB'] = False if searchCB is None else True
-                returnDict['presenceTCU'] = False if searchTCU is None else True
-
-                returnList.append(returnDict)
-
-        return None if returnList == [] else tuple(returnList)
+        return parseCloud(self.metarWithoutChangements)
 
     def analyzeTemperatures(self):
         """analyzeTemperature() is a method from `Metar` class.
@@ -786,6 +521,81 @@ class Metar:
         else:
             return int(searchHPA.group()[1:])
         
+    def analyzeCeiling(self):
+        """Method from `Metar` class.
+        Return altitude of lowest layer of clouds BKN or OVC, or of
+        vertical visibility (from `cloud` attribute). None if no ceiling.
+        Vertical visibility not measured (VV///) is a ceiling at 0 ft.
+
+        Returns:
+            (integer): Altitude of ceiling (in feet)
+            (None): If no ceiling
+        """
+        return cloudCeiling(self.cloud)
+
+    def analyzeRemarks(self):
+        """Method from `Metar` class.
+        Decode remarks (RMK section), split from METAR before other
+        analysis. See `decodeRemarks()` for keys.
+
+        Returns:
+            (dict): Decoded remarks
+            (None): If no RMK section
+        """
+        if self.metarRemarks is None:
+            return None
+
+        return decodeRemarks(self.metarRemarks)
+
+    def analyzeDiagnostics(self):
+        """Method from `Metar` class.
+        Classify groups of METAR (without changements and remarks) and
+        detect groups not understood or in conflict.
+
+        Keys
+        ----
+        - `unparsed` (tuple): Groups not recognized (e.g. 'ABC123', '3O5/12')
+        - `conflicts` (tuple): Tuple of dictionnaries {`field`, `groups`} with
+          groups of same kind found several times (e.g. 2 wind groups),
+          or CAVOK given with visibility, weather or cloud groups
+
+        Returns:
+            (dict): Dictionnary (see keys above)
+        """
+        tokens = self.metarWithoutChangements.split()
+        groups = {}
+        unparsed = []
+
+        for index, token in enumerate(tokens):
+            search = REGEX_GROUPS.match(token)
+            if search is not None:
+                if search.lastgroup is not None:
+                    groups.setdefault(search.lastgroup, []).append(token)
+                continue
+
+            following = tokens[index + 1] if index + 1 < len(tokens) else ''
+            if token.upper() == str(self.airport).upper() or (index < 2 and re.match(r'^[A-Z]{4}$', token)):
+                continue  # Station
+
+            if token.isdigit() and len(token) == 1 and re.match(r'^\d/\dSM$', following):
+                continue  # Whole part of visibility in statute miles (1 1/2SM)
+
+            unparsed.append(token)
+
+        conflicts = [{'field': field, 'groups': tuple(groups[field])}
+                     for field in SINGLE_GROUPS if len(groups.get(field, ())) > 1]
+
+        if 'cavok' in groups:
+            found = tuple(token for field in ('visibility', 'weather', 'cloud')
+                          for token in groups.get(field, ()))
+            if found:
+                conflicts.append({'field': 'cavok', 'groups': ('CAVOK',) + found})
+
+        return {
+            'unparsed': tuple(unparsed),
+            'conflicts': tuple(conflicts)
+        }
+
     def verifyWindAttribute(self, key):
         """Verify if a key exists (gust or variation)
 
@@ -829,7 +639,8 @@ class Metar:
             clouds_alt_list = []
 
             for cloud in clouds:
-                clouds_alt_list.append(cloud['altitude'])
+                # Sky obscured if vertical visibility not measured
+                clouds_alt_list.append(cloud['altitude'] or 0)
         
         min_altitude = min(clouds_alt_list)
 
@@ -851,6 +662,39 @@ class Metar:
         }
 
 
+    def flightCategory(self):
+        """FAA flight category (VFR, MVFR, IFR, LIFR) from ceiling and
+        visibility, see `categories.FlightCategories`
+
+        Returns:
+            (string): Category, None if ceiling and visibility unknown
+        """
+        from PythonMETAR.categories import FlightCategories
+        return FlightCategories().classifyMetar(self)
+
+    def station(self):
+        """Metadata of airport (coordinates, elevation) from bundled
+        station registry, see `stations.defaultRegistry()`
+
+        Returns:
+            (Station): Station, None if airport not in registry
+        """
+        from PythonMETAR.stations import defaultRegistry
+        return defaultRegistry().get(self.airport)
+
+    def normalized(self):
+        """Values in aviation standard units (kt, m, hPa, degC, ft) with
+        unit tags, see `units.normalize()`. Computed once, then cached.
+
+        Returns:
+            (dict): Normalized values
+        """
+        if getattr(self, '_normalized', None) is None:
+            from PythonMETAR.units import normalize
+            self._normalized = normalize(self)
+
+        return self._normalized
+
     def getAttribute(self, attribute, display=False):
         """Getter attribute
 
@@ -882,6 +726,631 @@ class Metar:
 
         return self.properties
 
+## GROUPS ##
+# Analyzers of groups working on a text (main part of a METAR, groups of a
+# TAF period), used by `Metar` methods and `taf.decodeGroups()`
+
+REGEX_WEATHER = re.compile(r'[-+]?(?:VC|RE)?(?:(?:' + _WEATHER_DESCRIPTORS + r')(?:' +
+                           _WEATHER_PHENOMENA + r')*|(?:' + _WEATHER_PHENOMENA + r')+)')
+# Significant weather group (e.g. '-SHRA', 'VCTS', 'FZFG'), 2 letters per code
+
+
+def parseWind(text):
+    """Decode wind group (e.g. 33005KT, 33010G25KT, VRB03MPS) and variation
+    (e.g. 300V360) of a text. See `Metar.analyzeWind()` for keys.
+
+    Args:
+        text (string): Groups, followed by a separator
+
+    Returns:
+        (dict): Dictionnary with wind informations
+        (None): If no wind group
+    """
+    search = None
+
+    regex_list_kt = [r'\d{5}KT', r'\d{5}G\d{2}KT', r'VRB\d{2}KT']
+    # [0] Normal (33005KT) [1] Gust (33010G25KT) [2] Variable direction (VRB03KT)
+    regex_list_mps = [r'\d{5}MPS', r'\d{5}G\d{2}MPS', r'VRB\d{2}MPS']
+    # Meters per second
+
+    i = 0
+    end = len(regex_list_kt)
+
+    while search is None and i < end:
+        search = re.search(regex_list_kt[i], text)
+        i += 1
+
+    if search is None:  # Knot verification failed, MPS verification
+        i = 0
+        end = len(regex_list_mps)
+
+        while search is None and i < end:
+            search = re.search(regex_list_mps[i], text)
+            i += 1
+
+        if search is None:
+            return None
+
+    wind_tot = search.group()
+    direction = wind_tot[:3]
+
+    if direction != 'VRB':
+        direction = int(direction)
+
+    speed = wind_tot[3:5]
+    speed = int(speed)
+
+    if 'G' in wind_tot:  # Gust
+        gust_speed = int(wind_tot[6:8])
+    else:
+        gust_speed = None
+
+    ##Variations##
+    search = re.search(REGEX_VARIATION, text)
+
+    if search is not None:
+        variation = search.group()
+        variation = variation.split('V')
+        variation = [int(value) for value in variation]
+        variation = tuple(variation)
+    else:
+        variation = None
+
+    wind_infos = {
+        'direction': direction,
+        'speed': speed,
+        'gust': gust_speed,
+        'variation': variation
+    }
+
+    return wind_infos
+
+
+def parseVisibility(text, variation=False):
+    """Decode visibility group following wind group (or wind variation)
+    of a text. CAVOK is 9999.
+
+    Args:
+        text (string): Groups
+        variation (boolean, optional): True if wind group is followed by
+        a variation group (e.g. 300V360). Defaults to False.
+
+    Returns:
+        (integer): Visibility (meters)
+        (None): If no visibility group after wind
+    """
+    if not variation:
+        regex = r'(?:KT|MPS) \d{4}|(?:KT|MPS) CAVOK|(?:KT|MPS) \d{4}[A-Z]+'
+    else:
+        regex = r'(?<!\S)\d{3}V\d{3} \d{4}|(?<!\S)\d{3}V\d{3} \d{4}[A-Z]+'
+
+    search = re.search(regex, text)
+    if search is None:
+        return None
+
+    visibility = search.group()
+
+    if not variation:
+        visibility = re.sub(r'(?:KT|MPS) ', '', visibility)
+    else:
+        visibility = re.sub(r'\d{3}V\d{3} ', '', visibility)
+
+    if visibility == 'CAVOK':
+        return 9999
+
+    return (int(visibility[:4]))
+
+
+def parseWeather(text):
+    """Decode significant weather groups of a text (e.g. '-SHRA', 'VCFG').
+    Only whole groups are read, so codes inside other groups (VC of OVC,
+    BC and FG of an unknown group) are not weather. See
+    `Metar.analyzeWeather()` for keys.
+
+    Args:
+        text (string): Groups
+
+    Returns:
+        (dict): Dictionnary with intensity, prefixes and weathers
+        (None): If no weather group
+    """
+    groups = [group for group in text.split() if REGEX_WEATHER.fullmatch(group.rstrip('='))]
+
+    #Intensity#
+    # Intensity of first weather group with intensity
+    intensity = None
+    for group in groups:
+        if group[0] in '-+':
+            intensity = group[0] == '+'
+            break
+
+    codes = set()
+    for group in groups:
+        group = group.rstrip('=').lstrip('-+')
+        codes.update(group[i:i + 2] for i in range(0, len(group), 2))
+
+    #Prefixes#
+    prefix = tuple(pre['meaning'] for pre in PREFIX_CLASSIFICATIONS if pre['code'] in codes)
+    if prefix == ():
+        prefix = None
+
+    # Weather
+    weather = tuple(wea['meaning'] for wea in WEATHER_CLASSIFICATIONS if wea['code'] in codes)
+    if weather == ():
+        weather = None
+
+    if (intensity is None and prefix is None) and weather is None:
+        return None
+
+    return {
+        'intensity': intensity,
+        'prefix': prefix,
+        'weather': weather
+    }
+
+
+def parseCloud(text):
+    """Decode cloud groups (e.g. SCT030, BKN015CB, VV002) of a text.
+    See `Metar.analyzeCloud()` for keys.
+
+    Args:
+        text (string): Groups, each followed by 2 characters at least
+        (e.g. 'BKN010 ' + 'CB' or '  ')
+
+    Returns:
+        (tuple): Tuple of dictionnaries
+        (None): If no cloud group, NCD or NSC
+    """
+    # Detect NCD
+    regexNCD = re.search(r'NCD', text)
+    regexNSC = re.search(r'NSC', text)
+    if regexNCD or regexNSC:
+        return None
+
+    searchVV = re.search(r'VV(\d{3}|///)', text)
+    if searchVV:
+        # Vertical visibility, altitude None if not measured (VV///)
+        altitude = searchVV.group(1)
+        return ({
+            'code':CLOUD_COVERS[5],
+            'meaning':CLOUD_MEANINGS[5],
+            'oktaMin':None,
+            'oktaMax':None,
+            'altitude':None if altitude == '///' else int(altitude)*100,
+            'presenceCB':False,
+            'presenceTCU':False
+        },)
+
+    classificationClouds = CLOUD_CLASSIFICATIONS
+
+    matches = []
+    for cloudClassification in classificationClouds:
+        regex = cloudClassification['code'] + r'\d{3}.{2}'
+
+        search = re.findall(regex, text)
+
+        if search != []:
+
+            for cloud in search:
+                matches.append(cloud)
+
+    returnList = []
+    for match in matches:
+        search = None
+        i = -1
+        end = len(classificationClouds)
+        while search is None and i < end - 1:
+            i+=1
+            search = re.search(classificationClouds[i]['code'], match)
+
+        if search is not None:
+            searchAltitude = re.search(r'\d{3}', match)
+            searchCB = re.search(r'CB', match)
+            searchTCU = re.search(r'TCU', match)
+
+            returnDict = dict(classificationClouds[i])
+            returnDict['altitude'] = int(searchAltitude.group())*100
+            returnDict['presenceCB'] = False if searchCB is None else True
+            returnDict['presenceTCU'] = False if searchTCU is None else True
+
+            returnList.append(returnDict)
+
+    return None if returnList == [] else tuple(returnList)
+
+
+def cloudCeiling(clouds):
+    """Altitude of lowest layer BKN, OVC or VV (VV/// is 0 ft) of
+    decoded clouds (see `parseCloud()`)
+
+    Args:
+        clouds (tuple): Decoded clouds, or None
+
+    Returns:
+        (integer): Altitude of ceiling (in feet)
+        (None): If no ceiling
+    """
+    if clouds is None:
+        return None
+
+    ceilings = [cloud['altitude'] or 0 for cloud in clouds
+                if cloud['code'] in ('BKN', 'OVC', 'VV')]
+
+    return min(ceilings) if ceilings else None
+
+
+## EXPORT ##
+
+
+def reportJSON(metar, data_date=None):
+    """JSON-serializable dictionnary of a decoded METAR
+
+    Args:
+        metar (Metar): Decoded METAR
+        data_date (string, optional): Date provided by server
+
+    Returns:
+        (dict): `getAll()` properties with `airport`, `dataDate`
+        and `observationTime` (ISO 8601) keys
+    """
+    report = dict(metar.getAll())
+    report['airport'] = metar.airport
+    report['dataDate'] = data_date
+    report['observationTime'] = (None if metar.observation_time is None
+                                 else metar.observation_time.isoformat())
+
+    return report
+
+
+## REMARKS ##
+
+
+def splitRemarks(text):
+    """Split remarks (RMK section) from a METAR.
+    Main part keeps separator before RMK, so groups are followed by a space.
+
+    Args:
+        text (string): METAR
+
+    Returns:
+        (tuple): (METAR without remarks, remarks or None)
+    """
+    search = REGEX_REMARKS.search(text)
+    if search is None:
+        return text, None
+
+    return text[:search.start() + 1], text[search.end():].strip().rstrip('=').strip()
+
+
+def _tenths(sign, digits):
+    """Value of a signed group in tenths (sign '0' positive, '1' negative)
+    """
+    value = int(digits) / 10
+    return -value if sign == '1' else value
+
+
+def decodeRemarks(text):
+    """Decode common North American groups of remarks in one pass.
+
+    Keys
+    ----
+    - `text` (string): Remarks
+    - `station` (string): Type of automated station ('AO1' or 'AO2')
+    - `seaLevelPressure` (float): Sea level pressure in hPa (SLPppp)
+    - `hourlyPrecipitation` (float): Precipitation of last hour in inches (Prrrr)
+    - `precipitation6h` (float): Precipitation of last 3 or 6 hours in inches (6rrrr)
+    - `precipitation24h` (float): Precipitation of last 24 hours in inches (7rrrr)
+    - `temperature`, `dewpoint` (float): Temperature & dewpoint in tenths of °C (Tsnnnsnnn)
+    - `maxTemperature6h`, `minTemperature6h` (float): 6 hours extremes (1snnn, 2snnn)
+    - `maxTemperature24h`, `minTemperature24h` (float): 24 hours extremes (4snnnsnnn)
+    - `pressureTendency` (dict): 3 hours tendency (5appp): `code` (integer) & `change` (float, hPa)
+    - `unparsed` (tuple): Groups not decoded
+
+    Value is None if group not found (or missing, e.g. SLPNO, P////)
+
+    Args:
+        text (string): Remarks (without RMK)
+
+    Returns:
+        (dict): Dictionnary (see keys above)
+    """
+    remarks = {
+        'text': text,
+        'station': None,
+        'seaLevelPressure': None,
+        'hourlyPrecipitation': None,
+        'precipitation6h': None,
+        'precipitation24h': None,
+        'temperature': None,
+        'dewpoint': None,
+        'maxTemperature6h': None,
+        'minTemperature6h': None,
+        'maxTemperature24h': None,
+        'minTemperature24h': None,
+        'pressureTendency': None
+    }
+    unparsed = []
+
+    for group in text.split():
+        length = len(group)
+        first = group[0]
+        digits = group[1:].isdigit()
+
+        if group in ('AO1', 'AO2'):
+            remarks['station'] = group
+
+        elif length == 6 and group.startswith('SLP'):
+            if group[3:].isdigit():
+                pressure = int(group[3:]) / 10
+                remarks['seaLevelPressure'] = round(pressure + (1000 if pressure < 50 else 900), 1)
+            elif group != 'SLPNO':
+                unparsed.append(group)
+
+        elif length == 5 and first in 'P67' and (digits or group[1:] == '////'):
+            precipitation = int(group[1:]) / 100 if digits else None
+            key = {'P': 'hourlyPrecipitation', '6': 'precipitation6h', '7': 'precipitation24h'}[first]
+            remarks[key] = precipitation
+
+        elif first == 'T' and length in (5, 9) and digits and group[1] in '01' \
+                and (length == 5 or group[5] in '01'):
+            remarks['temperature'] = _tenths(group[1], group[2:5])
+            if length == 9:
+                remarks['dewpoint'] = _tenths(group[5], group[6:9])
+
+        elif length == 5 and first in '12' and digits and group[1] in '01':
+            key = 'maxTemperature6h' if first == '1' else 'minTemperature6h'
+            remarks[key] = _tenths(group[1], group[2:5])
+
+        elif length == 9 and first == '4' and digits and group[1] in '01' and group[5] in '01':
+            remarks['maxTemperature24h'] = _tenths(group[1], group[2:5])
+            remarks['minTemperature24h'] = _tenths(group[5], group[6:9])
+
+        elif length == 5 and first == '5' and digits:
+            remarks['pressureTendency'] = {
+                'code': int(group[1]),
+                'change': int(group[2:]) / 10
+            }
+
+        else:
+            unparsed.append(group)
+
+    remarks['unparsed'] = tuple(unparsed)
+
+    return remarks
+
+
+## NETWORK ##
+
+
+def fetchReport(airport, source=NOAA_URL, timeout=None):
+    """Recover text file of a station from NOAA weather server, or
+    from another server with same format (line [0] = Datetime ; [1] = METAR).
+
+    Network modules (`urllib.request`, `ssl`) are imported on first call.
+    Certificate verification is disabled for this request only
+    (no global change of `ssl` module).
+
+    Args:
+        airport (string): OACI code of airport
+        source (string, optional): URL template of text file, formatted with
+        airport code. Defaults to `NOAA_URL`.
+        timeout (float, optional): Timeout of connection (seconds)
+
+    Returns:
+        (tuple): (Datetime, METAR)
+
+    Exception raised:
+        - NOAAServError
+        - ReadFileError
+    """
+    import urllib.request as url
+    import urllib.error
+    import ssl
+
+    options = {'context': ssl._create_unverified_context()}
+    if timeout is not None:
+        options['timeout'] = timeout
+
+    try:
+        request = url.urlopen(source.format(airport), **options)
+    except urllib.error.HTTPError as err:
+        if(err.code == 404):
+            raise NOAAServError(airport, 404)
+        else:
+            raise NOAAServError(airport)
+
+    except:
+        raise NOAAServError(airport)
+
+    try:
+        with request:
+            datas = request.read().decode().splitlines()  # List : [0] = Datetime ; [1] = METAR
+
+    except:
+        raise ReadFileError
+
+    if len(datas) < 2:
+        raise ReadFileError
+
+    return datas[0], datas[1]
+
+
+def fetchMetars(codes, source=NOAA_URL, timeout=None, workers=8):
+    """Fetch and decode METAR of several stations, requests made in
+    parallel threads.
+
+    Args:
+        codes (iterable): OACI codes of airports
+        source (string, optional): URL template of text file. Defaults to `NOAA_URL`.
+        timeout (float, optional): Timeout of each connection (seconds)
+        workers (integer, optional): Maximum number of parallel requests. Defaults to 8.
+
+    Returns:
+        (tuple): (dictionnary code => `Metar`, dictionnary code => exception
+        of stations not fetched or not decoded)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(code):
+        data_date, text = fetchReport(code, source, timeout)
+        metar = Metar(code, text, data_date)
+        metar.data_date = data_date
+
+        return metar
+
+    codes = list(dict.fromkeys(codes))
+    metars, errors = {}, {}
+    if not codes:
+        return metars, errors
+
+    with ThreadPoolExecutor(min(workers, len(codes))) as executor:
+        futures = {code: executor.submit(fetch, code) for code in codes}
+
+    for code, future in futures.items():
+        try:
+            metars[code] = future.result()
+        except Exception as err:
+            errors[code] = err
+
+    return metars, errors
+
+
+## OBSERVATION TIME ##
+
+OBSERVATION_TOLERANCE = timedelta(hours=2)
+# Maximum delay accepted between reference and a later observation
+
+
+def daysInMonth(year, month):
+    """Number of days of a month (Gregorian calendar)
+
+    Args:
+        year (integer): Year
+        month (integer): Month (1-12)
+
+    Returns:
+        (integer): Number of days
+    """
+    if month == 2:
+        leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        return 29 if leap else 28
+
+    return 30 if month in (4, 6, 9, 11) else 31
+
+
+def parseReference(reference):
+    """Convert a reference time into a timezone-aware (UTC) datetime.
+    NOAA `data_date` strings ("2021/03/29 22:00") are split by hand,
+    without `datetime.strptime`.
+
+    Args:
+        reference (datetime or string): Reference time. Naive datetimes are UTC.
+
+    Returns:
+        (datetime): Timezone-aware reference
+    """
+    if isinstance(reference, datetime):
+        if reference.tzinfo is None:
+            return reference.replace(tzinfo=timezone.utc)
+
+        return reference.astimezone(timezone.utc)
+
+    date, _, time = reference.strip().partition(' ')
+    year, month, day = date.split('/')
+    hour, minute = (time.split(':') + ['0'])[:2] if time else ('0', '0')
+
+    return datetime(int(year), int(month), int(day), int(hour), int(minute),
+                    tzinfo=timezone.utc)
+
+
+def _observationCandidates(reference):
+    """Latest observation accepted and candidate months of a reference
+
+    Returns:
+        (tuple): (limit tuple (year, month, day, hour, minute), list of
+        (year, month, days in month), next month first)
+    """
+    reference = parseReference(reference)
+    limit = reference + OBSERVATION_TOLERANCE
+    limit = (limit.year, limit.month, limit.day, limit.hour, limit.minute)
+
+    # Next month, current month, and up to two months back
+    candidates = []
+    year, month = reference.year, reference.month + 1
+    for _ in range(4):
+        if month > 12:
+            year, month = year + 1, month - 12
+        elif month < 1:
+            year, month = year - 1, month + 12
+
+        candidates.append((year, month, daysInMonth(year, month)))
+        month -= 1
+
+    return limit, candidates
+
+
+def resolveObservationTimes(dateTimes, reference):
+    """Convert METAR date times (day, hour, minute) into full timezone-aware
+    observation times, resolving month and year rollover against `reference`.
+
+    Designed for bulk archive processing: candidate months are computed
+    once by reference, and identical (day, hour, minute) groups of a
+    reference share one resolved datetime instead of being parsed again.
+
+    Args:
+        dateTimes (iterable): Tuples (day, hour, minute) of strings or integers,
+        as returned by `Metar.analyzeDateTime()`. None values are kept.
+        reference (datetime, string or sequence): Reference time (e.g. `data_date`)
+        of all date times, or sequence of references, one by date time
+        (e.g. `data_date` of each archive row). None references are current UTC time.
+
+    Returns:
+        (list): List of datetimes (UTC), None where no date time
+    """
+    if reference is None or isinstance(reference, (str, datetime)):
+        references = None
+        windows = {None: _observationCandidates(
+            datetime.now(timezone.utc) if reference is None else reference)}
+    else:
+        references = iter(reference)
+        windows = {}
+
+    resolved = {}
+    results = []
+    for dateTime in dateTimes:
+        key = None if references is None else next(references)
+
+        if dateTime is None:
+            results.append(None)
+            continue
+
+        try:
+            results.append(resolved[key, dateTime])
+            continue
+        except KeyError:
+            pass
+
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = _observationCandidates(
+                datetime.now(timezone.utc) if key is None else key)
+        limit, candidates = window
+
+        day, hour, minute = (int(value) for value in dateTime)
+        observation = None
+
+        if 1 <= day and hour < 24 and minute < 60:
+            for year, month, days in candidates:
+                if day <= days and (year, month, day, hour, minute) <= limit:
+                    observation = datetime(year, month, day, hour, minute,
+                                           tzinfo=timezone.utc)
+                    break
+
+        resolved[key, dateTime] = observation
+        results.append(observation)
+
+    return results
+
+
 ## ERRORS ##
 
 
@@ -0,0 +1,281 @@
+"""
+Staged decoding pipeline of live feeds
+Author: Matthieu BOUCHET
+
+Reports received by a feed are put in a pipeline of three stages:
+ingest (bounded queue) -> decode -> sink. Each stage has its own pool of
+worker threads, and stages are connected by bounded queues: when decoding
+or sink is slower than reception (burst at the top of the hour), queues
+fill up and `put()` blocks (or raises `queue.Full` after its timeout),
+so memory stays bounded and the receiving loop can apply backpressure
+to its own source.
+
+Decoding holds the GIL: with `processes`, batches of reports are decoded
+in worker processes, to absorb bursts with all cores.
+"""
+
+import queue
+import threading
+import time
+
+from PythonMETAR.metar import Metar
+
+_STOP = object()
+# End of stream, one by worker thread of a stage
+
+
+def _decodeBatch(batch):
+    """Decode a batch of reports (in worker process)
+
+    Returns:
+        (list): Tuples (`Metar`, None) or (None, exception)
+    """
+    results = []
+    for code, text, reference, tolerant in batch:
+        try:
+            results.append((Metar(code, text, reference, tolerant=tolerant), None))
+        except Exception as err:
+            results.append((None, err))
+
+    return results
+
+
+class StageMetrics:
+    """Metrics of a pipeline stage.
+
+    Attributes
+    -----------
+    - processed (integer): Items processed
+    - errors (integer): Items whose processing raised
+    - latency (float): Total seconds of items from put in input queue to end of processing
+    - maxLatency (float): Maximum latency of an item (seconds)
+    - busy (float): Total seconds of processing (all workers)
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.maxLatency = 0.0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, count, errors, latencies, busy):
+        with self.lock:
+            self.processed += count
+            self.errors += errors
+            self.latency += sum(latencies)
+            self.maxLatency = max(self.maxLatency, max(latencies, default=0.0))
+            self.busy += busy
+
+
+class DecodePipeline:
+    """Pipeline ingest -> decode -> sink with bounded queues.
+
+    Args:
+        sink (callable): Called with each decoded `Metar` (in sink threads)
+        reference (string, optional): Reference time of observations. Defaults to current UTC time.
+        tolerant (boolean, optional): Tolerant decoding (see `Metar`). Defaults to True.
+        decodeWorkers (integer, optional): Threads of decode stage. Defaults to 2. With
+        `processes`, at least one thread by process: each thread waits for the batch it
+        submitted, so `processes` batches are decoded at once.
+        sinkWorkers (integer, optional): Threads of sink stage. Defaults to 1.
+        processes (integer, optional): Worker processes of decode stage (0: decode in threads). Defaults to 0.
+        queueSize (integer, optional): Capacity of each queue (reports). Defaults to 1000.
+        batch (integer, optional): Maximum reports taken at once by a decode thread. Defaults to 50.
+
+    Attributes
+    -----------
+    - errors (list): Last exceptions (at most 100) as tuples (stage, code, exception)
+    """
+
+    def __init__(self, sink, reference=None, tolerant=True, decodeWorkers=2, sinkWorkers=1,
+                 processes=0, queueSize=1000, batch=50):
+        self.sink = sink
+        self.reference = reference
+        self.tolerant = tolerant
+        self.decodeWorkers = max(decodeWorkers, processes)
+        self.sinkWorkers = sinkWorkers
+        self.processes = processes
+        self.batch = batch
+
+        self.ingest = queue.Queue(queueSize)  # (code, text, time of put)
+        self.decoded = queue.Queue(max(1, queueSize // batch))  # Batches of (Metar, time of put)
+        self.stages = {'decode': StageMetrics(), 'sink': StageMetrics()}
+        self.errors = []
+
+        self._threads = {'decode': [], 'sink': []}
+        self._remaining = {}  # stage => workers not stopped
+        self._lock = threading.Lock()
+        self._pool = None
+        self._received = 0
+        self._started = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def start(self):
+        """Start worker threads (and processes)
+
+        Returns:
+            (DecodePipeline): Pipeline
+        """
+        if self.processes:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(self.processes)
+
+        self._started = time.monotonic()
+        for stage, workers, target in (('decode', self.decodeWorkers, self._decodeWorker),
+                                       ('sink', self.sinkWorkers, self._sinkWorker)):
+            self._remaining[stage] = workers
+            for number in range(workers):
+                thread = threading.Thread(target=target, name='metar-{0}-{1}'.format(stage, number),
+                                          daemon=True)
+                thread.start()
+                self._threads[stage].append(thread)
+
+        return self
+
+    def put(self, code, text, timeout=None):
+        """Put a raw report in pipeline. Blocks while ingest queue is full.
+
+        Args:
+            code (string): OACI code
+            text (string): Raw report
+            timeout (float, optional): Maximum seconds to wait. Defaults to no limit.
+
+        Exception raised:
+            - queue.Full: If queue still full after timeout (report not added)
+        """
+        self.ingest.put((code, text, time.monotonic()), timeout=timeout)
+        with self._lock:
+            self._received += 1
+
+    def close(self):
+        """Wait until all reports put are decoded and sunk, then stop workers
+        (and processes)
+        """
+        for _ in self._threads['decode']:
+            self.ingest.put(_STOP)
+
+        for stage in ('decode', 'sink'):
+            for thread in self._threads[stage]:
+                thread.join()
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _error(self, stage, code, err):
+        with self._lock:
+            self.errors.append((stage, code, err))
+            del self.errors[:-100]
+
+    def _stopped(self, stage):
+        """Worker of stage stopped: last one stops next stage
+        """
+        with self._lock:
+            self._remaining[stage] -= 1
+            last = not self._remaining[stage]
+
+        if last and stage == 'decode':
+            for _ in self._threads['sink']:
+                self.decoded.put(_STOP)
+
+    def _decodeWorker(self):
+        stopping = False
+        while not stopping:
+            items = []
+            item = self.ingest.get()
+            while item is not _STOP:  # Reports already waiting are decoded together
+                items.append(item)
+                if len(items) == self.batch:
+                    break
+                try:
+                    item = self.ingest.get_nowait()
+                except queue.Empty:
+                    break
+
+            stopping = item is _STOP
+            if not items:
+                continue
+
+            start = time.monotonic()
+            batch = [(code, text, self.reference, self.tolerant) for code, text, _ in items]
+            if self._pool is not None:
+                try:
+                    results = self._pool.submit(_decodeBatch, batch).result()
+                except Exception as err:  # Worker process failed: whole batch in error
+                    results = [(None, err)] * len(batch)
+            else:
+                results = _decodeBatch(batch)
+
+            end = time.monotonic()
+            decoded = []
+            errors = 0
+            for (code, _, received), (metar, err) in zip(items, results):
+                if err is None:
+                    decoded.append((metar, received))
+                else:
+                    errors += 1
+                    self._error('decode', code, err)
+
+            self.stages['decode'].add(len(items), errors, [end - received for _, _, received in items],
+                                      end - start)
+            if decoded:
+                self.decoded.put(decoded)
+
+        self._stopped('decode')
+
+    def _sinkWorker(self):
+        while True:
+            batch = self.decoded.get()
+            if batch is _STOP:
+                break
+
+            start = time.monotonic()
+            latencies = []
+            errors = 0
+            for metar, received in batch:
+                try:
+                    self.sink(metar)
+                except Exception as err:
+                    errors += 1
+                    self._error('sink', metar.airport, err)
+                latencies.append(time.monotonic() - received)
+
+            self.stages['sink'].add(len(batch), errors, latencies, time.monotonic() - start)
+
+        self._stopped('sink')
+
+    def metrics(self):
+        """Queue depths and stage metrics
+
+        Returns:
+            (dict): `received` (reports put), `queues` (depth and capacity of `ingest`
+            (reports) and `decoded` (batches of reports)), and by stage (`decode`, `sink`): `processed`, `errors`,
+            `meanLatency` & `maxLatency` (seconds since report put), `utilisation`
+            (busy time / (workers x time since start))
+        """
+        elapsed = time.monotonic() - self._started if self._started is not None else 0
+        metrics = {
+            'received': self._received,
+            'queues': {name: {'depth': line.qsize(), 'capacity': line.maxsize}
+                       for name, line in (('ingest', self.ingest), ('decoded', self.decoded))}
+        }
+
+        for stage, workers in (('decode', self.decodeWorkers), ('sink', self.sinkWorkers)):
+            stageMetrics = self.stages[stage]
+            with stageMetrics.lock:
+                metrics[stage] = {
+                    'processed': stageMetrics.processed,
+                    'errors': stageMetrics.errors,
+                    'meanLatency': stageMetrics.latency / stageMetrics.processed if stageMetrics.processed else 0.0,
+                    'maxLatency': stageMetrics.maxLatency,
+                    'utilisation': stageMetrics.busy / (workers * elapsed) if workers and elapsed else 0.0
+                }
+
+        return metrics
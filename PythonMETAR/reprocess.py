@@ -0,0 +1,310 @@
+"""
+Resumable reprocessing of archives
+Author: Matthieu BOUCHET
+
+Decode archives of raw METAR (one report by line, `.gz` decompressed) in
+chunks, with worker processes, and write JSON lines or CSV to an output
+file. After each chunk, output is synced to disk and a checkpoint (input
+file, offset in file, output size, counts) is written atomically.
+A job started again with the same checkpoint resumes after last chunk
+saved: output is truncated to its checkpointed size first, so reports
+written after the checkpoint (job stopped during a chunk) are not
+duplicated.
+
+METAR give day of month only: month and year of observations are
+inferred from a reference time of each input file (see
+`fileReference()`), so archives of several years are decoded with their
+own dates.
+
+Run with:
+`pythonmetar archives/*.txt.gz --output decoded.jsonl --checkpoint decoded.checkpoint --workers 4`
+"""
+
+import csv
+import gzip
+import json
+import os
+import re
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from multiprocessing import Pool
+
+from PythonMETAR.cli import COLUMNS, _decodeChunk, boundedMap
+from PythonMETAR.diagnostics import BatchDiagnostics
+from PythonMETAR.metar import daysInMonth, parseReference
+
+CHECKPOINT_VERSION = 2  # Version 2: reference by input file
+
+REGEX_FILE_DATE = re.compile(r'(?<!\d)((?:19|20)\d{2})-?(0[1-9]|1[0-2])(?:-?(0[1-9]|[12]\d|3[01]))?(?!\d)')
+# Month (2021-03, 202103) or day (2021-03-29, 20210329) of an archive file name
+
+REFERENCE_SUFFIX = '.reference'
+# Sidecar file of an archive with its reference time (e.g. archive.txt.gz.reference)
+
+FORMATS = ('jsonl', 'csv')
+# Output formats which can be truncated and appended (not Parquet)
+
+
+def readChunks(paths, start=(0, 0), chunk=1000):
+    """Chunks of lines of files, with position after each chunk. A chunk
+    never spans two files.
+
+    Args:
+        paths (list): Files (.gz decompressed)
+        start (tuple, optional): (index of file, offset in file) to start from. Defaults to (0, 0).
+        chunk (integer, optional): Lines per chunk. Defaults to 1000.
+
+    Yields:
+        (tuple): (index of file, offset after chunk, list of lines). Offset
+        is in decompressed bytes for gzip files.
+    """
+    for index in range(start[0], len(paths)):
+        path = paths[index]
+        file = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+        with file:
+            if index == start[0] and start[1]:
+                file.seek(start[1])
+
+            while True:
+                lines = []
+                for _ in range(chunk):
+                    line = file.readline()
+                    if not line:
+                        break
+                    lines.append(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+
+                if not lines:
+                    break
+                yield index, file.tell(), lines
+
+
+def fileReference(path, default=None):
+    """Reference time of observations of an archive: content of sidecar
+    file `path + REFERENCE_SUFFIX` ("YYYY/MM/DD HH:MM"), else last minute
+    of month or day in file name (e.g. `metar-2019-03.txt.gz` =>
+    "2019/03/31 23:59", `LFLY_20190314.txt` => "2019/03/14 23:59"),
+    else default.
+
+    Args:
+        path (string): Archive
+        default (string, optional): Reference if none found. Defaults to None.
+
+    Returns:
+        (string): Reference time (YYYY/MM/DD HH:MM)
+
+    Exception raised:
+        - ValueError: If sidecar file is not a reference time
+    """
+    try:
+        with open(path + REFERENCE_SUFFIX, encoding='utf-8') as file:
+            reference = file.read().strip()
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            parseReference(reference)
+        except (ValueError, TypeError):
+            raise ValueError('{0}{1}: not a reference time ({2!r})'.format(path, REFERENCE_SUFFIX, reference))
+        return reference
+
+    dates = REGEX_FILE_DATE.findall(os.path.basename(path))
+    if not dates:
+        return default
+
+    year, month, day = dates[-1]
+    last = daysInMonth(int(year), int(month))
+    if day and int(day) > last:
+        return default
+
+    return '{0}/{1}/{2:02d} 23:59'.format(year, month, int(day) if day else last)
+
+
+def loadCheckpoint(path):
+    """Read a checkpoint
+
+    Returns:
+        (dict): Checkpoint, None if file doesn't exist
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    if checkpoint.get('version', 0) > CHECKPOINT_VERSION:
+        raise ValueError('Checkpoint version {0} not supported'.format(checkpoint.get('version')))
+
+    return checkpoint
+
+
+def saveCheckpoint(path, checkpoint):
+    """Write a checkpoint atomically (temporary file synced and renamed)
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temporary, path)
+
+
+def _restoreDiagnostics(summary):
+    diagnostics = BatchDiagnostics()
+    for key in ('reports', 'reportsWithErrors', 'reportsWithUnparsed', 'reportsWithConflicts'):
+        setattr(diagnostics, key, summary[key])
+    for key in ('errors', 'unparsed', 'conflicts'):
+        setattr(diagnostics, key, Counter(summary[key]))
+
+    return diagnostics
+
+
+class Reprocessor:
+    """Resumable decoding job of archives.
+
+    Args:
+        inputs (list): Input files (.gz decompressed). Standard input can't be resumed.
+        output (string): Output file
+        checkpoint (string): Checkpoint file. Job resumes from it if it exists.
+        format (string, optional): 'jsonl' or 'csv'. Defaults to 'jsonl'.
+        reference (string, optional): Reference time of observations of files without
+        reference of their own (see `fileReference()`). Defaults to current UTC time at
+        first start. References are kept in checkpoint.
+        strict (boolean, optional): Non-tolerant decoding (report skipped if an analyzer raises)
+        workers (integer, optional): Worker processes (1: in current process). Defaults to 1.
+        chunk (integer, optional): Lines per chunk (and per checkpoint). Defaults to 1000.
+
+    Attributes
+    -----------
+    - state (dict): Checkpoint: `file` (index of input), `offset`, `outputSize`,
+      `lines`, `written`, `skipped`, `done`, `diagnostics` (summary),
+      `references` (reference time by input)
+    """
+
+    def __init__(self, inputs, output, checkpoint, format='jsonl', reference=None, strict=False,
+                 workers=1, chunk=1000):
+        if format not in FORMATS:
+            raise ValueError('Format {0} can\'t be resumed, use one of {1}'.format(format, FORMATS))
+        if '-' in inputs or output == '-':
+            raise ValueError('Standard input and output can\'t be resumed')
+
+        self.inputs = [os.path.abspath(path) for path in inputs]
+        self.output = os.path.abspath(output)
+        self.checkpoint = checkpoint
+        self.format = format
+        self.strict = strict
+        self.workers = workers
+        self.chunk = chunk
+
+        state = loadCheckpoint(checkpoint)
+        if state is None:
+            if reference is None:
+                reference = datetime.now(timezone.utc).strftime('%Y/%m/%d %H:%M')
+            state = {
+                'version': CHECKPOINT_VERSION, 'inputs': self.inputs, 'output': self.output,
+                'format': format, 'reference': reference, 'strict': strict,
+                'references': [fileReference(path, reference) for path in self.inputs],
+                'file': 0, 'offset': 0, 'outputSize': None, 'lines': 0, 'written': 0,
+                'skipped': 0, 'done': False, 'diagnostics': BatchDiagnostics().summary(None)
+            }
+        else:
+            for key, value in (('inputs', self.inputs), ('output', self.output), ('format', format)):
+                if state[key] != value:
+                    raise ValueError('Checkpoint {0} is for another job ({1} differs)'.format(checkpoint, key))
+            if 'references' not in state:  # Version 1: one reference for job
+                state['references'] = [state['reference']] * len(self.inputs)
+
+        self.state = state
+        self.reference = state['reference']
+        self.references = state['references']
+
+    def _openOutput(self):
+        size = self.state['outputSize']
+        if size is None:  # First start
+            file = open(self.output, 'w', encoding='utf-8', newline='')
+        else:
+            # Reports written after last checkpoint are discarded
+            os.truncate(self.output, size)
+            file = open(self.output, 'a', encoding='utf-8', newline='')
+
+        writer = None
+        if self.format == 'csv':
+            writer = csv.DictWriter(file, COLUMNS)
+            if size is None:
+                writer.writeheader()
+
+        return file, writer
+
+    def run(self, progress=None):
+        """Run (or resume) job until all inputs are decoded
+
+        Args:
+            progress (callable, optional): Called after each checkpoint with a dictionnary:
+            `file` (input path), `lines`, `written`, `skipped` (totals of job), `elapsed`
+            (seconds of this run), `rate` (lines/s of this run)
+
+        Returns:
+            (dict): Final checkpoint (see `state`)
+        """
+        state = self.state
+        if state['done']:
+            return state
+
+        start = time.perf_counter()
+        linesAtStart = state['lines']
+        diagnostics = _restoreDiagnostics(state['diagnostics'])
+        file, writer = self._openOutput()
+
+        positions = deque()  # (index of file, offset) of chunks submitted, in order
+
+        def tasks():
+            for index, offset, lines in readChunks(self.inputs, (state['file'], state['offset']), self.chunk):
+                positions.append((index, offset, len(lines)))
+                yield lines, self.references[index], self.strict, self.format
+
+        pool = Pool(self.workers) if self.workers > 1 else None
+        try:
+            # Results in order of chunks, 2 chunks by worker read ahead at most
+            if pool is None:
+                results = map(_decodeChunk, tasks())
+            else:
+                results = boundedMap(pool, _decodeChunk, tasks(), 2 * self.workers)
+
+            for outputs, skipped, chunkDiagnostics in results:
+                index, offset, lines = positions.popleft()
+
+                if writer is None:
+                    file.writelines(line + '\n' for line in outputs)
+                else:
+                    writer.writerows(outputs)
+                file.flush()
+                os.fsync(file.fileno())
+
+                diagnostics.merge(chunkDiagnostics)
+                state.update({
+                    'file': index, 'offset': offset, 'outputSize': os.fstat(file.fileno()).st_size,
+                    'lines': state['lines'] + lines, 'written': state['written'] + len(outputs),
+                    'skipped': state['skipped'] + skipped, 'diagnostics': diagnostics.summary(None)
+                })
+                saveCheckpoint(self.checkpoint, state)
+
+                if progress is not None:
+                    elapsed = time.perf_counter() - start
+                    progress({
+                        'file': self.inputs[index], 'lines': state['lines'], 'written': state['written'],
+                        'skipped': state['skipped'], 'elapsed': elapsed,
+                        'rate': (state['lines'] - linesAtStart) / elapsed if elapsed else 0
+                    })
+
+            if state['outputSize'] is None:  # No line in inputs
+                state['outputSize'] = os.fstat(file.fileno()).st_size
+            state['done'] = True
+            saveCheckpoint(self.checkpoint, state)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            file.close()
+
+        return state
@@ -0,0 +1,799 @@
+"""
+Binary serialization of decoded METAR
+Author: Matthieu BOUCHET
+
+Compact, versioned binary format for decoded reports (airport, date
+provided by server and every field of `Metar.properties`). Types are
+preserved (tuples stay tuples, integers stay integers).
+
+Format
+------
+- Header: `MAGIC` + version (1 byte)
+- Records: length (varint) + value of record, a tuple
+  (airport, data_date, properties)
+
+Each value starts with a tag (1 byte): None, booleans, fixed-width
+integers (1, 2, 4 or 8 bytes), decimals (hundredths in 2 or 4 bytes),
+floats (8 bytes), UTC datetimes (8 bytes), strings of `STRINGS` table
+(code, 1 byte) or UTF-8, tuples, lists, dictionnaries with keys of `SHAPES` table (shape code,
+1 byte, then values) or any keys.
+
+Records of `Metar` properties are written with a fixed layout (tag
+`FIXED_RECORD`, version 4): one struct for date time, wind, weather,
+temperatures, QNH, visibility and observation time (categorical values
+as codes of `codes` tables), one struct by RVR group and cloud layer,
+then airport, server date, METAR text, changements and remarks as tagged
+values. Other records (e.g. values out of range) are tagged tuples.
+Categorical values are read back as shared `codes.Category` instances.
+
+`STRINGS` and `SHAPES` are append only: a new entry increments `VERSION`,
+and a reader reads every version up to its own.
+"""
+
+import struct
+from datetime import datetime, timezone
+
+from PythonMETAR.codes import (CLOUD_CLASSIFICATIONS, CLOUD_COVERS, RUNWAYS, RVR_QUALIFIER_CODES,
+                               RVR_TENDENCY_CODES, RVR_UNITS, TABLES, WEATHER_PREFIXES, WEATHERS,
+                               Category)
+
+MAGIC = b'PMTR'
+VERSION = 4
+
+STRINGS = (
+    # Cloud cover
+    'SKC', 'FEW', 'SCT', 'BKN', 'OVC', 'VV',
+    'Sky Clear', 'Few', 'Scattered', 'Broken', 'Overcast', 'Invisible Sky',
+    # Weather prefixes
+    'in Vicinity', 'Thin', 'Partial', 'Low Drifting', 'Blowing', 'Freezing',
+    'Recent', 'Bank', 'Shower', 'Violent',
+    # Weather phenomena
+    'Rain', 'Snow', 'Hail', 'Drizzle', 'Ice Pellets', 'Gresil', 'Snow Grains',
+    'Ice Crystals', 'Unknown', 'Brume', 'Fog', 'Haze', 'Smoke', 'Sand', 'Dust',
+    'Volcanic Ash', 'Dust whirlpool', 'Sand Storm', 'Dust Storm', 'Squalls',
+    'Funnel Cloud', 'Thunderstorm',
+    # Wind, remarks
+    'VRB', 'AO1', 'AO2',
+    # Version 2: RVR qualifiers, units, tendencies
+    'M', 'P', 'm', 'ft', 'U', 'D', 'N',
+)
+# Interned strings, index = code (append only)
+
+SHAPES = (
+    ('dateTime', 'metar', 'auto', 'wind', 'rvr', 'weather', 'cloud', 'temperatures',
+     'qnh', 'visibility', 'changements', 'remarks'),
+    ('direction', 'speed', 'gust', 'variation'),
+    ('runway', 'visibility'),
+    ('intensity', 'prefix', 'weather'),
+    ('code', 'meaning', 'oktaMin', 'oktaMax', 'altitude', 'presenceCB', 'presenceTCU'),
+    ('temperature', 'dewpoint'),
+    ('TEMPO', 'BECMG', 'GRADU', 'RAPID', 'INTER', 'TEND'),
+    ('text', 'station', 'seaLevelPressure', 'hourlyPrecipitation', 'precipitation6h',
+     'precipitation24h', 'temperature', 'dewpoint', 'maxTemperature6h', 'minTemperature6h',
+     'maxTemperature24h', 'minTemperature24h', 'pressureTendency', 'unparsed'),
+    ('code', 'change'),
+    # Version 2
+    ('runway', 'visibility', 'qualifier', 'maxVisibility', 'maxQualifier', 'unit', 'tendency'),
+    # Version 3
+    ('dateTime', 'metar', 'auto', 'wind', 'rvr', 'weather', 'cloud', 'temperatures',
+     'qnh', 'visibility', 'changements', 'remarks', 'observationTime'),
+)
+# Keys of dictionnaries of `Metar` properties, index = shape code (append only)
+
+# Tags
+NONE, FALSE, TRUE = 0, 1, 2
+INT8, INT16, INT32, INT64 = 3, 4, 5, 6
+CENTS16, CENTS32, FLOAT64 = 7, 8, 9
+STRING_CODE, STRING = 10, 11
+TUPLE, LIST, SHAPED_DICT, DICT = 12, 13, 14, 15
+BIG_INT = 16  # Integer out of 8 bytes (decimal string)
+DATETIME = 17  # Version 3: UTC datetime, seconds since epoch (8 bytes)
+FIXED_RECORD = 18  # Version 4: record with fixed layout (see `_encodeFixed()`)
+
+_INT8 = struct.Struct('<b')
+_INT16 = struct.Struct('<h')
+_INT32 = struct.Struct('<i')
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+
+_BYTES = tuple(bytes((byte,)) for byte in range(256))
+
+_STRING_CODES = {string: code for code, string in enumerate(STRINGS)}
+_STRING_VALUES = tuple(next((value for table in TABLES.values() for value in table if value == string), string)
+                       for string in STRINGS)
+# Strings of codes, as shared `Category` if categorical
+_SHAPE_CODES = {shape: code for code, shape in enumerate(SHAPES)}
+
+
+def _varint(number):
+    """Unsigned integer in LEB128 (7 bits by byte)
+    """
+    if number < 0x80:
+        return _BYTES[number]
+
+    data = bytearray()
+    while number >= 0x80:
+        data.append((number & 0x7f) | 0x80)
+        number >>= 7
+    data.append(number)
+
+    return bytes(data)
+
+
+def _readVarint(data, position):
+    number = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+## ENCODING ##
+
+def _encodeInteger(value, out):
+    if -0x80 <= value < 0x80:
+        out.append(INT8)
+        out += _INT8.pack(value)
+    elif -0x8000 <= value < 0x8000:
+        out.append(INT16)
+        out += _INT16.pack(value)
+    elif -0x80000000 <= value < 0x80000000:
+        out.append(INT32)
+        out += _INT32.pack(value)
+    elif -0x8000000000000000 <= value < 0x8000000000000000:
+        out.append(INT64)
+        out += _INT64.pack(value)
+    else:
+        digits = str(value).encode()
+        out.append(BIG_INT)
+        out += _varint(len(digits))
+        out += digits
+
+
+def _encodeFloat(value, out):
+    # Values decoded from text have 2 decimals at most: stored as hundredths
+    if value == value and abs(value) < 2 ** 31 / 100:
+        cents = round(value * 100)
+        if cents / 100 == value and not (value == 0 and str(value)[0] == '-'):
+            if -0x8000 <= cents < 0x8000:
+                out.append(CENTS16)
+                out += _INT16.pack(cents)
+            else:
+                out.append(CENTS32)
+                out += _INT32.pack(cents)
+            return
+
+    out.append(FLOAT64)
+    out += _FLOAT64.pack(value)
+
+
+def _encodeString(value, out):
+    code = _STRING_CODES.get(value)
+    if code is not None:
+        out.append(STRING_CODE)
+        out.append(code)
+        return
+
+    data = value.encode('utf-8')
+    out.append(STRING)
+    out += _varint(len(data))
+    out += data
+
+
+def _encodeSequence(value, out):
+    out.append(TUPLE if type(value) is tuple else LIST)
+    out += _varint(len(value))
+    for item in value:
+        encoder = _ENCODERS.get(type(item))
+        if encoder is None:
+            _encode(item, out)
+        else:
+            encoder(item, out)
+
+
+def _encodeDict(value, out):
+    code = _SHAPE_CODES.get(tuple(value))
+    if code is not None:
+        out.append(SHAPED_DICT)
+        out.append(code)
+        for item in value.values():
+            encoder = _ENCODERS.get(type(item))
+            if encoder is None:
+                _encode(item, out)
+            else:
+                encoder(item, out)
+        return
+
+    out.append(DICT)
+    out += _varint(len(value))
+    for key, item in value.items():
+        _encode(key, out)
+        _encode(item, out)
+
+
+def _encodeDatetime(value, out):
+    if value.tzinfo is None:
+        raise TypeError('Naive datetime can\'t be serialized')
+    if value.microsecond:
+        raise TypeError('Datetime with microseconds can\'t be serialized')
+
+    out.append(DATETIME)
+    out += _INT64.pack(int(value.timestamp()))
+
+
+def _encodeNone(value, out):
+    out.append(NONE)
+
+
+def _encodeBoolean(value, out):
+    out.append(TRUE if value else FALSE)
+
+
+_ENCODERS = {
+    type(None): _encodeNone,
+    bool: _encodeBoolean,
+    int: _encodeInteger,
+    float: _encodeFloat,
+    str: _encodeString,
+    tuple: _encodeSequence,
+    list: _encodeSequence,
+    dict: _encodeDict,
+    datetime: _encodeDatetime,
+}
+
+
+def _encode(value, out):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:  # Subclass (e.g. `codes.Category`): encoder of base type, kept for next values
+        encoder = next((_ENCODERS[base] for base in type(value).__mro__ if base in _ENCODERS), None)
+        if encoder is None:
+            raise TypeError('Type {0} can\'t be serialized'.format(type(value).__name__))
+        _ENCODERS[type(value)] = encoder
+
+    encoder(value, out)
+
+## FIXED LAYOUT ##
+
+_PROPERTIES = SHAPES[10]
+
+_HEADER = struct.Struct('<HBBBHBBHHBHIbbHHqBB')
+# flags, day, hour, minute, wind direction, speed, gust, variation (from, to),
+# intensity, prefixes (bits), weathers (bits), temperature, dewpoint, QNH,
+# visibility, observation time, RVR groups, cloud layers
+_RVR = struct.Struct('<HHBHBBB')
+# runway, visibility, qualifier, maximum visibility, maximum qualifier, unit, tendency
+_CLOUD = struct.Struct('<BHB')
+# cover, altitude, CB (1) & TCU (2)
+
+# Flags of header
+DATE_TIME, AUTO, WIND, VRB, GUST, VARIATION, RVR, WEATHER = (1 << bit for bit in range(8))
+CLOUD, TEMPERATURES, QNH, INHG, VISIBILITY, OBSERVATION = (1 << bit for bit in range(8, 14))
+
+_MISSING = 0xffff  # Missing unsigned value (altitude of VV///, maximum visibility)
+_MISSING_TEMPERATURE = -128
+
+_TWO_DIGITS = tuple('{0:02d}'.format(number) for number in range(100))
+_TWO_DIGIT_CODES = {digits: number for number, digits in enumerate(_TWO_DIGITS)}
+
+_CLOUD_TEMPLATES = tuple(
+    dict(classification) for classification in CLOUD_CLASSIFICATIONS
+) + ({'code': CLOUD_COVERS[5], 'meaning': TABLES['cloudMeaning'][5], 'oktaMin': None, 'oktaMax': None},)
+# Cover code => values of layer (vertical visibility without okta)
+
+_OPTIONAL_CODES = {None: 0}
+_OPTIONAL_VALUES = {}
+for _table in (RVR_QUALIFIER_CODES, RVR_TENDENCY_CODES):
+    _OPTIONAL_VALUES[_table[0].kind] = (None,) + _table
+# Optional categorical value (None or value of table) <=> code + 1 (0: None)
+
+
+def _integer(value, limit):
+    """Integer value in [0, limit[, ValueError if not
+    """
+    if type(value) is not int or not 0 <= value < limit:
+        raise ValueError(value)
+
+    return value
+
+
+def _code(value, kind):
+    """Code of a categorical value of a kind, ValueError if not
+    """
+    if type(value) is not Category or value.kind != kind:
+        raise ValueError(value)
+
+    return value.code
+
+
+def _optionalCode(value, kind):
+    return 0 if value is None else _code(value, kind) + 1
+
+
+def _bits(values, kind):
+    """Bits of categorical values in order of table (None: 0), ValueError if not
+    """
+    if values is None:
+        return 0
+    if type(values) is not tuple or not values:
+        raise ValueError(values)
+
+    bits = last = 0
+    for value in values:
+        bit = 1 << _code(value, kind)
+        if bit <= last:  # Order of table, without duplicate
+            raise ValueError(values)
+        bits |= bit
+        last = bit
+
+    return bits
+
+
+def _values(bits, table):
+    if not bits:
+        return None
+
+    return tuple(value for code, value in enumerate(table) if bits >> code & 1)
+
+
+def _encodeFixed(airport, data_date, properties, out):
+    """Fixed layout of a record, ValueError (nothing written) if properties
+    don't fit (unknown keys, types or values out of range)
+    """
+    if tuple(properties) != _PROPERTIES:
+        raise ValueError('Shape')
+
+    flags = 0
+    day = hour = minute = direction = speed = gust = variationFrom = variationTo = 0
+    intensity = prefixes = weathers = qnh = visibility = observation = 0
+    temperature = dewpoint = _MISSING_TEMPERATURE
+
+    dateTime = properties['dateTime']
+    if dateTime is not None:
+        if type(dateTime) is not tuple or len(dateTime) != 3:
+            raise ValueError(dateTime)
+        flags |= DATE_TIME
+        day, hour, minute = (_TWO_DIGIT_CODES[value] for value in dateTime)
+
+    auto = properties['auto']
+    if type(auto) is not bool:
+        raise ValueError(auto)
+    if auto:
+        flags |= AUTO
+
+    wind = properties['wind']
+    if wind is not None:
+        if tuple(wind) != SHAPES[1]:
+            raise ValueError(wind)
+        flags |= WIND
+        direction = wind['direction']
+        if direction == 'VRB':
+            flags |= VRB
+            direction = 0
+        else:
+            _integer(direction, 0x10000)
+        speed = _integer(wind['speed'], 0x100)
+        if wind['gust'] is not None:
+            flags |= GUST
+            gust = _integer(wind['gust'], 0x100)
+        variation = wind['variation']
+        if variation is not None:
+            if type(variation) is not tuple or len(variation) != 2:
+                raise ValueError(variation)
+            flags |= VARIATION
+            variationFrom = _integer(variation[0], 0x10000)
+            variationTo = _integer(variation[1], 0x10000)
+
+    rvr = properties['rvr']
+    if rvr is not None:
+        if type(rvr) is not tuple or len(rvr) > 0xff:
+            raise ValueError(rvr)
+        flags |= RVR
+        groups = []
+        for group in rvr:
+            if tuple(group) != SHAPES[9]:
+                raise ValueError(group)
+            maxVisibility = group['maxVisibility']
+            groups.append(_RVR.pack(
+                _code(group['runway'], 'runway'),
+                _integer(group['visibility'], 0x10000),
+                _optionalCode(group['qualifier'], 'rvrQualifier'),
+                _MISSING if maxVisibility is None else _integer(maxVisibility, _MISSING),
+                _optionalCode(group['maxQualifier'], 'rvrQualifier'),
+                _code(group['unit'], 'rvrUnit'),
+                _optionalCode(group['tendency'], 'rvrTendency')))
+
+    weather = properties['weather']
+    if weather is not None:
+        if tuple(weather) != SHAPES[3]:
+            raise ValueError(weather)
+        flags |= WEATHER
+        intensity = weather['intensity']
+        if intensity is not None and type(intensity) is not bool:
+            raise ValueError(intensity)
+        intensity = 0 if intensity is None else intensity + 1
+        prefixes = _bits(weather['prefix'], 'weatherPrefix')
+        weathers = _bits(weather['weather'], 'weather')
+
+    cloud = properties['cloud']
+    if cloud is not None:
+        if type(cloud) is not tuple or len(cloud) > 0xff:
+            raise ValueError(cloud)
+        flags |= CLOUD
+        layers = []
+        for layer in cloud:
+            if tuple(layer) != SHAPES[4]:
+                raise ValueError(layer)
+            cover = _code(layer['code'], 'cloudCover')
+            template = _CLOUD_TEMPLATES[cover]
+            if (layer['meaning'] is not template['meaning'] or layer['oktaMin'] != template['oktaMin']
+                    or layer['oktaMax'] != template['oktaMax']):
+                raise ValueError(layer)
+            altitude = layer['altitude']
+            cb, tcu = layer['presenceCB'], layer['presenceTCU']
+            if type(cb) is not bool or type(tcu) is not bool:
+                raise ValueError(layer)
+            layers.append(_CLOUD.pack(cover, _MISSING if altitude is None else _integer(altitude, _MISSING),
+                                      cb | tcu << 1))
+
+    temperatures = properties['temperatures']
+    if temperatures is not None:
+        if tuple(temperatures) != SHAPES[5]:
+            raise ValueError(temperatures)
+        flags |= TEMPERATURES
+        if temperatures['temperature'] is not None:
+            temperature = _integer(temperatures['temperature'] + 127, 255) - 127
+        if temperatures['dewpoint'] is not None:
+            dewpoint = _integer(temperatures['dewpoint'] + 127, 255) - 127
+
+    value = properties['qnh']
+    if value is not None:
+        flags |= QNH
+        if type(value) is float:
+            flags |= INHG
+            qnh = round(value * 100)
+            if qnh / 100 != value:
+                raise ValueError(value)
+        qnh = _integer(qnh if flags & INHG else value, 0x10000)
+
+    value = properties['visibility']
+    if value is not None:
+        flags |= VISIBILITY
+        visibility = _integer(value, 0x10000)
+
+    value = properties['observationTime']
+    if value is not None:
+        if type(value) is not datetime or value.utcoffset() is None or value.microsecond:
+            raise ValueError(value)
+        flags |= OBSERVATION
+        observation = int(value.timestamp())
+
+    out.append(FIXED_RECORD)
+    out += _HEADER.pack(flags, day, hour, minute, direction, speed, gust, variationFrom, variationTo,
+                        intensity, prefixes, weathers, temperature, dewpoint, qnh, visibility,
+                        observation, len(rvr) if rvr else 0, len(cloud) if cloud else 0)
+    if rvr:
+        out += b''.join(groups)
+    if cloud:
+        out += b''.join(layers)
+
+    for item in (airport, data_date, properties['metar'], properties['changements'], properties['remarks']):
+        _encode(item, out)
+
+
+def _decodeFixed(data, position):
+    (flags, day, hour, minute, direction, speed, gust, variationFrom, variationTo, intensity,
+     prefixes, weathers, temperature, dewpoint, qnh, visibility, observation,
+     rvrCount, cloudCount) = _HEADER.unpack_from(data, position)
+    position += _HEADER.size
+
+    rvr = cloud = None
+    if flags & RVR:
+        qualifiers = _OPTIONAL_VALUES['rvrQualifier']
+        tendencies = _OPTIONAL_VALUES['rvrTendency']
+        rvr = []
+        for _ in range(rvrCount):
+            runway, minimum, qualifier, maximum, maxQualifier, unit, tendency = _RVR.unpack_from(data, position)
+            position += _RVR.size
+            rvr.append({
+                'runway': RUNWAYS[runway],
+                'visibility': minimum,
+                'qualifier': qualifiers[qualifier],
+                'maxVisibility': None if maximum == _MISSING else maximum,
+                'maxQualifier': qualifiers[maxQualifier],
+                'unit': RVR_UNITS[unit],
+                'tendency': tendencies[tendency]
+            })
+        rvr = tuple(rvr)
+
+    if flags & CLOUD:
+        cloud = []
+        for _ in range(cloudCount):
+            cover, altitude, presence = _CLOUD.unpack_from(data, position)
+            position += _CLOUD.size
+            layer = dict(_CLOUD_TEMPLATES[cover])
+            layer['altitude'] = None if altitude == _MISSING else altitude
+            layer['presenceCB'] = presence & 1 == 1
+            layer['presenceTCU'] = presence & 2 == 2
+            cloud.append(layer)
+        cloud = tuple(cloud)
+
+    airport, position = _DECODERS[data[position]](data, position + 1)
+    data_date, position = _DECODERS[data[position]](data, position + 1)
+    metar, position = _DECODERS[data[position]](data, position + 1)
+    changements, position = _DECODERS[data[position]](data, position + 1)
+    remarks, position = _DECODERS[data[position]](data, position + 1)
+
+    if flags & QNH:
+        qnh = qnh / 100 if flags & INHG else qnh
+    else:
+        qnh = None
+
+    properties = {
+        'dateTime': (_TWO_DIGITS[day], _TWO_DIGITS[hour], _TWO_DIGITS[minute]) if flags & DATE_TIME else None,
+        'metar': metar,
+        'auto': flags & AUTO == AUTO,
+        'wind': {
+            'direction': 'VRB' if flags & VRB else direction,
+            'speed': speed,
+            'gust': gust if flags & GUST else None,
+            'variation': (variationFrom, variationTo) if flags & VARIATION else None
+        } if flags & WIND else None,
+        'rvr': rvr,
+        'weather': {
+            'intensity': None if intensity == 0 else intensity == 2,
+            'prefix': _values(prefixes, WEATHER_PREFIXES),
+            'weather': _values(weathers, WEATHERS)
+        } if flags & WEATHER else None,
+        'cloud': cloud,
+        'temperatures': {
+            'temperature': None if temperature == _MISSING_TEMPERATURE else temperature,
+            'dewpoint': None if dewpoint == _MISSING_TEMPERATURE else dewpoint
+        } if flags & TEMPERATURES else None,
+        'qnh': qnh,
+        'visibility': visibility if flags & VISIBILITY else None,
+        'changements': changements,
+        'remarks': remarks,
+        'observationTime': datetime.fromtimestamp(observation, timezone.utc) if flags & OBSERVATION else None
+    }
+
+    return (airport, data_date, properties), position
+
+
+def encodeRecord(metar):
+    """Binary record (without header) of a decoded METAR
+
+    Args:
+        metar (Metar or dict): Decoded METAR, or record returned by `decodeRecord()`
+
+    Returns:
+        (bytes): Record
+    """
+    if isinstance(metar, dict):
+        record = (metar['airport'], metar['dataDate'], metar['properties'])
+    else:
+        record = (metar.airport, metar.data_date, metar.properties)
+
+    out = bytearray()
+    try:
+        _encodeFixed(*record, out)
+    except (ValueError, KeyError, TypeError, struct.error):
+        del out[:]
+        _encode(record, out)
+
+    return bytes(out)
+
+
+## DECODING ##
+
+def _fixed(structure, scale=None):
+    size = structure.size
+    unpack = structure.unpack_from
+
+    if scale is None:
+        def decode(data, position):
+            return unpack(data, position)[0], position + size
+    else:
+        def decode(data, position):
+            return unpack(data, position)[0] / scale, position + size
+
+    return decode
+
+
+def _constant(value):
+    def decode(data, position):
+        return value, position
+
+    return decode
+
+
+def _decodeStringCode(data, position):
+    return _STRING_VALUES[data[position]], position + 1
+
+
+def _decodeString(data, position):
+    length, position = _readVarint(data, position)
+    return str(data[position:position + length], 'utf-8'), position + length
+
+
+def _decodeBigInt(data, position):
+    text, position = _decodeString(data, position)
+    return int(text), position
+
+
+def _decodeDatetime(data, position):
+    return datetime.fromtimestamp(_INT64.unpack_from(data, position)[0], timezone.utc), position + 8
+
+
+def _decodeList(data, position):
+    length, position = _readVarint(data, position)
+    items = []
+    for _ in range(length):
+        item, position = _DECODERS[data[position]](data, position + 1)
+        items.append(item)
+
+    return items, position
+
+
+def _decodeTuple(data, position):
+    items, position = _decodeList(data, position)
+    return tuple(items), position
+
+
+def _decodeShapedDict(data, position):
+    shape = SHAPES[data[position]]
+    position += 1
+    value = {}
+    for key in shape:
+        value[key], position = _DECODERS[data[position]](data, position + 1)
+
+    return value, position
+
+
+def _decodeDict(data, position):
+    length, position = _readVarint(data, position)
+    value = {}
+    for _ in range(length):
+        key, position = _decode(data, position)
+        value[key], position = _decode(data, position)
+
+    return value, position
+
+
+_DECODERS = [None] * 256  # Tag => decoder
+_DECODERS[NONE] = _constant(None)
+_DECODERS[FALSE] = _constant(False)
+_DECODERS[TRUE] = _constant(True)
+_DECODERS[INT8] = _fixed(_INT8)
+_DECODERS[INT16] = _fixed(_INT16)
+_DECODERS[INT32] = _fixed(_INT32)
+_DECODERS[INT64] = _fixed(_INT64)
+_DECODERS[CENTS16] = _fixed(_INT16, 100)
+_DECODERS[CENTS32] = _fixed(_INT32, 100)
+_DECODERS[FLOAT64] = _fixed(_FLOAT64)
+_DECODERS[STRING_CODE] = _decodeStringCode
+_DECODERS[STRING] = _decodeString
+_DECODERS[BIG_INT] = _decodeBigInt
+_DECODERS[TUPLE] = _decodeTuple
+_DECODERS[LIST] = _decodeList
+_DECODERS[SHAPED_DICT] = _decodeShapedDict
+_DECODERS[DICT] = _decodeDict
+_DECODERS[DATETIME] = _decodeDatetime
+_DECODERS[FIXED_RECORD] = _decodeFixed
+
+
+def _decode(data, position):
+    decoder = _DECODERS[data[position]]
+    if decoder is None:
+        raise ValueError('Unknown tag {0} at byte {1}'.format(data[position], position))
+
+    return decoder(data, position + 1)
+
+
+def decodeRecord(data):
+    """Decoded METAR of a binary record (without header)
+
+    Args:
+        data (bytes-like): Record
+
+    Returns:
+        (dict): Keys `airport`, `dataDate` and `properties` (as `Metar.properties`)
+    """
+    (airport, data_date, properties), _ = _decode(data, 0)
+    return {'airport': airport, 'dataDate': data_date, 'properties': properties}
+
+
+def _checkHeader(header):
+    if len(header) < len(MAGIC) + 1 or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a METAR binary stream')
+
+    version = header[len(MAGIC)]
+    if version > VERSION:
+        raise ValueError('Version {0} not supported (up to {1})'.format(version, VERSION))
+
+    return version
+
+
+def dumps(metar):
+    """Binary data (header & one record) of a decoded METAR
+
+    Returns:
+        (bytes): Data
+    """
+    return MAGIC + bytes((VERSION,)) + encodeRecord(metar)
+
+
+def loads(data):
+    """Decoded METAR of `dumps()` data
+
+    Returns:
+        (dict): See `decodeRecord()`
+    """
+    _checkHeader(data)
+    return decodeRecord(memoryview(data)[len(MAGIC) + 1:])
+
+
+## STREAMS ##
+
+class MetarWriter:
+    """Writer of records in a binary file (header written at creation)
+
+    Args:
+        file (file object): File opened in binary mode
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.records = 0
+        file.write(MAGIC + bytes((VERSION,)))
+
+    def write(self, metar):
+        """Write a decoded METAR (`Metar` or record dictionnary)
+        """
+        record = encodeRecord(metar)
+        self.file.write(_varint(len(record)) + record)
+        self.records += 1
+
+    def writeAll(self, metars):
+        """Write decoded METAR
+
+        Returns:
+            (integer): Number of records written
+        """
+        for metar in metars:
+            self.write(metar)
+
+        return self.records
+
+
+def readRecords(file):
+    """Read records of a binary file, one by one
+
+    Args:
+        file (file object): File opened in binary mode
+
+    Yields:
+        (dict): Record, see `decodeRecord()`
+    """
+    _checkHeader(file.read(len(MAGIC) + 1))
+
+    while True:
+        length = shift = 0
+        while True:
+            byte = file.read(1)
+            if not byte:
+                if shift:
+                    raise ValueError('Truncated record length')
+                return
+            length |= (byte[0] & 0x7f) << shift
+            if byte[0] < 0x80:
+                break
+            shift += 7
+
+        record = file.read(length)
+        if len(record) != length:
+            raise ValueError('Truncated record')
+
+        yield decodeRecord(record)
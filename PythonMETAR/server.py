@@ -0,0 +1,465 @@
+"""
+Local METAR feed server
+Author: Matthieu BOUCHET
+
+Fetch METAR of tracked stations once, decode once, and serve decoded
+reports (JSON) to local services over HTTP (TCP or Unix socket).
+Upstream requests go through a pool of persistent connections
+(`fetcher.MetarFetcher`).
+
+Endpoints
+---------
+- `GET /metar`: all decoded reports ({code: report})
+- `GET /metar/<CODE>`: decoded report of a station (404 if not available yet)
+- `GET /events?stations=CODE,CODE`: Server-Sent Events stream. Current
+  reports of stations are sent first, then each new report.
+  Stations not tracked are added to the feed while they have subscribers
+  (400 if a code is not 4 letters or digits, or if the feed already
+  tracks `maxStations`).
+
+Run with `python -m PythonMETAR.server LFLY LFPG --port 8080`
+"""
+
+import json
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PythonMETAR.fetcher import MetarFetcher
+from PythonMETAR.metar import Metar, NOAA_URL, NOAAServError, ReadFileError, reportJSON
+
+REGEX_STATION = re.compile(r'^[A-Z0-9]{4}$')
+# OACI code accepted from clients
+
+
+class MetarFeed:
+    """Shared feed of decoded METAR.
+
+    Each station is fetched once per refresh and decoded once, whatever
+    the number of clients. Subscribers are woken up when a new report
+    of a station arrives. Stations given at creation (or `track()`) are
+    always tracked; stations added by subscribers (`subscribe()`) are
+    tracked until their last subscriber leaves. A new station is fetched
+    at once (`refreshNew()`), alone: every station is fetched again only
+    each `interval`.
+
+    Args:
+        stations (iterable): OACI codes of tracked stations
+        source (string, optional): URL template of upstream server. Defaults to `NOAA_URL`.
+        interval (float, optional): Seconds between two refreshes. Defaults to 300.
+        timeout (float, optional): Timeout of upstream requests (seconds). Defaults to 30.
+        maxStations (integer, optional): Maximum stations tracked (subscriptions refused
+        beyond). Defaults to 500.
+        connections (integer, optional): Maximum persistent connections to upstream server.
+        Defaults to 4.
+    """
+
+    def __init__(self, stations=(), source=NOAA_URL, interval=300, timeout=30, maxStations=500,
+                 connections=4):
+        self.source = source
+        self.interval = interval
+        self.timeout = timeout
+        self.maxStations = maxStations
+        self.fetcher = MetarFetcher(source, timeout=timeout, connections=connections)
+
+        self.stations = []
+        self.new = set()  # Stations added since last fetch
+        self.pinned = set()  # Stations tracked without subscriber
+        self.subscribers = {}  # code => number of subscribers
+        self.reports = {}  # code => report (dict)
+        self.texts = {}  # code => last METAR text
+        self.versions = {}  # code => version of report
+        self.version = 0
+        self.errors = {}  # code => last error message
+
+        self.condition = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+        for code in stations:
+            self.track(code)
+
+    @staticmethod
+    def normalize(code):
+        """Normalized OACI code
+
+        Exception raised:
+            - ValueError: If code is not 4 letters or digits
+        """
+        normalized = code.strip().upper()
+        if not REGEX_STATION.match(normalized):
+            raise ValueError('Invalid station code {0!r}'.format(code))
+
+        return normalized
+
+    def track(self, code):
+        """Add a station to the feed (fetched at next refresh), tracked
+        until `stop()`
+
+        Returns:
+            (string): Normalized code
+
+        Exception raised:
+            - ValueError: If code is invalid
+        """
+        code = self.normalize(code)
+        with self.condition:
+            self.pinned.add(code)
+            if code not in self.stations:
+                self.stations.append(code)
+                self.new.add(code)
+                self._wake.set()
+
+        return code
+
+    def subscribe(self, codes):
+        """Add a subscriber of stations. Stations not tracked are added
+        to the feed until their last subscriber leaves (`unsubscribe()`).
+
+        Returns:
+            (list): Normalized codes (without duplicates)
+
+        Exception raised:
+            - ValueError: If a code is invalid or if stations tracked would
+              exceed `maxStations` (nothing subscribed)
+        """
+        codes = list(dict.fromkeys(self.normalize(code) for code in codes))
+
+        with self.condition:
+            new = [code for code in codes if code not in self.stations]
+            if len(self.stations) + len(new) > self.maxStations:
+                raise ValueError('Too many stations tracked (maximum {0})'.format(self.maxStations))
+
+            for code in codes:
+                self.subscribers[code] = self.subscribers.get(code, 0) + 1
+            if new:
+                self.stations.extend(new)
+                self.new.update(new)
+                self._wake.set()
+
+        return codes
+
+    def unsubscribe(self, codes):
+        """Remove a subscriber of stations (codes returned by `subscribe()`).
+        Stations without subscriber, not given at creation, are no more
+        tracked and their reports are removed.
+        """
+        with self.condition:
+            for code in codes:
+                count = self.subscribers.get(code, 0) - 1
+                if count > 0:
+                    self.subscribers[code] = count
+                    continue
+
+                self.subscribers.pop(code, None)
+                if code not in self.pinned and code in self.stations:
+                    self.stations.remove(code)
+                    self.new.discard(code)
+                    for values in (self.reports, self.texts, self.versions, self.errors):
+                        values.pop(code, None)
+
+    def refreshStation(self, code):
+        """Fetch and decode a station. Subscribers are notified if METAR changed.
+
+        Returns:
+            (boolean): True if a new report is available
+        """
+        try:
+            data_date, text = self.fetcher.fetchText(code)
+        except (NOAAServError, ReadFileError) as err:
+            with self.condition:
+                if code in self.stations:
+                    self.errors[code] = str(err)
+            return False
+
+        if self.texts.get(code) == text:
+            return False
+
+        try:
+            report = reportJSON(Metar(code, text, data_date), data_date)
+        except Exception as err:
+            with self.condition:
+                self.errors[code] = 'Decoding error: {0!r}'.format(err)
+            return False
+
+        with self.condition:
+            if code not in self.stations:  # Last subscriber left during fetch
+                return False
+
+            self.errors.pop(code, None)
+            self.texts[code] = text
+            self.version += 1
+            self.versions[code] = self.version
+            self.reports[code] = report
+            self.condition.notify_all()
+
+        return True
+
+    def refresh(self):
+        """Fetch and decode every tracked station once
+
+        Returns:
+            (integer): Number of new reports
+        """
+        with self.condition:
+            stations = list(self.stations)
+            self.new.clear()
+
+        return sum(self.refreshStation(code) for code in stations)
+
+    def refreshNew(self):
+        """Fetch and decode stations added since last fetch only
+
+        Returns:
+            (integer): Number of new reports
+        """
+        with self.condition:
+            stations = [code for code in self.stations if code in self.new]
+            self.new.clear()
+
+        return sum(self.refreshStation(code) for code in stations)
+
+    def get(self, code):
+        """Decoded report of a station, None if not available
+        """
+        with self.condition:
+            return self.reports.get(code.upper())
+
+    def updates(self, stations, since=0, timeout=None):
+        """Wait for reports of stations newer than version `since`.
+
+        Args:
+            stations (iterable): OACI codes
+            since (integer, optional): Last version received by subscriber. Defaults to 0.
+            timeout (float, optional): Maximum wait (seconds). Defaults to None (no limit).
+
+        Returns:
+            (tuple): (version, list of reports). Empty list if timeout expired.
+        """
+        stations = [code.upper() for code in stations]
+
+        def available():
+            return [self.reports[code] for code in stations
+                    if self.versions.get(code, 0) > since]
+
+        with self.condition:
+            self.condition.wait_for(
+                lambda: available() or self._stop.is_set(), timeout)
+
+            return self.version, available()
+
+    def run(self):
+        """Refresh loop (until `stop()`): every station each `interval`,
+        new stations as soon as they are added
+        """
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.refresh()
+
+            deadline = time.monotonic() + self.interval
+            while not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wake.wait(remaining):
+                    break
+                self._wake.clear()
+                self.refreshNew()
+
+    def start(self):
+        """Start refresh loop in a daemon thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop refresh loop and wake up subscribers
+        """
+        self._stop.set()
+        self._wake.set()
+        with self.condition:
+            self.condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.fetcher.close()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler of feed server (`server.feed` is a `MetarFeed`)
+    """
+
+    protocol_version = 'HTTP/1.1'
+    keepalive = 15  # Seconds between two SSE comments when no report
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if not getattr(self.server, 'quiet', True):
+            super().log_message(format, *args)
+
+    def sendJSON(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        feed = self.server.feed
+        split = urlsplit(self.path)
+        parts = [part for part in split.path.split('/') if part]
+
+        if parts == ['metar']:
+            with feed.condition:
+                reports = dict(feed.reports)
+            self.sendJSON(reports)
+
+        elif len(parts) == 2 and parts[0] == 'metar':
+            report = feed.get(parts[1])
+            if report is None:
+                self.sendJSON({'error': 'No METAR for {0}'.format(parts[1].upper())}, 404)
+            else:
+                self.sendJSON(report)
+
+        elif parts == ['events']:
+            query = parse_qs(split.query)
+            codes = [code for value in query.get('stations', [])
+                     for code in value.split(',') if code.strip()]
+
+            if not codes:
+                self.sendJSON({'error': 'stations parameter required'}, 400)
+                return
+
+            try:
+                stations = feed.subscribe(codes)
+            except ValueError as err:
+                self.sendJSON({'error': str(err)}, 400)
+                return
+
+            try:
+                self.streamEvents(feed, stations)
+            finally:
+                feed.unsubscribe(stations)
+
+        else:
+            self.sendJSON({'error': 'Not found'}, 404)
+
+    def streamEvents(self, feed, stations):
+        """Server-Sent Events: one `metar` event per new report
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        since = 0
+        try:
+            while not feed.stopped:
+                version, reports = feed.updates(stations, since, self.keepalive)
+                since = version
+
+                if not reports:
+                    self.wfile.write(b': keepalive\n\n')
+
+                for report in reports:
+                    self.wfile.write('id: {0}\nevent: metar\ndata: {1}\n\n'.format(
+                        version, json.dumps(report)).encode())
+
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Feed server over TCP
+
+    Args:
+        address (tuple): (host, port)
+        feed (MetarFeed): Feed served
+    """
+    daemon_threads = True
+    quiet = True
+
+    def __init__(self, address, feed, handler=FeedRequestHandler):
+        self.feed = feed
+        super().__init__(address, handler)
+
+
+class UnixFeedServer(socketserver.ThreadingUnixStreamServer):
+    """Feed server over Unix socket
+
+    Args:
+        path (string): Path of socket
+        feed (MetarFeed): Feed served
+    """
+    daemon_threads = True
+    quiet = True
+
+    def __init__(self, path, feed, handler=FeedRequestHandler):
+        self.feed = feed
+        super().__init__(path, handler)
+
+
+def serve(feed, address):
+    """Create server of feed
+
+    Args:
+        feed (MetarFeed): Feed served
+        address (tuple or string): (host, port) for TCP, path for Unix socket
+
+    Returns:
+        (FeedServer or UnixFeedServer): Server, not started (`serve_forever()`)
+    """
+    if isinstance(address, str):
+        return UnixFeedServer(address, feed)
+
+    return FeedServer(address, feed)
+
+
+def main(arguments=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local METAR feed server')
+    parser.add_argument('stations', nargs='*', help='OACI codes of tracked stations')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', help='Path of Unix socket (instead of TCP)')
+    parser.add_argument('--interval', type=float, default=300,
+                        help='Seconds between two refreshes')
+    parser.add_argument('--source', default=NOAA_URL, help='URL template of upstream server')
+    parser.add_argument('--max-stations', type=int, default=500,
+                        help='Maximum stations tracked (with stations added by clients)')
+    parser.add_argument('--verbose', action='store_true', help='Log requests')
+    args = parser.parse_args(arguments)
+
+    feed = MetarFeed(args.stations, args.source, args.interval, maxStations=args.max_stations)
+    server = serve(feed, args.unix or (args.host, args.port))
+    server.quiet = not args.verbose
+
+    feed.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        feed.stop()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Multi-core METAR decoding with shared memory results
+Author: Matthieu BOUCHET
+
+Worker processes decode reports with `Metar` and write numeric fields
+into column buffers of one `multiprocessing.shared_memory` block.
+Parent process reads columns without copy (and without unpickling
+result dictionnaries).
+
+Columns are float64 (`array` type 'd'). Missing values are NaN.
+"""
+
+import math
+from array import array
+from multiprocessing import Pool, shared_memory
+
+from PythonMETAR.metar import Metar
+from PythonMETAR.units import qnhUnit, statuteMiles, windUnit
+
+COLUMNS = (
+    'direction',        # Metar.analyzeWind()['direction'], VARIABLE_DIRECTION if VRB
+    'speed',            # Metar.analyzeWind()['speed']
+    'gust',             # Metar.analyzeWind()['gust']
+    'visibility',       # Metar.analyzeVisibility(), else units.statuteMiles() (see visibilityUnit)
+    'qnh',              # Metar.analyzeQNH() (hPa or inHg, as in text)
+    'temperature',      # Metar.analyzeTemperatures()['temperature']
+    'dewpoint',         # Metar.analyzeTemperatures()['dewpoint']
+    'ceiling',          # Metar.analyzeCeiling(), infinity if no ceiling
+    'vmcControlled',    # Metar.verifyVMC()['controlled'] (1.0 or 0.0)
+    'vmcUncontrolled',  # Metar.verifyVMC()['uncontrolled'] (1.0 or 0.0)
+    'windUnit',         # 0.0 if KT, 1.0 if MPS (see units.WIND_UNITS)
+    'qnhUnit',          # 0.0 if hPa, 1.0 if inHg (see units.QNH_UNITS)
+    'visibilityUnit',   # 0.0 if m, 1.0 if SM (see units.VISIBILITY_UNITS)
+)
+
+VARIABLE_DIRECTION = -1.0
+ITEM_SIZE = 8
+
+_NAN = math.nan
+
+
+def metarRow(metar):
+    """Numeric fields of a decoded METAR, in `COLUMNS` order
+
+    Args:
+        metar (Metar): Decoded METAR
+
+    Returns:
+        (tuple): Tuple of floats (NaN if missing)
+    """
+    def number(value):
+        if value is None:
+            return _NAN
+        return float(value)
+
+    wind = metar.wind
+    if wind is None:
+        direction = speed = gust = _NAN
+    else:
+        direction = wind['direction']
+        direction = VARIABLE_DIRECTION if direction == 'VRB' else float(direction)
+        speed = number(wind['speed'])
+        gust = number(wind['gust'])
+
+    temperatures = metar.temperatures
+    if temperatures is None:
+        temperature = dewpoint = _NAN
+    else:
+        temperature = number(temperatures['temperature'])
+        dewpoint = number(temperatures['dewpoint'])
+
+    ceiling = metar.ceiling
+    ceiling = math.inf if ceiling is None else float(ceiling)
+
+    vmc = metar.vmc
+    if vmc is None:
+        controlled = uncontrolled = _NAN
+    else:
+        controlled = float(vmc['controlled'])
+        uncontrolled = float(vmc['uncontrolled'])
+
+    visibility, visibilityUnit = metar.visibility, 0.0
+    if visibility is None:
+        visibility = statuteMiles(metar)
+        visibilityUnit = 0.0 if visibility is None else 1.0
+
+    return (direction, speed, gust, number(visibility), number(metar.qnh),
+            temperature, dewpoint, ceiling, controlled, uncontrolled,
+            1.0 if windUnit(metar) == 'MPS' else 0.0,
+            1.0 if qnhUnit(metar) == 'inHg' else 0.0,
+            visibilityUnit)
+
+
+class SharedColumns:
+    """Float64 columns (`COLUMNS`) of `size` rows stored in one shared memory
+    block. Column k starts at offset k * size * 8.
+
+    Created by parent (`name` None) or attached by a worker (`name` given).
+    Owner must call `unlink()` when results are not used anymore.
+    Can be used as a context manager (close & unlink on exit).
+
+    Args:
+        size (integer): Number of rows (reports)
+        name (string, optional): Name of existing block to attach
+    """
+
+    def __init__(self, size, name=None):
+        self.size = size
+        self.owner = name is None
+        self.errors = 0
+        self.memory = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=max(ITEM_SIZE, len(COLUMNS) * size * ITEM_SIZE))
+
+        length = len(COLUMNS) * size
+        self._data = self.memory.buf[:length * ITEM_SIZE].cast('d')
+        self._views = [self._data]
+
+        if self.owner:
+            self._data[:] = array('d', [_NAN]) * length
+
+    @property
+    def name(self):
+        """Name of shared memory block
+        """
+        return self.memory.name
+
+    def column(self, column):
+        """Zero-copy view of a column.
+        Can be wrapped without copy by `numpy.frombuffer()` or `array` functions.
+
+        Args:
+            column (string): Name of column (see `COLUMNS`)
+
+        Returns:
+            (memoryview): Memoryview of floats ('d')
+        """
+        start = COLUMNS.index(column) * self.size
+        view = self._data[start:start + self.size]
+        self._views.append(view)
+
+        return view
+
+    def __contains__(self, column):
+        return column in COLUMNS
+
+    def __getitem__(self, column):
+        return self.column(column)
+
+    def write(self, index, row):
+        """Write a row (tuple in `COLUMNS` order) at index
+        """
+        data = self._data
+        for k, value in enumerate(row):
+            data[k * self.size + index] = value
+
+    def row(self, index):
+        """Row at index as a dictionnary {column: value}
+        """
+        return {column: self._data[k * self.size + index]
+                for k, column in enumerate(COLUMNS)}
+
+    def close(self):
+        """Release views and detach block from this process
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self.memory.close()
+
+    def unlink(self):
+        """Destroy block (owner only)
+        """
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+    def __len__(self):
+        return self.size
+
+
+def _decodeChunk(task):
+    """Worker: decode reports and write rows in shared block
+
+    Args:
+        task (tuple): (name of block, number of rows, first index, [(code, text)])
+
+    Returns:
+        (integer): Number of reports which can't be decoded
+    """
+    name, size, start, reports = task
+    columns = SharedColumns(size, name)
+    errors = 0
+
+    try:
+        for index, (code, text) in enumerate(reports, start):
+            try:
+                row = metarRow(Metar(code, text))
+            except Exception:
+                errors += 1
+                continue
+
+            columns.write(index, row)
+    finally:
+        columns.close()
+
+    return errors
+
+
+def decodeShared(reports, processes=None, chunksize=1000):
+    """Decode reports in a pool of processes, numeric fields returned in
+    shared memory columns.
+
+    Args:
+        reports (sequence): Sequence of tuples (code, text), as `Metar` arguments
+        processes (integer, optional): Number of worker processes. Defaults to CPU count.
+        chunksize (integer, optional): Reports sent to a worker per task. Defaults to 1000.
+
+    Returns:
+        (SharedColumns): Columns, rows in order of reports. Rows of reports
+        which can't be decoded stay NaN; their count is `errors` attribute.
+    """
+    reports = list(reports)
+    columns = SharedColumns(len(reports))
+
+    tasks = [(columns.name, len(reports), start, reports[start:start + chunksize])
+             for start in range(0, len(reports), chunksize)]
+
+    try:
+        with Pool(processes) as pool:
+            columns.errors = sum(pool.imap_unordered(_decodeChunk, tasks))
+    except BaseException:
+        columns.close()
+        columns.unlink()
+        raise
+
+    return columns
@@ -0,0 +1,331 @@
+"""
+Station metadata registry
+Author: Matthieu BOUCHET
+
+Registry of reporting aerodromes (OACI code, latitude, longitude,
+elevation) with a spatial index (k-d tree) for nearest-aerodrome and
+bounding-box queries.
+
+Bundled stations (`stations.csv`) are loaded on first use. A complete
+list (e.g. OurAirports `airports.csv`) can be loaded with
+`StationRegistry.fromFile()`.
+"""
+
+import csv
+import heapq
+import math
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from PythonMETAR.metar import NOAA_URL, fetchMetars
+
+STATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stations.csv')
+EARTH_RADIUS = 6371.0  # km
+
+Station = namedtuple('Station', ('code', 'latitude', 'longitude', 'elevation'))
+Station.__doc__ = """Reporting aerodrome: OACI code, latitude & longitude
+(decimal degrees), elevation (feet, None if unknown)"""
+
+# Column names accepted by `StationRegistry.fromFile()` (first found is used)
+_COLUMNS = {
+    'code': ('code', 'icao', 'ident', 'gps_code'),
+    'latitude': ('latitude', 'lat', 'latitude_deg'),
+    'longitude': ('longitude', 'lon', 'longitude_deg'),
+    'elevation': ('elevation', 'elevation_ft', 'elev')
+}
+
+
+def distance(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance between two points (haversine formula)
+
+    Returns:
+        (float): Distance in kilometres
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    deltaPhi = phi2 - phi1
+    deltaLambda = math.radians(longitude2 - longitude1)
+
+    a = (math.sin(deltaPhi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(deltaLambda / 2) ** 2)
+
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cartesian(latitude, longitude):
+    """Point on unit sphere. Chord length between points grows with
+    great-circle distance, so k-d tree on (x, y, z) needs no special case
+    for antimeridian or poles.
+    """
+    phi, lamb = math.radians(latitude), math.radians(longitude)
+    return (math.cos(phi) * math.cos(lamb), math.cos(phi) * math.sin(lamb), math.sin(phi))
+
+
+class StationRegistry:
+    """Registry of stations with spatial index.
+
+    Args:
+        stations (iterable): `Station` or tuples (code, latitude, longitude, elevation)
+
+    Attributes
+    -----------
+    - codes (list): OACI codes, by index of station
+    - latitudes, longitudes (array): Coordinates (decimal degrees), by index
+    - elevations (array): Elevations (feet, -32768 if unknown), by index
+    """
+
+    UNKNOWN_ELEVATION = -32768
+
+    def __init__(self, stations=()):
+        self.codes = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.elevations = array('i')
+        self._index = {}  # code => index
+
+        for code, latitude, longitude, elevation in stations:
+            code = code.strip().upper()
+            if code in self._index:  # First definition is kept
+                continue
+
+            self._index[code] = len(self.codes)
+            self.codes.append(code)
+            self.latitudes.append(float(latitude))
+            self.longitudes.append(float(longitude))
+            self.elevations.append(self.UNKNOWN_ELEVATION if elevation is None else int(elevation))
+
+        self._buildIndex()
+
+    @classmethod
+    def fromFile(cls, path=STATIONS_FILE):
+        """Registry from a CSV file with header. Columns are found by name:
+        code (or icao, ident), latitude (or lat, latitude_deg), longitude
+        (or lon, longitude_deg), elevation (feet; or elevation_ft, optional).
+        Rows without 4 letters code or coordinates are ignored.
+
+        Args:
+            path (string, optional): Path of file. Defaults to bundled stations.
+
+        Returns:
+            (StationRegistry): Registry
+        """
+        with open(path, newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            fields = {name.lower(): name for name in reader.fieldnames or ()}
+            columns = {}
+            for key, candidates in _COLUMNS.items():
+                columns[key] = next((fields[name] for name in candidates if name in fields), None)
+
+            if None in (columns['code'], columns['latitude'], columns['longitude']):
+                raise ValueError('Columns code, latitude and longitude are required: {0}'.format(path))
+
+            def rows():
+                for row in reader:
+                    code = (row[columns['code']] or '').strip()
+                    if len(code) != 4 or not code.isalnum():
+                        continue
+
+                    try:
+                        latitude = float(row[columns['latitude']])
+                        longitude = float(row[columns['longitude']])
+                    except (TypeError, ValueError):
+                        continue
+
+                    elevation = row.get(columns['elevation']) if columns['elevation'] else None
+                    try:
+                        elevation = int(float(elevation))
+                    except (TypeError, ValueError):
+                        elevation = None
+
+                    yield code, latitude, longitude, elevation
+
+            return cls(rows())
+
+    def _buildIndex(self):
+        """Build k-d tree (implicit, in `_tree` order: median of each range
+        is the node) on cartesian coordinates, and latitude-sorted index
+        for bounding-box queries.
+        """
+        points = [_cartesian(self.latitudes[i], self.longitudes[i]) for i in range(len(self.codes))]
+        self._points = points
+
+        tree = list(range(len(points)))
+        stack = [(0, len(tree), 0)]
+        while stack:
+            low, high, axis = stack.pop()
+            if high - low <= 1:
+                continue
+
+            tree[low:high] = sorted(tree[low:high], key=lambda index: points[index][axis])
+            middle = (low + high) // 2
+            stack.append((low, middle, (axis + 1) % 3))
+            stack.append((middle + 1, high, (axis + 1) % 3))
+
+        self._tree = array('i', tree)
+
+        self._byLatitude = array('i', sorted(range(len(points)), key=self.latitudes.__getitem__))
+        self._sortedLatitudes = array('d', (self.latitudes[i] for i in self._byLatitude))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code.upper() in self._index
+
+    def __iter__(self):
+        return (self.station(index) for index in range(len(self.codes)))
+
+    def station(self, index):
+        """Station at an index
+
+        Returns:
+            (Station): Station
+        """
+        elevation = self.elevations[index]
+        return Station(self.codes[index], self.latitudes[index], self.longitudes[index],
+                       None if elevation == self.UNKNOWN_ELEVATION else elevation)
+
+    def get(self, code, default=None):
+        """Station of an OACI code
+
+        Returns:
+            (Station): Station, default if not in registry
+        """
+        index = self._index.get(code.upper())
+        return default if index is None else self.station(index)
+
+    def __getitem__(self, code):
+        index = self._index.get(code.upper())
+        if index is None:
+            raise KeyError(code)
+
+        return self.station(index)
+
+    def nearest(self, latitude, longitude, count=5, maxDistance=None):
+        """Nearest stations of a position
+
+        Args:
+            latitude, longitude (float): Position (decimal degrees)
+            count (integer, optional): Number of stations. Defaults to 5.
+            maxDistance (float, optional): Maximum distance (km)
+
+        Returns:
+            (list): Tuples (Station, distance in km), nearest first
+        """
+        if count <= 0 or not self.codes:
+            return []
+
+        target = _cartesian(latitude, longitude)
+        points, tree = self._points, self._tree
+
+        # Chord length (squared) of maximum distance
+        limit = math.inf
+        if maxDistance is not None:
+            limit = (2 * math.sin(min(maxDistance / EARTH_RADIUS, math.pi) / 2)) ** 2
+
+        best = []  # Heap of (-squared chord, index), `count` nearest found
+
+        def bound():
+            return -best[0][0] if len(best) == count else limit
+
+        # Ranges to visit: (low, high, axis, squared distance to splitting plane)
+        stack = [(0, len(tree), 0, 0.0)]
+        while stack:
+            low, high, axis, plane = stack.pop()
+            if low >= high or plane > bound():
+                continue
+
+            middle = (low + high) // 2
+            index = tree[middle]
+            point = points[index]
+            squared = sum((point[k] - target[k]) ** 2 for k in range(3))
+
+            if squared <= bound():
+                if len(best) == count:
+                    heapq.heapreplace(best, (-squared, index))
+                else:
+                    heapq.heappush(best, (-squared, index))
+
+            delta = target[axis] - point[axis]
+            near, far = (low, middle), (middle + 1, high)
+            if delta > 0:
+                near, far = far, near
+
+            # Far side pushed first: visited after near side, if still within bound
+            following = (axis + 1) % 3
+            stack.append(far + (following, max(plane, delta * delta)))
+            stack.append(near + (following, plane))
+
+        return sorted(((self.station(index), distance(latitude, longitude, self.latitudes[index],
+                                                      self.longitudes[index]))
+                       for _, index in best), key=lambda item: item[1])
+
+    def within(self, south, west, north, east):
+        """Stations in a bounding box. If west > east, box crosses antimeridian.
+
+        Args:
+            south, west, north, east (float): Bounds (decimal degrees)
+
+        Returns:
+            (list): Stations, sorted by latitude
+        """
+        start = bisect_left(self._sortedLatitudes, south)
+        end = bisect_right(self._sortedLatitudes, north)
+
+        stations = []
+        for index in self._byLatitude[start:end]:
+            longitude = self.longitudes[index]
+            if (west <= longitude <= east) if west <= east else (longitude >= west or longitude <= east):
+                stations.append(self.station(index))
+
+        return stations
+
+
+_registry = None
+
+
+def defaultRegistry():
+    """Registry of bundled stations, loaded on first call
+
+    Returns:
+        (StationRegistry): Registry
+    """
+    global _registry
+    if _registry is None:
+        _registry = StationRegistry.fromFile(STATIONS_FILE)
+
+    return _registry
+
+
+def nearestMetars(latitude, longitude, count=5, registry=None, maxDistance=None,
+                  source=NOAA_URL, timeout=None, workers=8, fetcher=None):
+    """Current METAR of nearest stations of a position, fetched in
+    parallel and decoded (see `fetchMetars()`)
+
+    Args:
+        latitude, longitude (float): Position (decimal degrees)
+        count (integer, optional): Number of stations. Defaults to 5.
+        registry (StationRegistry, optional): Stations. Defaults to bundled stations.
+        maxDistance (float, optional): Maximum distance (km)
+        source (string, optional): URL template of text file. Defaults to `NOAA_URL`.
+        timeout (float, optional): Timeout of each connection (seconds)
+        workers (integer, optional): Maximum number of parallel requests. Defaults to 8.
+        fetcher (MetarFetcher, optional): Shared fetcher (cache, connection
+        pool), used instead of `source` and `timeout`
+
+    Returns:
+        (list): Tuples (Station, distance in km, `Metar` or None if not
+        available), nearest first
+    """
+    if registry is None:
+        registry = defaultRegistry()
+
+    nearest = registry.nearest(latitude, longitude, count, maxDistance)
+    codes = (station.code for station, _ in nearest)
+    if fetcher is None:
+        metars, _ = fetchMetars(codes, source, timeout, workers)
+    else:
+        metars, _ = fetcher.getMany(codes, workers)
+
+    return [(station, km, metars.get(station.code)) for station, km in nearest]
@@ -0,0 +1,290 @@
+"""
+Class TAF
+Author: Matthieu BOUCHET
+
+TAF (Terminal Aerodrome Forecast) decoder. Groups of each forecast period
+(wind, visibility, weather, clouds) are decoded by `Metar` group analyzers.
+"""
+
+import re
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from PythonMETAR.metar import (cloudCeiling, parseCloud, parseReference, parseVisibility,
+                               parseWeather, parseWind, resolveObservationTimes)
+from PythonMETAR.units import METRES_PER_SM, parseStatuteMiles
+
+# Start of a forecast period: FMddhhmm, BECMG, TEMPO, PROBnn [TEMPO]
+REGEX_PERIOD = re.compile(r'\b(FM\d{6}|BECMG|TEMPO|PROB\d{2}(?: TEMPO)?)(?= |$)')
+REGEX_VALIDITY = re.compile(r'\b(\d{2})(\d{2})/(\d{2})(\d{2})\b')
+REGEX_VISIBILITY = re.compile(r'(?:^| )(\d{4}|CAVOK)(?= |$)')
+
+FIELDS = ('wind', 'visibility', 'weather', 'cloud', 'ceiling')
+
+
+def decodeGroups(text):
+    """Decode wind, visibility, weather and cloud groups of a text with
+    `Metar` group analyzers (`parseWind()`, `parseVisibility()`, ...).
+    Visibility in statute miles (e.g. 'P6SM', '3/4SM') is converted in meters.
+
+    Args:
+        text (string): Groups (e.g. '24015G25KT 6000 -RA BKN010')
+
+    Returns:
+        (dict): Dictionnary with keys of `FIELDS`, values as `Metar` attributes.
+        Fields not present in text are not in dictionnary.
+    """
+    # Analyzers expect groups followed by a separator (e.g. 'BKN010 ' + 'CB')
+    groups = text + '  '
+
+    wind = parseWind(groups)
+    visibility = parseVisibility(groups, wind is not None and wind['variation'] is not None)
+    if visibility is None:
+        # Visibility without wind group before (e.g. 'TEMPO 2920/2924 4000 SHRA')
+        search = REGEX_VISIBILITY.search(text)
+        if search is not None:
+            visibility = 9999 if search.group(1) == 'CAVOK' else int(search.group(1))
+    if visibility is None:
+        miles = parseStatuteMiles(text)
+        if miles is not None:
+            visibility = int(round(miles * METRES_PER_SM))
+
+    tokens = text.split()
+    cavok = 'CAVOK' in tokens
+    decoded = {}
+
+    if wind is not None:
+        decoded['wind'] = wind
+
+    if visibility is not None:
+        decoded['visibility'] = visibility
+
+    weather = parseWeather(text)
+    if weather is not None:
+        decoded['weather'] = weather
+    elif cavok or 'NSW' in tokens:  # No significant weather
+        decoded['weather'] = None
+
+    cloud = parseCloud(groups)
+    if cloud is not None:
+        decoded['cloud'] = cloud
+        decoded['ceiling'] = cloudCeiling(cloud)
+    elif cavok or 'NSC' in tokens or 'SKC' in tokens:  # No cloud
+        decoded['cloud'] = decoded['ceiling'] = None
+
+    return decoded
+
+
+class Taf:
+    """Class TAF represents a Terminal Aerodrome Forecast.
+
+    Args
+    -----
+    - code (string): OACI code of airport
+    - text (string): TAF
+    - reference (datetime or string, optional): Reference time used to infer
+      month and year of issue. Defaults to current UTC time.
+
+    Attributes
+    -----------
+    - airport (string): OACI code of airport
+    - taf (string): Complete TAF message
+    - issued (datetime): Issue time (UTC). None if not found
+    - validity (tuple): (start, end) datetimes of validity. None if not found
+    - periods (tuple): Tuple of dictionnaries, one per forecast period. Keys:
+        - `type` (string): 'BASE', 'FM', 'BECMG', 'TEMPO' or 'PROB'
+        - `probability` (integer): Probability (PROB30, PROB40), else None
+        - `start`, `end` (datetime): Period of application
+        - `text` (string): Groups of period
+        - `fields` (dict): Decoded groups, see `decodeGroups()`
+    """
+
+    def __init__(self, code, text, reference=None):
+        self.airport = code
+        self.taf = text.strip().rstrip('=')
+
+        if reference is None:
+            reference = datetime.now(timezone.utc)
+
+        self.issued = self.analyzeIssue(reference)
+        self.validity = self.analyzeValidity()
+        self.periods = self.analyzePeriods()
+        self._timeline = self.buildTimeline()
+
+    def __str__(self):
+        return self.taf
+
+    def analyzeIssue(self, reference):
+        """Issue time (ddhhmmZ group) completed with month and year
+
+        Returns:
+            (datetime): Issue time (UTC)
+            (None): If no issue time
+        """
+        search = re.search(r'\b(\d{2})(\d{2})(\d{2})Z\b', self.taf)
+        if search is None:
+            return None
+
+        return resolveObservationTimes((search.groups(),), reference)[0]
+
+    def periodTime(self, day, hour, minute=0):
+        """Datetime of a TAF time (day, hour 0-24, minute) after issue time
+        """
+        issued = self.issued
+        year, month = issued.year, issued.month
+        if day < issued.day:  # Next month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        return (datetime(year, month, 1, tzinfo=timezone.utc)
+                + timedelta(days=day - 1, hours=hour, minutes=minute))
+
+    def analyzeValidity(self):
+        """Validity period (ddhh/ddhh group after issue time)
+
+        Returns:
+            (tuple): (start, end) datetimes
+            (None): If no validity or no issue time
+        """
+        if self.issued is None:
+            return None
+
+        search = REGEX_VALIDITY.search(self.taf)
+        if search is None:
+            return None
+
+        day, hour, endDay, endHour = (int(value) for value in search.groups())
+        return self.periodTime(day, hour), self.periodTime(endDay, endHour)
+
+    def analyzePeriods(self):
+        """Split TAF in forecast periods and decode their groups
+
+        Returns:
+            (tuple): Tuple of dictionnaries (see `periods` attribute)
+        """
+        if self.validity is None:
+            return ()
+
+        validityEnd = REGEX_VALIDITY.search(self.taf).end()
+        markers = list(REGEX_PERIOD.finditer(self.taf, validityEnd))
+
+        bounds = [(None, validityEnd)] + [(marker, marker.start()) for marker in markers]
+        periods = []
+
+        for index, (marker, start) in enumerate(bounds):
+            end = bounds[index + 1][1] if index + 1 < len(bounds) else len(self.taf)
+            text = self.taf[start if marker is None else marker.end():end].strip()
+
+            period = {
+                'type': 'BASE',
+                'probability': None,
+                'start': self.validity[0],
+                'end': self.validity[1],
+                'text': text
+            }
+
+            if marker is not None:
+                code = marker.group(1)
+
+                if code.startswith('FM'):
+                    period['type'] = 'FM'
+                    period['start'] = self.periodTime(
+                        int(code[2:4]), int(code[4:6]), int(code[6:8]))
+                else:
+                    if code.startswith('PROB'):
+                        period['type'] = 'PROB'
+                        period['probability'] = int(code[4:6])
+                    else:
+                        period['type'] = code
+
+                    search = REGEX_VALIDITY.match(text)
+                    if search is not None:
+                        day, hour, endDay, endHour = (int(value) for value in search.groups())
+                        period['start'] = self.periodTime(day, hour)
+                        period['end'] = self.periodTime(endDay, endHour)
+                        text = text[search.end():].strip()
+                        period['text'] = text
+
+            period['fields'] = decodeGroups(text)
+            periods.append(period)
+
+        # FM period lasts until next FM period
+        following = self.validity[1]
+        for period in reversed(periods):
+            if period['type'] == 'FM':
+                period['end'] = following
+                following = period['start']
+
+        return tuple(periods)
+
+    def buildTimeline(self):
+        """Prevailing conditions sorted by start time.
+        BASE & FM periods replace conditions, BECMG changes conditions
+        (groups given only) from the end of its period.
+
+        Returns:
+            (tuple): (list of start datetimes, list of fields dictionnaries)
+        """
+        starts, states = [], []
+        current = {}
+
+        changes = [period for period in self.periods if period['type'] in ('BASE', 'FM', 'BECMG')]
+        changes.sort(key=lambda period: period['end'] if period['type'] == 'BECMG' else period['start'])
+
+        for period in changes:
+            if period['type'] == 'BECMG':
+                start = period['end']
+                current = dict(current, **period['fields'])
+            else:
+                start = period['start']
+                current = dict(period['fields'])
+
+            if starts and starts[-1] == start:
+                states[-1] = current
+            else:
+                starts.append(start)
+                states.append(current)
+
+        return starts, states
+
+    def at(self, time):
+        """Forecast conditions at a time
+
+        Args:
+            time (datetime or string): Time (naive datetimes are UTC)
+
+        Returns:
+            (dict): Keys:
+                - `prevailing` (dict): Decoded groups prevailing (see `decodeGroups()`)
+                - `temporary` (tuple): TEMPO & PROB periods applicable at time
+            (None): If time outside of validity
+        """
+        time = parseReference(time)
+        if self.validity is None or not self.validity[0] <= time < self.validity[1]:
+            return None
+
+        starts, states = self._timeline
+        index = bisect_right(starts, time) - 1
+
+        return {
+            'prevailing': states[index] if index >= 0 else {},
+            'temporary': tuple(period for period in self.periods
+                               if period['type'] in ('TEMPO', 'PROB')
+                               and period['start'] <= time < period['end'])
+        }
+
+
+def decodeTafs(reports, reference=None):
+    """Decode a batch of TAF
+
+    Args:
+        reports (iterable): Tuples (code, text)
+        reference (datetime or string, optional): Reference time of batch
+
+    Returns:
+        (list): List of `Taf`
+    """
+    if reference is None:
+        reference = datetime.now(timezone.utc)
+    reference = parseReference(reference)
+
+    return [Taf(code, text, reference) for code, text in reports]
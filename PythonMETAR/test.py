@@ -1,8 +1,45 @@
 """Test for METAR Library
 Author: Matthieu BOUCHET
+
+Run from repository root: `python -m PythonMETAR.test`
 """
-from metar import *
+from PythonMETAR.metar import *
+from PythonMETAR.bytesmetar import decodeBytes
+from PythonMETAR.benchmark import SAMPLES
+from PythonMETAR.shareddecode import decodeShared, metarRow, COLUMNS
+from PythonMETAR.units import rawColumns, normalizeColumns
+from PythonMETAR.categories import FlightCategories, CategoryTracker, categoryChanges
+from PythonMETAR.serialize import MetarWriter, readRecords, dumps, loads, VERSION
+import io
+import csv
+import gzip
+import contextlib
+from PythonMETAR import cli
+from PythonMETAR.reprocess import Reprocessor, fileReference, loadCheckpoint
+from PythonMETAR.fetcher import MetarFetcher
+from PythonMETAR.pipeline import DecodePipeline, _decodeBatch
+from PythonMETAR import golden
+import queue
+from PythonMETAR.codes import Category, TABLES, category
+import pickle
+import math
+import time
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PythonMETAR.server import MetarFeed, FeedRequestHandler, serve
+from unittest import mock
+from PythonMETAR.taf import Taf, decodeGroups
+from PythonMETAR.stations import StationRegistry, defaultRegistry, nearestMetars
+import tempfile
+from PythonMETAR.diagnostics import decodeTolerant
+from PythonMETAR.fuzz import generateReports, metarFields, compareDecoders, differential
+from collections import Counter
 import unittest
+import subprocess
+import sys
+import os
 
 
 class testsMetar(unittest.TestCase):
@@ -12,7 +49,7 @@ class testsMetar(unittest.TestCase):
   
     def test_analyzeChangements(self):
         metar = Metar('LFLY','LFLY 192100Z AUTO 17012KT CAVOK 06/M02 Q1017 BECMG 19020G35KT')
-        self.assertEquals(metar.analyzeChangements(),{
+        self.assertEqual(metar.analyzeChangements(),{
             'TEMPO':None,
             'BECMG':'19020G35KT',
             'GRADU':None,
@@ -22,7 +59,7 @@ class testsMetar(unittest.TestCase):
         })
 
         metar = Metar('LFLY','LFLY 192100Z AUTO 17012KT CAVOK 06/M02 Q1017 TEMPO 19020G35KT')
-        self.assertEquals(metar.analyzeChangements(),{
+        self.assertEqual(metar.analyzeChangements(),{
             'TEMPO':'19020G35KT',
             'BECMG':None,
             'GRADU':None,
@@ -32,23 +69,68 @@ class testsMetar(unittest.TestCase):
         })
 
         metar = Metar('LFLY','LFLY 192100Z AUTO 17012KT CAVOK 06/M02 Q1017 NOSIG')
-        self.assertEquals(metar.analyzeChangements(),None)
+        self.assertEqual(metar.analyzeChangements(),None)
         
     def test_analyzeDateTime(self):
         metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeDateTime(),("29","22","00"))
+        self.assertEqual(metar.analyzeDateTime(),("29","22","00"))
         metar = Metar('LFLY','LFLY AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeDateTime(),None)
+        self.assertEqual(metar.analyzeDateTime(),None)
     
+    def test_analyzeObservationTime(self):
+        metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG','2021/03/29 22:05')
+        self.assertEqual(metar.analyzeObservationTime(),datetime(2021,3,29,22,0,tzinfo=timezone.utc))
+
+        #Month & year rollover
+        metar = Metar('LFLY','LFLY 312330Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG',datetime(2021,1,1,0,10))
+        self.assertEqual(metar.observation_time,datetime(2020,12,31,23,30,tzinfo=timezone.utc))
+
+        metar = Metar('LFLY','LFLY AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG','2021/03/29 22:05')
+        self.assertEqual(metar.analyzeObservationTime(),None)
+
+        metar = Metar('LFLY','METAR LFLY 002200Z AUTO VRB03KT CAVOK 06/M00 Q1000','2021/03/29 23:00')
+        self.assertEqual((metar.date_time,metar.observation_time),(('00','22','00'),None))
+
+    def test_resolveObservationTimes(self):
+        results = resolveObservationTimes(
+            [('29','22','00'),None,('31','12','00'),('01','00','30'),('29','22','00')],
+            '2021/03/01 00:20')
+
+        self.assertEqual(results,[
+            datetime(2021,1,29,22,0,tzinfo=timezone.utc), #No 29th in February 2021
+            None,
+            datetime(2021,1,31,12,0,tzinfo=timezone.utc),
+            datetime(2021,3,1,0,30,tzinfo=timezone.utc), #Accepted clock skew
+            datetime(2021,1,29,22,0,tzinfo=timezone.utc)
+        ])
+        self.assertIs(results[0],results[4])
+
+        #One reference by date time (archive rows)
+        results = resolveObservationTimes([('29','22','00'),('29','22','00'),None,('31','23','30')],
+            ['2019/07/29 22:05','2021/03/29 22:05','2021/03/29 22:05',datetime(2018,1,1,0,5)])
+        self.assertEqual(results,[
+            datetime(2019,7,29,22,0,tzinfo=timezone.utc),
+            datetime(2021,3,29,22,0,tzinfo=timezone.utc),
+            None,
+            datetime(2017,12,31,23,30,tzinfo=timezone.utc)
+        ])
+
+        #Invalid day: no observation time, other rows resolved
+        results = resolveObservationTimes([('00','22','00'),('29','22','00')],'2021/03/29 23:00')
+        self.assertEqual(results,[None,datetime(2021,3,29,22,0,tzinfo=timezone.utc)])
+
+        metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG','2021/03/29 22:05')
+        self.assertEqual(metar.getAll()['observationTime'],datetime(2021,3,29,22,0,tzinfo=timezone.utc))
+
     def test_analyzeAuto(self):
         metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeAuto(),True)
+        self.assertEqual(metar.analyzeAuto(),True)
         metar = Metar('LFLY','LFLY 292200Z VRB03KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeAuto(),False)
+        self.assertEqual(metar.analyzeAuto(),False)
 
     def test_analyzeWind(self):
         metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeWind(),{
+        self.assertEqual(metar.analyzeWind(),{
             'direction':'VRB',
             'speed':3,
             'gust':None,
@@ -56,7 +138,7 @@ class testsMetar(unittest.TestCase):
         })
         
         metar = Metar('LFLY','LFLY 292200Z AUTO 22005KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeWind(),{
+        self.assertEqual(metar.analyzeWind(),{
             'direction':220,
             'speed':5,
             'gust':None,
@@ -64,7 +146,7 @@ class testsMetar(unittest.TestCase):
         })
         
         metar = Metar('LFLY','LFLY 292200Z AUTO 22010G25KT 040V210 CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeWind(),{
+        self.assertEqual(metar.analyzeWind(),{
             'direction':220,
             'speed':10,
             'gust':25,
@@ -72,7 +154,7 @@ class testsMetar(unittest.TestCase):
         })
         
         metar = Metar('LFLY','LFLY 292200Z AUTO /////KT CAVOK 06/M00 Q1000 NOSIG')
-        self.assertEquals(metar.analyzeWind(),None)
+        self.assertEqual(metar.analyzeWind(),None)
 
     def test_analyzeVizibility(self):
         metar = (Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG'),
@@ -84,7 +166,7 @@ class testsMetar(unittest.TestCase):
         results = [(9999),(5200),(5200),None,(9950)]
 
         for k in range(len(metar)):
-            self.assertEquals(metar[k].analyzeVisibility(),results[k])
+            self.assertEqual(metar[k].analyzeVisibility(),results[k])
 
     def test_analyzeRVR(self):
         metar = (Metar('LFPG','LFPG 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG'),
@@ -92,11 +174,38 @@ class testsMetar(unittest.TestCase):
         Metar('LFPG','LFPG 292200Z AUTO VRB03KT CAVOK R26L/5000 06/M00 Q1000 NOSIG'),
         Metar('LFPG','LFPG 292200Z AUTO VRB03KT CAVOK R27L/M4100 06/M00 Q1000 NOSIG'))
 
-        results = (None,({'runway':'26R','visibility':450},),({'runway':'26L','visibility':5000},),({'runway':'27L','visibility':4100},))
+        rvr = {'qualifier':None,'maxVisibility':None,'maxQualifier':None,'unit':'m','tendency':None}
+        results = (None,(dict(rvr,runway='26R',visibility=450),),(dict(rvr,runway='26L',visibility=5000),),
+        (dict(rvr,runway='27L',visibility=4100,qualifier='M'),))
 
         for k in range(len(metar)):
             #print(metar[k].analyzeRVR())
-            self.assertEquals(metar[k].analyzeRVR(),results[k])
+            self.assertEqual(metar[k].analyzeRVR(),results[k])
+
+    def test_analyzeRVRGroups(self):
+        metar = Metar('CYWG','METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D R27L/M0600 R09/0600VP1500U R26R/P2000N -SN M05/M08 A2992')
+        self.assertEqual(metar.rvr,(
+            {'runway':'36','visibility':4000,'qualifier':None,'maxVisibility':None,'maxQualifier':None,'unit':'ft','tendency':'D'},
+            {'runway':'27L','visibility':600,'qualifier':'M','maxVisibility':None,'maxQualifier':None,'unit':'m','tendency':None},
+            {'runway':'09','visibility':600,'qualifier':None,'maxVisibility':1500,'maxQualifier':'P','unit':'m','tendency':'U'},
+            {'runway':'26R','visibility':2000,'qualifier':'P','maxVisibility':None,'maxQualifier':None,'unit':'m','tendency':'N'}))
+        self.assertEqual(metar.rvr[0]['tendency'].code,1)
+
+    def test_RVRWholeGroups(self):
+        #Variable RVR is not a wind variation, runway state group is not RVR
+        metar = Metar('LFPG','METAR LFPG 292200Z 24005KT 0400 R27L/M0050 R26R/P2000 R09/0600V1000U R08C/0450V/1200 R01///// FG VV001 06/06 Q1000')
+        self.assertEqual(metar.wind['variation'],None)
+        self.assertEqual(metar.visibility,400)
+        self.assertEqual([(rvr['runway'],rvr['visibility'],rvr['maxVisibility']) for rvr in metar.rvr],
+            [('27L',50,None),('26R',2000,None),('09',600,1000)])
+        self.assertEqual(metar.vmc,{'controlled':False,'uncontrolled':False})
+
+        metar = Metar('LFPG','METAR LFPG 292200Z 24005KT 200V280 0400 R09/0600V1000U FG VV001 06/06 Q1000')
+        self.assertEqual((metar.wind['variation'],metar.visibility),((200,280),400))
+
+        metar = Metar('UUEE','METAR UUEE 292200Z 27008MPS 5000 -SN BKN015 M02/M04 Q1008 R24L/590230')
+        self.assertEqual(metar.rvr,None)
+        self.assertEqual(Metar('LFPG','METAR LFPG 292200Z 24005KT 0400 R27L/0600=').rvr[0]['visibility'],600)
 
     def test_analyzeWeather(self):
         metar = (Metar('LFLY','LFLY 231830Z AUTO 19012KT CAVOK 06/02 Q0997'),
@@ -115,7 +224,7 @@ class testsMetar(unittest.TestCase):
         for k in range(len(metar)):
             #print(metar[k].analyzeWeather())
             
-            self.assertEquals(metar[k].analyzeWeather(),results[k])
+            self.assertEqual(metar[k].analyzeWeather(),results[k])
 
     def test_analyzeCloud(self):
         metar = (Metar('LFLY','LFLY 231830Z AUTO 19012KT CAVOK 06/02 Q0997'),
@@ -134,7 +243,7 @@ class testsMetar(unittest.TestCase):
         for k in range(len(metar)):
             #print(metar[k].analyzeCloud())
             
-            self.assertEquals(metar[k].analyzeCloud(),results[k])
+            self.assertEqual(metar[k].analyzeCloud(),results[k])
 
     def test_analyzeTemperatures(self):
         metar = (Metar('LFLY','LFLY 231830Z AUTO 19012KT CAVOK /////// Q0997'),
@@ -150,7 +259,7 @@ class testsMetar(unittest.TestCase):
         for k in range(len(metar)):
             #print(metar[k].analyzeTemperatures())
             
-            self.assertEquals(metar[k].analyzeTemperatures(),results[k])
+            self.assertEqual(metar[k].analyzeTemperatures(),results[k])
     
     def test_analyzeQNH(self):
         metar = (Metar('LFLY','LFLY 231830Z AUTO 19012KT CAVOK'),
@@ -165,5 +274,1076 @@ class testsMetar(unittest.TestCase):
         for k in range(len(metar)):
             #print(metar[k].analyzeQNH())
             
-            self.assertEquals(metar[k].analyzeQNH(),results[k])
-unittest.main()
\ No newline at end of file
+            self.assertEqual(metar[k].analyzeQNH(),results[k])
+    def test_analyzeRemarks(self):
+        metar = Metar('KJFK','METAR KJFK 121251Z 31012G20KT 10SM FEW250 M01/M12 A3012 RMK AO2 PK WND 30030/1215 '
+        'SLP200 P0012 60025 70100 T10061122 10011 21006 401120084 52015=')
+        self.assertEqual(metar.analyzeRemarks(),{
+            'text':'AO2 PK WND 30030/1215 SLP200 P0012 60025 70100 T10061122 10011 21006 401120084 52015',
+            'station':'AO2',
+            'seaLevelPressure':1020.0,
+            'hourlyPrecipitation':0.12,
+            'precipitation6h':0.25,
+            'precipitation24h':1.0,
+            'temperature':-0.6,
+            'dewpoint':-12.2,
+            'maxTemperature6h':1.1,
+            'minTemperature6h':-0.6,
+            'maxTemperature24h':11.2,
+            'minTemperature24h':8.4,
+            'pressureTendency':{'code':2,'change':1.5},
+            'unparsed':('PK','WND','30030/1215')
+        })
+        self.assertEqual(metar.temperatures,{'temperature':-1,'dewpoint':-12})
+
+        metar = Metar('CYWG','METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D -SN BLSN BKN008 OVC040 M05/M08 A2992 REFZRA WS RWY36 RMK SF5NS3 SLP134')
+        self.assertEqual(metar.remarks['seaLevelPressure'],1013.4)
+        self.assertEqual(metar.remarks['unparsed'],('SF5NS3',))
+
+        metar = Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')
+        self.assertEqual(metar.analyzeRemarks(),None)
+
+    def test_weatherGroups(self):
+        metar = Metar('CYWG','METAR CYWG 172000Z 30015G25KT 3/4SM -SN BLSN BKN008 OVC040 M05/M08 A2992')
+        self.assertEqual(metar.weather,{'intensity':False,'prefix':('Blowing',),'weather':('Snow',)})
+
+        metar = Metar('KJFK','METAR KJFK 172000Z 30015KT 2000 +TSGR VCSH BKN010 M05/M08 A2992')
+        self.assertEqual(metar.weather,{'intensity':True,'prefix':('in Vicinity','Shower'),'weather':('Hail','Thunderstorm')})
+
+        metar = Metar('XXXX','METAR ???? 999999Z ABCDEFG 1234 =')
+        self.assertEqual(metar.weather,None)
+
+    def test_remarksNotAnalyzed(self):
+        metar = Metar('CYXX','METAR CYXX 172000Z 30015KT 9000 M05/M08 RMK A3001 SN TEMPO 191000Z')
+        self.assertEqual(metar.qnh,None)
+        self.assertEqual(metar.temperatures,{'temperature':-5,'dewpoint':-8})
+        self.assertEqual(metar.changements['TEMPO'],None)
+        self.assertEqual(metar.date_time,('17','20','00'))
+        self.assertEqual(metar.weather,None)
+        self.assertEqual(decodeBytes(metar.metar.encode())['qnh'],None)
+
+
+class testsBytesMetar(unittest.TestCase):
+    """Bytes-level decoding must match `Metar` fields
+    """
+
+    def test_decodeBytes(self):
+        reports = SAMPLES + ('LFLY 231830Z AUTO 19012KT CAVOK /////// Q0997',
+        'LFLY 292200Z AUTO /////KT CAVOK 06/M00 Q1000 NOSIG',
+        'LFLY AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG',
+        #Wrapped reports: changements erase their line only
+        'METAR LFLY 292200Z AUTO VRB03KT CAVOK\n06/M00 Q1000 NOSIG',
+        'METAR LFLY 292200Z AUTO VRB03KT CAVOK TEMPO 4000\n06/M00 Q1000',
+        'METAR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00\nQ1000 BECMG 19020G35KT\nRMK AO2\n',
+        'METAR LFLY 292200Z TEMPO\n17012KT CAVOK 06/M00 Q1000 TEMPO 05/M01\n',
+        'METAR KJFK 121251Z 31012G20KT 10SM FEW250\nM01/M12 A3012 RMK\n',
+        #Variation inside RVR group is not a wind variation
+        'METAR LFPG 292200Z 24005KT 0400 R09/0600V1000U FG VV001 06/06 Q1000',
+        'METAR LFPG 292200Z 24005KT 200V280 0400 R09/0600V1000U FG VV001 06/06 Q1000')
+
+        for report in reports:
+            properties = Metar('LFLY',report,'2021/01/01 00:00').getAll()
+            expected = {key:properties[key] for key in ('dateTime','wind','temperatures','qnh')}
+
+            self.assertEqual(decodeBytes(report.encode()),expected)
+            self.assertEqual(decodeBytes(memoryview(report.encode())),expected)
+            self.assertEqual(decodeBytes(bytearray(report.encode())),expected)
+
+
+class testsSharedDecode(unittest.TestCase):
+    """Decoding in processes with shared memory columns
+    """
+
+    def test_metarRow(self):
+        metar = Metar('LFPG','LFPG 292200Z AUTO VRB03KT 5200 SCT050CB BKN015 06/M01 Q1000 NOSIG')
+        row = dict(zip(COLUMNS,metarRow(metar)))
+        self.assertEqual(row,{'direction':-1.0,'speed':3.0,'gust':row['gust'],'visibility':5200.0,
+        'qnh':1000.0,'temperature':6.0,'dewpoint':-1.0,'ceiling':1500.0,
+        'vmcControlled':1.0,'vmcUncontrolled':1.0,'windUnit':0.0,'qnhUnit':0.0,'visibilityUnit':0.0})
+        self.assertTrue(math.isnan(row['gust']))
+
+        #Statute miles with unit: metres after normalizeColumns()
+        row = dict(zip(COLUMNS,metarRow(Metar('KBOS','METAR KBOS 292154Z 04012KT 3/4SM BR OVC006 08/07 A2990'))))
+        self.assertEqual((row['visibility'],row['visibilityUnit']),(0.75,1.0))
+        normalized = normalizeColumns({name:[row[name]] for name in COLUMNS},useNumpy=False)
+        self.assertEqual(list(normalized['visibility']),[1207.0])
+
+    def test_decodeShared(self):
+        reports = [(text.split()[1],text) for text in SAMPLES]*3
+
+        with decodeShared(reports,processes=2,chunksize=5) as columns:
+            self.assertEqual(columns.errors,0)
+            for index,(code,text) in enumerate(reports):
+                expected = metarRow(Metar(code,text))
+                row = columns.row(index)
+                for k,column in enumerate(COLUMNS):
+                    if math.isnan(expected[k]):
+                        self.assertTrue(math.isnan(row[column]))
+                    else:
+                        self.assertEqual(row[column],expected[k])
+
+            self.assertEqual(list(columns.column('speed'))[:3],[5.0,3.0,12.0])
+
+class testsUnits(unittest.TestCase):
+    """Unit-normalized values
+    """
+
+    def test_normalized(self):
+        metar = Metar('EDDF','EDDF 121250Z 05004G10MPS 9999 FEW040 12/03 Q1021')
+        normalized = metar.normalized()
+        self.assertEqual(normalized['windSpeed'],7.775376)
+        self.assertEqual(normalized['windGust'],19.43844)
+        self.assertEqual(normalized['qnh'],1021)
+        self.assertEqual(normalized['visibility'],9999)
+        self.assertIs(metar.normalized(),normalized)
+
+        metar = Metar('KJFK','KJFK 121251Z 31012KT 1 1/2SM BKN004 M01/M12 A2992')
+        normalized = metar.normalized()
+        self.assertEqual((normalized['windSpeed'],normalized['qnh'],normalized['visibility']),(12,1013.2,2414))
+        self.assertEqual((normalized['temperature'],normalized['dewpoint'],normalized['ceiling']),(-1,-12,400))
+        self.assertEqual(normalized['units']['qnh'],'hPa')
+
+    def test_normalizeColumns(self):
+        metars = [Metar(text.split()[1],text) for text in SAMPLES]
+        for useNumpy in (False,None):
+            columns = normalizeColumns(rawColumns(metars),useNumpy=useNumpy)
+            for index,metar in enumerate(metars):
+                for column,key in (('speed','windSpeed'),('gust','windGust'),('visibility','visibility'),
+                                   ('qnh','qnh'),('ceiling','ceiling')):
+                    expected = metar.normalized()[key]
+                    if expected is None:
+                        self.assertTrue(math.isnan(columns[column][index]))
+                    else:
+                        self.assertEqual(columns[column][index],expected)
+
+        with decodeShared([(metar.airport,metar.metar) for metar in metars],processes=1) as shared:
+            columns = normalizeColumns(shared,useNumpy=False)
+            self.assertEqual([columns['qnh'][i] for i in (6,7)],[1021.0,1020.0])
+
+
+class testsCategories(unittest.TestCase):
+    """Flight categories
+    """
+
+    TEXTS = {
+        'LFLY':'LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000',
+        'LFPG':'LFPG 292200Z 22010KT 9999 BKN025 06/M00 Q1000',
+        'KJFK':'KJFK 121251Z 31012KT 1 1/2SM BKN004 M01/M12 A2992',
+        'EGLL':'EGLL 121250Z 24010KT 0800 FG VV///',
+        'KBOS':'KBOS 121254Z 31012KT 5SM OVC040 M01/M12 A2992',
+        'LFBO':'LFBO 121300Z 24010KT 9999 FEW030 12/03 Q1021',
+        'LFML':'LFML 121300Z 24010KT 12/03 Q1021'
+    }
+
+    def metars(self,texts):
+        return [Metar(code,text) for code,text in texts.items()]
+
+    def test_classify(self):
+        engine = FlightCategories()
+        self.assertEqual(engine.classifyBatch(self.metars(self.TEXTS)),{'LFLY':'VFR','LFPG':'MVFR',
+        'KJFK':'LIFR','EGLL':'LIFR','KBOS':'MVFR','LFBO':'VFR','LFML':None})
+        self.assertEqual(engine.classify(1000,1609),'IFR')
+        self.assertEqual(Metar('LFPG',self.TEXTS['LFPG']).flightCategory(),'MVFR')
+
+        engine = FlightCategories((('BAD',1500,5000),),'GOOD')
+        self.assertEqual(engine.classify(None,9999),'GOOD')
+        self.assertEqual(engine.classify(1000,None),'BAD')
+
+    def test_classifyColumns(self):
+        engine = FlightCategories()
+        metars = self.metars(self.TEXTS)
+        columns = normalizeColumns(rawColumns(metars),useNumpy=False)
+        for useNumpy in (False,None):
+            codes = engine.classifyColumns(columns['ceiling'],columns['visibility'],useNumpy)
+            self.assertEqual(engine.names(codes),[engine.classifyMetar(metar) for metar in metars])
+
+    def test_changes(self):
+        self.assertEqual(categoryChanges({'LFLY':'VFR','LFPG':'IFR'},{'LFLY':'VFR','LFPG':'MVFR','LFBO':'VFR'}),
+        {'LFPG':('IFR','MVFR'),'LFBO':(None,'VFR')})
+
+        tracker = CategoryTracker()
+        self.assertEqual(len(tracker.update(self.metars(self.TEXTS))),6)
+        texts = dict(self.TEXTS,LFLY='LFLY 292230Z AUTO VRB03KT 2000 BR OVC006 06/M00 Q1000')
+        self.assertEqual(tracker.update(self.metars(texts)),{'LFLY':('VFR','IFR')})
+        self.assertEqual(tracker.update(self.metars(texts)),{})
+
+
+class testsSerialize(unittest.TestCase):
+    """Binary serialization of decoded METAR
+    """
+
+    def test_roundTrip(self):
+        metars = [Metar('XXXX',text,'2021/03/29 23:00',tolerant=True) for text in generateReports(500,seed=5,malformed=0.5)]
+        metars += [Metar(text.split()[1],text,'2021/03/29 23:00') for text in SAMPLES]
+
+        stream = io.BytesIO()
+        self.assertEqual(MetarWriter(stream).writeAll(metars),len(metars))
+        stream.seek(0)
+        records = list(readRecords(stream))
+
+        self.assertEqual(len(records),len(metars))
+        for metar,record in zip(metars,records):
+            self.assertEqual(record['airport'],metar.airport)
+            self.assertSameValues(record['properties'],metar.properties)
+
+        record = loads(dumps(metars[-1]))
+        self.assertIs(record['properties']['cloud'][0]['code'],category('cloudCover','FEW'))
+
+        self.assertLess(len(stream.getvalue())/len(metars),len(json.dumps(metars[-1].getAll(),default=str)))
+
+    def assertSameValues(self,value,expected):
+        #Types compared too (tuples, integers, categorical values with their code)
+        self.assertIs(type(value),type(expected))
+        if isinstance(expected,Category):
+            self.assertEqual((value.kind,value.code,value),(expected.kind,expected.code,expected))
+        elif isinstance(expected,dict):
+            self.assertEqual(list(value),list(expected))
+            for key in expected:
+                self.assertSameValues(value[key],expected[key])
+        elif isinstance(expected,(tuple,list)):
+            self.assertEqual(len(value),len(expected))
+            for item,expectedItem in zip(value,expected):
+                self.assertSameValues(item,expectedItem)
+        else:
+            self.assertEqual(value,expected)
+
+    def test_fallback(self):
+        metar = Metar('LFLY','METAR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG','2021/03/29 23:00')
+        properties = dict(metar.properties,visibility=10**6,extra=1)
+        record = loads(dumps({'airport':'LFLY','dataDate':None,'properties':properties}))
+        self.assertSameValues(record['properties'],properties)
+
+    def test_versions(self):
+        data = dumps({'airport':'LFLY','dataDate':'2021/03/29 22:00','properties':{'qnh':29.92,'rvr':[1,(2,)]}})
+        self.assertEqual(loads(data)['properties'],{'qnh':29.92,'rvr':[1,(2,)]})
+
+        with self.assertRaises(ValueError):
+            loads(b'PMTR'+bytes((VERSION+1,))+data[5:])
+        with self.assertRaises(ValueError):
+            list(readRecords(io.BytesIO(b'JSON{}')))
+
+
+class testsCli(unittest.TestCase):
+    """Command-line bulk decoder
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name,'reports.txt.gz')
+        with gzip.open(self.input,'wt') as file:
+            file.write('\n'.join(SAMPLES)+'\n\n???\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self,*arguments):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(cli.main([self.input,'--reference','2021/03/29 23:00']+list(arguments)),0)
+        return stderr.getvalue()
+
+    def test_jsonl(self):
+        output = os.path.join(self.directory.name,'decoded.jsonl')
+        statistics = self.run_cli('--output',output,'--workers','2','--chunk','3')
+        self.assertIn('8 reports written, 2 lines skipped',statistics)
+
+        with open(output) as file:
+            reports = [json.loads(line) for line in file]
+        self.assertEqual([report['airport'] for report in reports],[text.split()[1] for text in SAMPLES])
+        self.assertEqual(reports[1]['qnh'],1000)
+
+    def test_csv(self):
+        output = os.path.join(self.directory.name,'decoded.csv')
+        self.run_cli('--output',output,'--format','csv','--strict')
+
+        with open(output,newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(tuple(rows[0]),cli.COLUMNS)
+        self.assertEqual((rows[7]['airport'],rows[7]['qnh'],rows[7]['visibility']),('KJFK','1020.0','16093.0'))
+        self.assertEqual(rows[0]['observationTime'],'2021-03-20T16:30:00+00:00')
+
+    def test_boundedInput(self):
+        read = []
+        def lines():
+            for index in range(20000):
+                read.append(index)
+                yield SAMPLES[index % len(SAMPLES)]
+
+        chunks = cli.decodeLines(lines(),'2021/03/29 23:00',workers=2,chunk=10)
+        outputs,skipped,diagnostics = next(chunks)
+        self.assertEqual(len(outputs),10)
+        #Window of 2 chunks by worker, not the whole input
+        self.assertLessEqual(len(read),50)
+        chunks.close()
+
+    def test_airportCode(self):
+        self.assertEqual(cli.airportCode('METAR COR LFLY 292200Z'),'LFLY')
+        self.assertEqual(cli.airportCode('KJFK 121251Z'),'KJFK')
+        self.assertIsNone(cli.airportCode('292200Z LFLY'))
+
+
+class testsReprocess(unittest.TestCase):
+    """Resumable reprocessing with checkpoints
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputs = []
+        for k,name in enumerate(('2021-01.txt.gz','2021-02.txt')):
+            path = os.path.join(self.directory.name,name)
+            with (gzip.open if name.endswith('.gz') else open)(path,'wt') as file:
+                file.write('\n'.join(SAMPLES[k::2])+'\n???\n')
+            self.inputs.append(path)
+        self.checkpoint = os.path.join(self.directory.name,'job.checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def job(self,output,format='jsonl',checkpoint=None):
+        return Reprocessor(self.inputs,os.path.join(self.directory.name,output),checkpoint or self.checkpoint,
+        format,'2021/03/29 23:00',chunk=2)
+
+    def test_resume(self):
+        reference = self.job('reference.jsonl',checkpoint=os.path.join(self.directory.name,'reference.checkpoint')).run()
+        self.assertEqual((reference['lines'],reference['written'],reference['skipped'],reference['done']),(10,8,2,True))
+
+        def crash(status):
+            if status['lines'] >= 6:
+                raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.job('decoded.jsonl').run(crash)
+
+        state = loadCheckpoint(self.checkpoint)
+        self.assertEqual((state['file'],state['lines'],state['done']),(1,7,False))
+        with open(os.path.join(self.directory.name,'decoded.jsonl'),'a') as file:
+            file.write('{"written after checkpoint": true}\n')
+
+        progress = []
+        state = self.job('decoded.jsonl').run(progress.append)
+        self.assertEqual((state['lines'],state['written'],state['skipped']),(10,8,2))
+        self.assertEqual(state['diagnostics'],reference['diagnostics'])
+        self.assertEqual(progress[-1]['lines'],10)
+
+        with open(os.path.join(self.directory.name,'reference.jsonl')) as first, open(os.path.join(self.directory.name,'decoded.jsonl')) as second:
+            self.assertEqual(first.read(),second.read())
+
+        self.assertEqual(self.job('decoded.jsonl').run(progress.append)['written'],8) #Done: nothing decoded again
+        self.assertEqual(len(progress),2)
+
+    def test_csv(self):
+        def crash(status):
+            raise KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.job('decoded.csv','csv').run(crash)
+        self.job('decoded.csv','csv').run()
+
+        with open(os.path.join(self.directory.name,'decoded.csv'),newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(sorted(row['airport'] for row in rows),sorted(text.split()[1] for text in SAMPLES))
+
+    def test_otherJob(self):
+        self.job('decoded.jsonl').run()
+        with self.assertRaises(ValueError):
+            self.job('other.jsonl').run()
+        with self.assertRaises(ValueError):
+            Reprocessor(self.inputs,'decoded.parquet',self.checkpoint,'parquet')
+
+    def test_cli(self):
+        output = os.path.join(self.directory.name,'decoded.jsonl')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(cli.main(self.inputs+['--output',output,'--checkpoint',self.checkpoint,
+            '--reference','2021/03/29 23:00','--workers','2','--chunk','2']),0)
+        self.assertIn('8 reports written, 2 lines skipped',stderr.getvalue())
+        self.assertTrue(loadCheckpoint(self.checkpoint)['done'])
+
+    def test_fileReference(self):
+        self.assertEqual(fileReference('/archives/metar-2019-02.txt.gz'),'2019/02/28 23:59')
+        self.assertEqual(fileReference('LFLY_20200229.txt'),'2020/02/29 23:59')
+        self.assertEqual(fileReference('reports.txt','2021/03/29 23:00'),'2021/03/29 23:00')
+
+        path = os.path.join(self.directory.name,'reports.txt')
+        with open(path+'.reference','w') as file:
+            file.write('2015/07/01 12:00\n')
+        self.assertEqual(fileReference(path),'2015/07/01 12:00')
+        with open(path+'.reference','w') as file:
+            file.write('July 2015')
+        with self.assertRaises(ValueError):
+            fileReference(path)
+
+    def test_multiYear(self):
+        inputs = []
+        for name in ('metar-2019-03.txt','metar-2020-03.txt.gz'):
+            path = os.path.join(self.directory.name,name)
+            with (gzip.open if name.endswith('.gz') else open)(path,'wt') as file:
+                file.write('\n'.join(SAMPLES)+'\n')
+            inputs.append(path)
+
+        output = os.path.join(self.directory.name,'decoded.jsonl')
+        state = Reprocessor(inputs,output,self.checkpoint,workers=2,chunk=3).run()
+        self.assertEqual(state['references'],['2019/03/31 23:59','2020/03/31 23:59'])
+
+        with open(output) as file:
+            years = [json.loads(line)['observationTime'][:7] for line in file]
+        self.assertEqual(years,['2019-03']*len(SAMPLES)+['2020-03']*len(SAMPLES))
+
+
+def slowDecodeBatch(batch):
+    #Batch decoded in 0.5 s at least (worker process)
+    time.sleep(0.5)
+    return _decodeBatch(batch)
+
+
+class testsPipeline(unittest.TestCase):
+    """Staged decoding pipeline with bounded queues
+    """
+
+    def test_decode(self):
+        for processes in (0,1):
+            airports = []
+            with DecodePipeline(lambda metar: airports.append(metar.airport),'2021/03/29 23:00',
+            processes=processes,batch=3) as pipeline:
+                for text in SAMPLES*5:
+                    pipeline.put(text.split()[1],text)
+
+            self.assertEqual(sorted(airports),sorted(text.split()[1] for text in SAMPLES*5))
+            metrics = pipeline.metrics()
+            self.assertEqual((metrics['received'],metrics['decode']['processed'],metrics['sink']['processed']),(40,40,40))
+            self.assertGreaterEqual(metrics['sink']['maxLatency'],metrics['sink']['meanLatency'])
+
+    def test_processesInParallel(self):
+        airports = []
+        with mock.patch('PythonMETAR.pipeline._decodeBatch',slowDecodeBatch):
+            start = time.monotonic()
+            with DecodePipeline(lambda metar: airports.append(metar.airport),'2021/03/29 23:00',
+            decodeWorkers=1,processes=4,batch=1) as pipeline:
+                for text in SAMPLES[:4]:
+                    pipeline.put(text.split()[1],text)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(pipeline.decodeWorkers,4)
+        self.assertEqual(len(airports),4)
+        #4 batches of 0.5 s decoded at once, not one after the other
+        self.assertLess(elapsed,1.5)
+
+    def test_backpressure(self):
+        release = threading.Event()
+        def sink(metar):
+            release.wait()
+            if metar.airport == 'KJFK':
+                raise ValueError('Sink failed')
+
+        pipeline = DecodePipeline(sink,'2021/03/29 23:00',decodeWorkers=1,queueSize=4,batch=2).start()
+        with self.assertRaises(queue.Full):
+            for k in range(20):
+                text = SAMPLES[k%len(SAMPLES)]
+                pipeline.put(text.split()[1],text,timeout=0.2)
+
+        # Blocked sink: 1 batch sunk, 2 batches queued, 1 batch waiting to be queued, 4 reports in ingest
+        metrics = pipeline.metrics()
+        self.assertEqual(metrics['received'],12)
+        self.assertEqual(metrics['queues'],{'ingest':{'depth':4,'capacity':4},'decoded':{'depth':2,'capacity':2}})
+
+        release.set()
+        pipeline.close()
+        metrics = pipeline.metrics()
+        self.assertEqual((metrics['sink']['processed'],metrics['sink']['errors']),(12,1))
+        self.assertEqual(pipeline.errors[0][:2],('sink','KJFK'))
+
+
+@unittest.skipUnless(os.path.exists(golden.CORPUS),'Golden corpus only in source distribution')
+class testsGolden(unittest.TestCase):
+    """Golden corpus: decoded outputs unchanged
+    """
+
+    def test_corpus(self):
+        records = golden.readCorpus()
+        self.assertGreater(len(records),3000)
+        self.assertEqual(set(record['class'] for record in records),set(golden.CLASSES))
+        self.assertEqual(golden.checkCorpus(records),[])
+
+    def test_mismatch(self):
+        record = dict(golden.readCorpus()[1])
+        record['expected'] = dict(record['expected'],qnh=1013)
+        mismatches = golden.checkCorpus([record])
+        self.assertEqual(mismatches[0]['fields'],{'qnh':(1013,1000)})
+
+    def test_reviewed(self):
+        self.assertEqual(golden.checkReviewed(),([],[]))
+        self.assertEqual(golden.decode('XXXX','METAR ???? 999999Z ABCDEFG 1234 =')['weather'],None)
+
+    def test_knownBugs(self):
+        text = 'METAR LFMN 292200Z 18020KT 3000 +TSRAGR VCSH FEW015 SCT025CB BKN040TCU 22/19 Q1005 RETS'
+        record = [record for record in golden.readCorpus() if record['text'] == text][0]
+        self.assertEqual(record['knownBugs'],['cloud'])
+        record['expected'] = dict(record['expected'],cloud=golden.REVIEWED[text]['cloud'],qnh=1013)
+        mismatch = golden.checkCorpus([record])[0]
+        self.assertEqual(list(mismatch['knownBugs']),['cloud'])
+        self.assertEqual(mismatch['fields'],{'qnh':(1013,1005)})
+
+    def test_timings(self):
+        timings = golden.timeCorpus(golden.updateCorpus(golden.buildCorpus(20)),repeat=1)
+        self.assertIn('edge',timings)
+        self.assertEqual(golden.compareTimings({'edge':100,'rvr':100},{'edge':105,'rvr':120,'us':50}),{'rvr':(100,120)})
+
+
+class testsCodes(unittest.TestCase):
+    """Categorical values shared between reports, with integer codes
+    """
+
+    def test_shared(self):
+        text = 'METAR CYWG 172000Z 30015G25KT 3/4SM R36/4000FT/D R27L/0600 -SN BLSN BKN008 OVC040 M05/M08 A2992'
+        first,second = Metar('CYWG',text),Metar('CYWG',text)
+
+        self.assertIs(first.cloud[0]['meaning'],second.cloud[0]['meaning'])
+        self.assertIs(first.weather['weather'][0],second.weather['weather'][0])
+        self.assertIs(first.rvr[1]['runway'],second.rvr[1]['runway'])
+
+        cloud = first.cloud[1]['code']
+        self.assertIsInstance(cloud,Category)
+        self.assertEqual((cloud,cloud.code,cloud.kind),('OVC',4,'cloudCover'))
+        self.assertEqual(TABLES['cloudCover'][cloud.code],'OVC')
+        self.assertEqual(first.rvr[1]['runway'].code,4*27+1)
+        self.assertEqual(json.loads(json.dumps(first.cloud[1]))['meaning'],'Overcast')
+
+    def test_lookup(self):
+        self.assertIs(category('weather','Fog'),Metar('LFLY','LFLY 292200Z 00000KT 0200 FG VV001').weather['weather'][0])
+        self.assertIs(pickle.loads(pickle.dumps(category('runway','09C'))),category('runway','09C'))
+        with self.assertRaises(KeyError):
+            category('weather','Fish')
+
+    def test_equality(self):
+        fog = category('weather','Fog')
+        self.assertEqual(fog,'Fog')
+        self.assertEqual(fog,Category('Fog',fog.code,'weather'))
+        self.assertNotEqual(fog,Category('Fog',fog.code,'weatherCode'))
+        self.assertNotEqual(fog,Category('Fog',fog.code+1,'weather'))
+        self.assertNotEqual(fog,'Rain')
+        self.assertEqual({fog:1}['Fog'],1)
+        self.assertEqual(hash(fog),hash('Fog'))
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """Stand-in of NOAA server: `server.texts` = {code: (datetime, METAR)}
+    """
+
+    def do_GET(self):
+        code = self.path.strip('/').replace('.TXT','')
+        if code not in self.server.texts:
+            self.send_error(404)
+            return
+
+        body = '{0}\n{1}\n'.format(*self.server.texts[code]).encode()
+        self.send_response(200)
+        self.send_header('Content-Length',str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class testsServer(unittest.TestCase):
+    """Local feed server with stand-in upstream server
+    """
+
+    def setUp(self):
+        self.upstream = ThreadingHTTPServer(('127.0.0.1',0),UpstreamHandler)
+        self.upstream.texts = {'LFLY':('2021/03/29 22:00','METAR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')}
+        threading.Thread(target=self.upstream.serve_forever,daemon=True).start()
+
+        source = 'http://127.0.0.1:{0}/{{}}.TXT'.format(self.upstream.server_address[1])
+        self.feed = MetarFeed(['lfly','LFPG'],source,interval=3600,timeout=5)
+        self.server = serve(self.feed,('127.0.0.1',0))
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever,daemon=True).start()
+
+    def tearDown(self):
+        self.feed.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.upstream.shutdown()
+        self.upstream.server_close()
+
+    def get(self,path):
+        with urllib.request.urlopen(self.url+path,timeout=5) as response:
+            return json.loads(response.read())
+
+    def test_getReports(self):
+        self.assertEqual(self.feed.refresh(),1)
+        self.assertEqual(self.feed.refresh(),0) #Unchanged METAR not decoded again
+        self.assertIn('LFPG',self.feed.errors)
+
+        report = self.get('/metar/lfly')
+        self.assertEqual(report['airport'],'LFLY')
+        self.assertEqual(report['qnh'],1000)
+        self.assertEqual(report['observationTime'],'2021-03-29T22:00:00+00:00')
+        self.assertEqual(list(self.get('/metar')),['LFLY'])
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.get('/metar/LFPG')
+        self.assertEqual(context.exception.code,404)
+
+    def test_events(self):
+        self.feed.refresh()
+        received = []
+
+        def subscribe():
+            with urllib.request.urlopen(self.url+'/events?stations=LFLY,EGLL',timeout=5) as response:
+                for line in response:
+                    if line.startswith(b'data: '):
+                        received.append(json.loads(line[6:]))
+                    if len(received) == 2:
+                        return
+
+        subscriber = threading.Thread(target=subscribe)
+        subscriber.start()
+
+        self.upstream.texts['LFLY'] = ('2021/03/29 22:30','METAR LFLY 292230Z AUTO 22005KT CAVOK 07/M00 Q1001 NOSIG')
+        while 'EGLL' not in self.feed.stations: #Subscription registered
+            time.sleep(0.01)
+        self.feed.refresh()
+        subscriber.join(5)
+
+        self.assertEqual([report['qnh'] for report in received],[1000,1001])
+
+    def test_subscriptions(self):
+        self.feed.maxStations = 4
+        self.assertEqual(self.feed.subscribe(['egll','EGLL','lfly']),['EGLL','LFLY'])
+        self.assertEqual(self.feed.subscribe(['EGLL']),['EGLL'])
+        self.assertEqual(self.feed.stations,['LFLY','LFPG','EGLL'])
+
+        with self.assertRaises(ValueError):
+            self.feed.subscribe(['KJFK','KBOS']) #Maximum reached: nothing subscribed
+        with self.assertRaises(ValueError):
+            self.feed.subscribe(['../../etc'])
+        self.assertEqual(self.feed.stations,['LFLY','LFPG','EGLL'])
+
+        self.feed.unsubscribe(['EGLL','LFLY'])
+        self.assertIn('EGLL',self.feed.stations) #Still one subscriber
+        self.feed.unsubscribe(['EGLL'])
+        self.assertEqual(self.feed.stations,['LFLY','LFPG']) #Stations of feed kept
+
+        for query in ('LFLY,EG/LL','A'*5000,','.join('K{0:03d}'.format(k) for k in range(5))):
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.get('/events?stations='+query)
+            self.assertEqual(context.exception.code,400)
+        self.assertEqual(self.feed.stations,['LFLY','LFPG'])
+
+    def test_unsubscribeOnDisconnect(self):
+        with mock.patch.object(FeedRequestHandler,'keepalive',0.05):
+            with urllib.request.urlopen(self.url+'/events?stations=EGLL',timeout=5) as response:
+                response.readline()
+                self.assertIn('EGLL',self.feed.stations)
+
+            for _ in range(200): #Disconnection detected at next keepalive
+                if 'EGLL' not in self.feed.stations:
+                    break
+                time.sleep(0.02)
+        self.assertEqual(self.feed.stations,['LFLY','LFPG'])
+
+
+class CountingHandler(UpstreamHandler):
+    """Stand-in of NOAA server with keep-alive, counting requests & connections
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.delay)
+        super().do_GET()
+
+
+class testsFeedFetches(unittest.TestCase):
+    """Feed server: new stations fetched alone, through persistent connections
+    """
+
+    def setUp(self):
+        self.upstream = ThreadingHTTPServer(('127.0.0.1',0),CountingHandler)
+        self.upstream.daemon_threads = True
+        self.upstream.lock = threading.Lock()
+        self.upstream.requests = self.upstream.connections = 0
+        self.upstream.delay = 0
+        self.upstream.texts = {text.split()[1]:('2021/03/29 23:00',text) for text in SAMPLES}
+        threading.Thread(target=self.upstream.serve_forever,daemon=True).start()
+
+        source = 'http://127.0.0.1:{0}/{{}}.TXT'.format(self.upstream.server_address[1])
+        self.feed = MetarFeed(['LFLY','LFPG'],source,interval=3600,timeout=5)
+
+    def tearDown(self):
+        self.feed.stop()
+        self.upstream.shutdown()
+        self.upstream.server_close()
+
+    def waitReport(self,code):
+        for _ in range(500):
+            if self.feed.get(code) is not None:
+                return
+            time.sleep(0.01)
+        self.fail('No report of {0}'.format(code))
+
+    def test_newStationsOnly(self):
+        self.feed.start()
+        self.waitReport('LFPG')
+        self.assertEqual(self.upstream.requests,2)
+
+        for code in ('CYWG','KJFK'): #Each subscription fetches its station only
+            self.feed.subscribe([code,'LFLY'])
+            self.waitReport(code)
+        self.assertEqual(self.upstream.requests,4)
+        self.assertEqual(self.upstream.connections,1) #Connection reused
+
+
+class testsFetcher(unittest.TestCase):
+    """Thread-safe fetcher under many threads
+    """
+
+    def setUp(self):
+        self.upstream = ThreadingHTTPServer(('127.0.0.1',0),CountingHandler)
+        self.upstream.daemon_threads = True
+        self.upstream.lock = threading.Lock()
+        self.upstream.requests = self.upstream.connections = 0
+        self.upstream.delay = 0.2
+        self.upstream.texts = {text.split()[1]:('2021/03/29 23:00',text) for text in SAMPLES}
+        threading.Thread(target=self.upstream.serve_forever,daemon=True).start()
+
+        source = 'http://127.0.0.1:{0}/{{}}.TXT'.format(self.upstream.server_address[1])
+        self.fetcher = MetarFetcher(source,maxAge=60,timeout=5,connections=4)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.upstream.shutdown()
+        self.upstream.server_close()
+
+    def run_threads(self,function,count):
+        results = [None]*count
+        barrier = threading.Barrier(count)
+
+        def run(index):
+            barrier.wait()
+            try:
+                results[index] = function(index)
+            except Exception as err:
+                results[index] = err
+
+        threads = [threading.Thread(target=run,args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        return results
+
+    def test_coalescing(self):
+        results = self.run_threads(lambda index: self.fetcher.get('lfly'),50)
+        self.assertEqual(self.upstream.requests,1)
+        self.assertTrue(all(metar is results[0] for metar in results))
+        self.assertEqual(results[0].qnh,997)
+        self.assertEqual(self.fetcher.statistics['fetches']+self.fetcher.statistics['coalesced'],50)
+
+        errors = self.run_threads(lambda index: self.fetcher.get('XXXX'),20)
+        self.assertTrue(all(isinstance(error,NOAAServError) for error in errors))
+        self.assertEqual(self.upstream.requests,2)
+
+    def test_leaderInterrupted(self):
+        fetch = self.fetcher.fetch
+        calls = []
+
+        def interrupted(code):
+            calls.append(code)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise KeyboardInterrupt
+            return fetch(code)
+
+        def get(index):
+            try:
+                return self.fetcher.get('LFLY')
+            except KeyboardInterrupt as err:
+                return err
+
+        with mock.patch.object(self.fetcher,'fetch',interrupted):
+            results = self.run_threads(get,10)
+
+        self.assertEqual(sum(isinstance(result,KeyboardInterrupt) for result in results),1)
+        self.assertTrue(all(result.airport == 'LFLY' for result in results if not isinstance(result,KeyboardInterrupt)))
+        self.assertEqual(self.fetcher._pending,{})
+
+    def test_stress(self):
+        self.upstream.delay = 0.01
+        codes = sorted(self.upstream.texts)
+
+        def worker(index):
+            return [self.fetcher.get(codes[(index+k)%len(codes)]).airport for k in range(40)]
+
+        results = self.run_threads(worker,64)
+        for index,airports in enumerate(results):
+            self.assertEqual(airports,[codes[(index+k)%len(codes)] for k in range(40)])
+
+        self.assertEqual(self.upstream.requests,len(codes)) #Decoded once by station
+        self.assertLessEqual(self.upstream.connections,4) #Connections reused
+
+        self.fetcher.invalidate('LFLY')
+        metars,errors = self.fetcher.getMany(codes+['XXXX'])
+        self.assertEqual(sorted(metars),codes)
+        self.assertEqual(list(errors),['XXXX'])
+        self.assertEqual(self.upstream.requests,len(codes)+2)
+
+
+class testsStations(unittest.TestCase):
+    """Station registry & nearest-aerodrome queries
+    """
+
+    def test_nearest(self):
+        registry = defaultRegistry()
+        nearest = registry.nearest(45.76,4.84,3)
+        self.assertEqual([station.code for station,km in nearest],['LFLY','LFLL','LFLS'])
+        self.assertLess(nearest[0][1],10)
+        self.assertEqual(registry.nearest(45.76,4.84,10,maxDistance=30),nearest[:2])
+
+        #Antimeridian
+        registry = StationRegistry([('AAAA',0,179.9,0),('BBBB',0,-179.8,None),('CCCC',0,178,0)])
+        self.assertEqual([station.code for station,km in registry.nearest(0,-179.97,2)],['AAAA','BBBB'])
+        self.assertEqual([station.code for station in registry.within(-1,179,1,-179)],['AAAA','BBBB'])
+        self.assertIsNone(registry['bbbb'].elevation)
+
+    def test_within(self):
+        registry = defaultRegistry()
+        self.assertEqual(sorted(station.code for station in registry.within(45,4,46,6)),['LFLL','LFLS','LFLY'])
+        self.assertEqual(Metar('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000').station().elevation,659)
+
+    def test_fromFile(self):
+        with tempfile.NamedTemporaryFile('w',suffix='.csv',delete=False) as file:
+            file.write('id,ident,type,latitude_deg,longitude_deg,elevation_ft\n')
+            file.write('1,LFPG,large_airport,49.0097,2.5479,392\n2,FR-0001,heliport,48.8,2.3,\n3,LFPO,large_airport,48.7233,2.3794,\n')
+        try:
+            registry = StationRegistry.fromFile(file.name)
+        finally:
+            os.remove(file.name)
+
+        self.assertEqual(registry.codes,['LFPG','LFPO'])
+        self.assertIsNone(registry['LFPO'].elevation)
+
+    def test_nearestMetars(self):
+        upstream = ThreadingHTTPServer(('127.0.0.1',0),UpstreamHandler)
+        upstream.texts = {'LFLY':('2021/03/29 22:00','METAR LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG')}
+        threading.Thread(target=upstream.serve_forever,daemon=True).start()
+        source = 'http://127.0.0.1:{0}/{{}}.TXT'.format(upstream.server_address[1])
+
+        try:
+            results = nearestMetars(45.76,4.84,2,source=source,timeout=5)
+        finally:
+            upstream.shutdown()
+            upstream.server_close()
+
+        self.assertEqual([(station.code,metar is None) for station,km,metar in results],[('LFLY',False),('LFLL',True)])
+        self.assertEqual(results[0][2].qnh,1000)
+        self.assertEqual(results[0][2].data_date,'2021/03/29 22:00')
+
+
+class testsTaf(unittest.TestCase):
+    """TAF decoding with `Metar` analyzers
+    """
+
+    TAF = ('TAF LFPG 291700Z 2918/3024 22010KT 9999 SCT030 TEMPO 2920/2924 4000 SHRA '
+    'BECMG 3002/3004 30015G25KT FM301200 27010KT CAVOK PROB30 TEMPO 3014/3018 TSRA BKN015CB=')
+
+    def test_decodeGroups(self):
+        self.assertEqual(decodeGroups('4000 SHRA'),{
+            'visibility':4000,
+            'weather':{'intensity':None,'prefix':('Shower',),'weather':('Rain',)}
+        })
+        self.assertEqual(decodeGroups('27010KT CAVOK'),{
+            'wind':{'direction':270,'speed':10,'gust':None,'variation':None},
+            'visibility':9999,'weather':None,'cloud':None,'ceiling':None
+        })
+
+    def test_statuteMiles(self):
+        self.assertEqual(decodeGroups('18010KT P6SM SCT250')['visibility'],9656)
+        self.assertEqual(decodeGroups('TEMPO 2920/2924 3/4SM -SN OVC006')['visibility'],1207)
+        self.assertEqual(decodeGroups('1 1/2SM BR')['visibility'],2414)
+
+    def test_overcastNotVicinity(self):
+        fields = decodeGroups('-SN BKN008 OVC040')
+        self.assertEqual(fields['weather'],{'intensity':False,'prefix':None,'weather':('Snow',)})
+        self.assertNotIn('weather',decodeGroups('OVC006'))
+
+    def test_periods(self):
+        taf = Taf('LFPG',self.TAF,'2021/03/29 17:05')
+        utc = timezone.utc
+        self.assertEqual(taf.issued,datetime(2021,3,29,17,0,tzinfo=utc))
+        self.assertEqual(taf.validity,(datetime(2021,3,29,18,0,tzinfo=utc),datetime(2021,3,31,0,0,tzinfo=utc)))
+        self.assertEqual([(period['type'],period['probability'],period['start'].hour,period['end'].hour) for period in taf.periods],
+        [('BASE',None,18,0),('TEMPO',None,20,0),('BECMG',None,2,4),('FM',None,12,0),('PROB',30,14,18)])
+
+    def test_at(self):
+        taf = Taf('LFPG',self.TAF,'2021/03/29 17:05')
+
+        conditions = taf.at(datetime(2021,3,29,21,0))
+        self.assertEqual(conditions['prevailing']['wind']['direction'],220)
+        self.assertEqual([period['type'] for period in conditions['temporary']],['TEMPO'])
+
+        conditions = taf.at('2021/03/30 05:00') #After BECMG
+        self.assertEqual(conditions['prevailing']['wind']['gust'],25)
+        self.assertEqual(conditions['prevailing']['cloud'][0]['code'],'SCT')
+        self.assertEqual(conditions['temporary'],())
+
+        conditions = taf.at('2021/03/30 15:00') #FM period
+        self.assertEqual(conditions['prevailing']['cloud'],None)
+        self.assertEqual(conditions['temporary'][0]['fields']['ceiling'],1500)
+
+        self.assertEqual(taf.at('2021/03/31 01:00'),None)
+
+    def test_monthRollover(self):
+        taf = Taf('LFLY','TAF LFLY 301700Z 3018/0124 VRB03KT CAVOK FM010600 24010KT 9999 BKN020','2021/04/30 17:10')
+        self.assertEqual(taf.validity[1],datetime(2021,5,2,0,0,tzinfo=timezone.utc))
+        self.assertEqual(taf.at('2021/05/01 07:00')['prevailing']['ceiling'],2000)
+
+class testsDiagnostics(unittest.TestCase):
+    """Tolerant decoding & diagnostics
+    """
+
+    def test_tolerant(self):
+        metar = Metar('LFPG','LFPG 292200Z AUTO 22010KT 23015KT CAVOK BKN010 06/M00 Q1000 XYZ12 NOSIG',
+        '2021/03/29 22:05',tolerant=True)
+        self.assertEqual(metar.diagnostics,{
+            'errors':{},
+            'unparsed':('XYZ12',),
+            'conflicts':({'field':'wind','groups':('22010KT','23015KT')},{'field':'cavok','groups':('CAVOK','BKN010')})
+        })
+
+        metar = Metar('LFPG','LFPG 292200Z 22010KT 9999 06/M00 Q1000','garbage',tolerant=True)
+        self.assertEqual(metar.observation_time,None)
+        self.assertIn('observation_time',metar.diagnostics['errors'])
+        self.assertEqual(metar.qnh,1000)
+
+        metar = Metar('LFPG',b'LFPG 292200Z 22010KT 9999 06/M00 Q1000',tolerant=True)
+        self.assertEqual(metar.wind['speed'],10)
+
+        with self.assertRaises(ValueError):
+            Metar('LFPG','LFPG 292200Z 22010KT 9999 06/M00 Q1000','garbage')
+
+    def test_verticalVisibility(self):
+        metar = Metar('LFLY','LFLY 292200Z 00000KT 0100 FG VV/// 01/01 Q1000')
+        self.assertEqual(metar.cloud,({'code':'VV','meaning':'Invisible Sky','oktaMin':None,'oktaMax':None,
+        'altitude':None,'presenceCB':False,'presenceTCU':False},))
+        self.assertEqual(metar.ceiling,0)
+        self.assertEqual(metar.vmc,{'uncontrolled':False,'controlled':False})
+
+        metar = Metar('LFLY','LFLY 292200Z 00000KT 0100 FG VV002 01/01 Q1000')
+        self.assertEqual(metar.ceiling,200)
+
+    def test_decodeTolerant(self):
+        reports = [('LFLY','LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG'),
+        ('LFLY','LFLY 292200Z 12345 ???'),('LFLY',None),('LFLY','LFLY 292200Z 292230Z 06/M00 ???')]
+
+        metars,diagnostics = decodeTolerant(reports,'2021/03/29 22:40')
+        self.assertEqual(len(metars),4)
+        self.assertEqual(diagnostics.summary(),{
+            'reports':4,
+            'reportsWithErrors':0,
+            'reportsWithUnparsed':2,
+            'reportsWithConflicts':1,
+            'errors':{},
+            'conflicts':{'dateTime':1},
+            'unparsed':{'???':2,'12345':1}
+        })
+
+def bytesFields(text):
+    """`decodeBytes()` as a text decoder (differential testing)
+    """
+    return decodeBytes(text.encode())
+
+
+class testsFuzz(unittest.TestCase):
+    """Fuzzing & differential testing
+    """
+
+    def test_generateReports(self):
+        self.assertEqual(list(generateReports(50,seed=7)),list(generateReports(50,seed=7)))
+        self.assertNotEqual(list(generateReports(50,seed=7)),list(generateReports(50,seed=8)))
+
+    def test_tolerantNeverRaises(self):
+        for text in generateReports(2000,seed=1,malformed=1.0):
+            metarFields(text)
+
+    def test_bytesDecoder(self):
+        result = differential(metarFields,bytesFields,count=3000,seed=2,malformed=0.5,
+        fields=('dateTime','wind','temperatures','qnh'))
+        self.assertEqual(result['differences'],Counter(),result['examples'])
+
+    def test_compareDecoders(self):
+        def broken(text):
+            fields = metarFields(text)
+            fields['qnh'] = None
+            return fields
+
+        def raising(text):
+            raise ValueError(text)
+
+        reports = ['LFLY 292200Z AUTO VRB03KT CAVOK 06/M00 Q1000 NOSIG']
+        self.assertEqual(list(compareDecoders(metarFields,broken,reports)),
+        [{'report':reports[0],'field':'qnh','old':1000,'new':None}])
+        self.assertEqual(list(compareDecoders(metarFields,raising,reports))[0]['new'],('raised','ValueError'))
+
+
+class testsImport(unittest.TestCase):
+    """Startup cost of METAR Library: modules loaded by `import PythonMETAR.metar`
+    """
+
+    HEAVY_MODULES = ('urllib.request','http.client','ssl','socket','threading','urllib.parse',
+    'queue','multiprocessing','concurrent.futures','json','csv','gzip','struct','array',
+    'PythonMETAR.taf','PythonMETAR.stations','PythonMETAR.fetcher','PythonMETAR.pipeline',
+    'PythonMETAR.categories','PythonMETAR.diagnostics','PythonMETAR.bytesmetar')
+    #Not needed to decode a METAR text
+
+    def importedModules(self,statement='import PythonMETAR.metar'):
+        """Run statement in a fresh interpreter.
+        Return set of modules loaded
+        """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.run([sys.executable,'-c',statement+'\nimport sys\nprint("\\n".join(sys.modules))'],
+        cwd=root,capture_output=True,text=True,check=True)
+
+        return set(process.stdout.split())
+
+    def test_noHeavyImport(self):
+        modules = self.importedModules()
+        self.assertIn('PythonMETAR.metar',modules)
+        for module in self.HEAVY_MODULES:
+            self.assertNotIn(module,modules)
+
+    def test_lazyExports(self):
+        modules = self.importedModules('import PythonMETAR\nPythonMETAR.MetarFetcher')
+        self.assertIn('PythonMETAR.fetcher',modules)
+        self.assertNotIn('PythonMETAR.pipeline',modules)
+
+        import PythonMETAR
+        from PythonMETAR.fetcher import MetarFetcher
+        self.assertIs(PythonMETAR.MetarFetcher,MetarFetcher)
+        self.assertIn('DecodePipeline',PythonMETAR.__all__)
+        self.assertIn('Metar',PythonMETAR.__all__)
+        self.assertNotIn('re',PythonMETAR.__all__)
+        self.assertNotIn('datetime',PythonMETAR.__all__)
+        self.assertTrue(all(hasattr(PythonMETAR,name) for name in PythonMETAR.__all__))
+        with self.assertRaises(AttributeError):
+            PythonMETAR.missing
+
+    def test_cliWithoutServer(self):
+        modules = self.importedModules('import PythonMETAR.cli')
+        self.assertNotIn('http.server',modules)
+        self.assertNotIn('PythonMETAR.server',modules)
+
+    def test_noSSLPatch(self):
+        import ssl
+        self.assertIsNot(ssl._create_default_https_context,ssl._create_unverified_context)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
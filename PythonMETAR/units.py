@@ -0,0 +1,262 @@
+"""
+Unit-normalized values of METAR
+Author: Matthieu BOUCHET
+
+`Metar` returns values in units of text (wind in KT or MPS, QNH in hPa
+or inHg, visibility in metres or statute miles). This module converts
+them into aviation standard units:
+
+- wind: knots (kt)
+- visibility: metres (m)
+- QNH: hectopascals (hPa)
+- temperatures: degrees Celsius (degC)
+- ceiling: feet (ft)
+
+Batches are converted column by column (`normalizeColumns()`), with
+NumPy if installed.
+"""
+
+import re
+from array import array
+
+KT_PER_MPS = 1.943844
+HPA_PER_INHG = 33.8639
+METRES_PER_SM = 1609.344
+
+UNITS = {
+    'windDirection': 'deg',
+    'windSpeed': 'kt',
+    'windGust': 'kt',
+    'visibility': 'm',
+    'qnh': 'hPa',
+    'temperature': 'degC',
+    'dewpoint': 'degC',
+    'ceiling': 'ft'
+}
+
+# Unit codes of raw columns
+WIND_UNITS = ('KT', 'MPS')
+QNH_UNITS = ('hPa', 'inHg')
+VISIBILITY_UNITS = ('m', 'SM')
+
+REGEX_WIND_KT = re.compile(r'\d{5}KT|\d{5}G\d{2}KT|VRB\d{2}KT')
+REGEX_WIND_MPS = re.compile(r'\d{5}MPS|\d{5}G\d{2}MPS|VRB\d{2}MPS')
+REGEX_VISIBILITY_SM = re.compile(r'(?:^| )([MP]?)(?:(\d) )?(\d{1,2}|\d/\d{1,2})SM(?= |$)')
+
+_NAN = float('nan')
+
+
+def windUnit(metar):
+    """Unit of wind group used by `Metar.analyzeWind()`
+
+    Returns:
+        (string): 'KT' or 'MPS', None if no wind
+    """
+    if metar.wind is None:
+        return None
+
+    if REGEX_WIND_KT.search(metar.metarWithoutChangements):
+        return 'KT'
+
+    return 'MPS' if REGEX_WIND_MPS.search(metar.metarWithoutChangements) else None
+
+
+def qnhUnit(metar):
+    """Unit of `Metar.analyzeQNH()` value (integer if hPa, float if inHg)
+
+    Returns:
+        (string): 'hPa' or 'inHg', None if no QNH
+    """
+    if metar.qnh is None:
+        return None
+
+    return 'inHg' if isinstance(metar.qnh, float) else 'hPa'
+
+
+def statuteMiles(metar):
+    """Visibility in statute miles (e.g. '10SM', '1 1/2SM', 'P6SM'),
+    not decoded by `Metar.analyzeVisibility()`
+
+    Returns:
+        (float): Visibility in statute miles, None if not found
+    """
+    return parseStatuteMiles(metar.metarWithoutChangements)
+
+
+def parseStatuteMiles(text):
+    """Visibility in statute miles of a text (see `statuteMiles()`)
+
+    Args:
+        text (string): Groups (e.g. METAR, groups of a TAF period)
+
+    Returns:
+        (float): Visibility in statute miles, None if not found
+    """
+    search = REGEX_VISIBILITY_SM.search(text)
+    if search is None:
+        return None
+
+    _, whole, value = search.groups()
+    if '/' in value:
+        numerator, denominator = value.split('/')
+        if int(denominator) == 0:
+            return None
+        miles = int(numerator) / int(denominator)
+    else:
+        miles = float(value)
+
+    return miles + (int(whole) if whole else 0)
+
+
+def normalize(metar):
+    """Unit-normalized values of a METAR. Prefer `Metar.normalized()`,
+    which caches result.
+
+    Args:
+        metar (Metar): Decoded METAR
+
+    Returns:
+        (dict): Keys of `UNITS` (values None if missing, wind direction
+        'VRB' if variable) and `units` key (`UNITS`)
+    """
+    wind = metar.wind
+    if wind is None:
+        direction = speed = gust = None
+    else:
+        factor = KT_PER_MPS if windUnit(metar) == 'MPS' else 1
+        direction = wind['direction']
+        speed = round(wind['speed'] * factor, 6)
+        gust = None if wind['gust'] is None else round(wind['gust'] * factor, 6)
+
+    visibility = metar.visibility
+    if visibility is None:
+        miles = statuteMiles(metar)
+        visibility = None if miles is None else round(miles * METRES_PER_SM, 0)
+
+    qnh = metar.qnh
+    if qnhUnit(metar) == 'inHg':
+        qnh = round(qnh * HPA_PER_INHG, 1)
+
+    temperatures = metar.temperatures or {}
+
+    return {
+        'windDirection': direction,
+        'windSpeed': speed,
+        'windGust': gust,
+        'visibility': visibility,
+        'qnh': qnh,
+        'temperature': temperatures.get('temperature'),
+        'dewpoint': temperatures.get('dewpoint'),
+        'ceiling': metar.ceiling,
+        'units': UNITS
+    }
+
+
+def rawColumns(metars):
+    """Raw values of METAR (units of text) in columns, with unit codes.
+
+    Args:
+        metars (iterable): Decoded METAR
+
+    Returns:
+        (dict): Columns `array('d')` (NaN if missing): speed, gust, visibility,
+        qnh, temperature, dewpoint, ceiling; and unit codes (index in
+        `WIND_UNITS`, `VISIBILITY_UNITS`, `QNH_UNITS`): windUnit,
+        visibilityUnit, qnhUnit
+    """
+    names = ('speed', 'gust', 'visibility', 'qnh', 'temperature', 'dewpoint',
+             'ceiling', 'windUnit', 'visibilityUnit', 'qnhUnit')
+    columns = {name: array('d') for name in names}
+
+    def number(value):
+        return _NAN if value is None else value
+
+    for metar in metars:
+        wind = metar.wind or {}
+        temperatures = metar.temperatures or {}
+
+        visibility, visibilityCode = metar.visibility, 0
+        if visibility is None:
+            visibility = statuteMiles(metar)
+            visibilityCode = 0 if visibility is None else 1
+
+        columns['speed'].append(number(wind.get('speed')))
+        columns['gust'].append(number(wind.get('gust')))
+        columns['visibility'].append(number(visibility))
+        columns['qnh'].append(number(metar.qnh))
+        columns['temperature'].append(number(temperatures.get('temperature')))
+        columns['dewpoint'].append(number(temperatures.get('dewpoint')))
+        columns['ceiling'].append(number(metar.ceiling))
+        columns['windUnit'].append(1 if windUnit(metar) == 'MPS' else 0)
+        columns['visibilityUnit'].append(visibilityCode)
+        columns['qnhUnit'].append(1 if qnhUnit(metar) == 'inHg' else 0)
+
+    return columns
+
+
+_CONVERSIONS = {
+    'speed': ('windUnit', KT_PER_MPS, 6),
+    'gust': ('windUnit', KT_PER_MPS, 6),
+    'visibility': ('visibilityUnit', METRES_PER_SM, 0),
+    'qnh': ('qnhUnit', HPA_PER_INHG, 1)
+}
+# Column => (unit code column, factor, digits of rounding)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def normalizeColumns(columns, useNumpy=None):
+    """Convert raw columns (see `rawColumns()`, or `SharedColumns` of
+    `shareddecode` module) into standard units, column by column.
+
+    Unit code columns (windUnit, visibilityUnit, qnhUnit) missing are
+    considered 0 (KT, m, hPa). As `normalize()`, converted visibilities
+    are rounded to the metre and QNH to 0.1 hPa.
+
+    Args:
+        columns (mapping): Name => sequence of floats (array, memoryview,
+        list, numpy array)
+        useNumpy (boolean, optional): Use NumPy (vectorized). Defaults to
+        NumPy if installed.
+
+    Returns:
+        (dict): Name => column in standard units (`numpy.ndarray` if NumPy
+        used, else `array('d')`), for speed, gust, visibility, qnh and
+        temperature, dewpoint, ceiling columns given (copied unchanged)
+    """
+    numpy = _numpy() if useNumpy in (None, True) else None
+    if useNumpy and numpy is None:
+        raise ImportError('NumPy is required for useNumpy=True')
+
+    normalized = {}
+    for name in ('speed', 'gust', 'visibility', 'qnh', 'temperature', 'dewpoint', 'ceiling'):
+        if name not in columns:
+            continue
+
+        column = columns[name]
+        code, factor, digits = _CONVERSIONS.get(name, (None, 1, None))
+        codes = columns[code] if code is not None and code in columns else None
+
+        if numpy is not None:
+            column = numpy.array(column, dtype=numpy.float64)
+            if codes is not None:
+                converted = numpy.asarray(codes, dtype=numpy.float64) == 1
+                column[converted] = numpy.round(column[converted] * factor, digits)
+
+        elif codes is None:
+            column = array('d', column)
+
+        else:
+            column = array('d', (round(value * factor, digits) if codes[i] == 1 else value
+                                 for i, value in enumerate(column)))
+
+        normalized[name] = column
+
+    return normalized
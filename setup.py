@@ -13,6 +13,14 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/MatthieuBOUCHET/PythonMETAR",
     packages=['PythonMETAR'],
+    package_data={'PythonMETAR': ['stations.csv']},
+    entry_points={
+        'console_scripts': ['pythonmetar=PythonMETAR.cli:main'],
+    },
+    extras_require={
+        'parquet': ['pyarrow'],
+        'fast': ['numpy'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Programming Language :: Python :: 3",